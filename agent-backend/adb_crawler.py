@@ -0,0 +1,239 @@
+"""
+Android crawl fast path: `uiautomator dump` over adb, no Appium session or wdio run
+
+The dump is rewritten into the Appium page-source format of crawls/*.xml. Pages are
+reached by restarting the app and tapping the navigation plan's selectors with
+`input tap`. Anything adb cannot do is left to the wdio crawl.
+"""
+
+import os
+import subprocess
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from crawl_batch import CRAWL_START_SCREEN, CRAWLS_DIR
+from crawl_cache import get_crawl_index
+from crawl_index import parse_crawl_string
+from screen_fingerprint import fingerprint_string, get_default_screen_index
+from selector_matcher import snapshot_crawl
+from wait_strategy import detect_app_id
+
+load_dotenv()
+
+# "auto": adb for local Android devices, wdio for the rest and for pages adb cannot reach; "wdio": never adb
+CRAWL_BACKEND = os.getenv("CRAWL_BACKEND", "auto")
+ADB_PATH = os.getenv("ADB_PATH", "adb")
+ADB_TIMEOUT_S = float(os.getenv("ADB_TIMEOUT_S", "20"))
+# Pause after a tap before dumping; uiautomator itself also waits for the UI to go idle
+ADB_TAP_SETTLE_MS = int(os.getenv("ADB_TAP_SETTLE_MS", "500"))
+# How long to keep re-dumping while waiting for the app or a tap target to appear
+ADB_APPEAR_TIMEOUT_S = float(os.getenv("ADB_APPEAR_TIMEOUT_S", "15"))
+
+DEVICE_DUMP_PATH = "/sdcard/window_dump.xml"
+XML_HEADER = "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n"
+
+
+class AdbError(Exception):
+    pass
+
+
+def normalize_dump(xml: str) -> str:
+    """uiautomator dump XML -> Appium UiAutomator2 page source (crawls/*.xml format).
+
+    <node class="android.widget.Button" ...> becomes <android.widget.Button class=... displayed="true">
+    under a <hierarchy index="0" class="hierarchy" width=.. height=..> root.
+    """
+    root = ET.fromstring(xml)
+    if root.tag != "hierarchy":
+        raise AdbError(f"unexpected dump root <{root.tag}>")
+    root.attrib = {"index": "0", "class": "hierarchy", "rotation": root.get("rotation", "0"), **{
+        k: v for k, v in root.attrib.items() if k not in ("index", "class", "rotation")
+    }}
+    for node in root.iter("node"):
+        node.tag = node.get("class") or "android.view.View"
+        # uiautomator only dumps nodes that are on screen
+        node.set("displayed", node.get("visible-to-user", "true"))
+    first = next(iter(root), None)
+    if first is not None and "width" not in root.attrib:
+        bounds = _bounds(first.get("bounds", ""))
+        if bounds:
+            root.set("width", str(bounds[2] - bounds[0]))
+            root.set("height", str(bounds[3] - bounds[1]))
+    ET.indent(root, space="  ")
+    return XML_HEADER + ET.tostring(root, encoding="unicode")
+
+
+def _bounds(value: str) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        left_top, right_bottom = value.strip("[]").split("][")
+        x1, y1 = map(int, left_top.split(","))
+        x2, y2 = map(int, right_bottom.split(","))
+        return x1, y1, x2, y2
+    except ValueError:
+        return None
+
+
+def find_center(source: str, selector: str) -> Optional[Tuple[int, int]]:
+    """Screen center of the first element a ~accessibility-id / id= selector matches in a page source"""
+    for element in parse_crawl_string(source):
+        if element.bounds is None:
+            continue
+        if element.matches(selector):
+            x1, y1, x2, y2 = element.bounds
+            return (x1 + x2) // 2, (y1 + y2) // 2
+    return None
+
+
+class AdbDevice:
+    """One adb-connected Android device"""
+
+    def __init__(self, udid: str, adb: str = ADB_PATH, timeout: float = ADB_TIMEOUT_S):
+        self.udid = udid
+        self.adb = adb
+        self.timeout = timeout
+
+    def _run(self, *args: str) -> str:
+        try:
+            result = subprocess.run(
+                [self.adb, "-s", self.udid, *args],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                timeout=self.timeout,
+                check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise AdbError(f"adb {' '.join(args)}: {e}") from e
+        if result.returncode != 0:
+            raise AdbError(f"adb {' '.join(args)}: {(result.stderr or result.stdout).strip()[:200]}")
+        return result.stdout
+
+    def dump_raw(self) -> str:
+        """Raw uiautomator XML, streamed over exec-out; falls back to a dump file on the device"""
+        output = self._run("exec-out", "uiautomator", "dump", "/dev/tty")
+        start, end = output.find("<?xml"), output.rfind("</hierarchy>")
+        if start < 0 or end < 0:
+            # Some builds cannot write to /dev/tty (or an Appium session holds uiautomator)
+            self._run("shell", "uiautomator", "dump", DEVICE_DUMP_PATH)
+            output = self._run("exec-out", "cat", DEVICE_DUMP_PATH)
+            start, end = output.find("<?xml"), output.rfind("</hierarchy>")
+            if start < 0 or end < 0:
+                raise AdbError(f"uiautomator dump failed: {output.strip()[:200]}")
+        return output[start:end + len("</hierarchy>")]
+
+    def dump(self) -> str:
+        """Current screen in the crawls/*.xml format"""
+        return normalize_dump(self.dump_raw())
+
+    def tap(self, x: int, y: int):
+        self._run("shell", "input", "tap", str(x), str(y))
+
+    def back(self):
+        self._run("shell", "input", "keyevent", "4")
+
+    def restart_app(self, package: str):
+        """Force-stop the app and start its launcher activity"""
+        self._run("shell", "am", "force-stop", package)
+        self._run("shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1")
+
+    def wait_for(self, selector: Optional[str] = None, package: Optional[str] = None,
+                 timeout: float = ADB_APPEAR_TIMEOUT_S) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """Re-dump until the selector (or, without one, the app's package) is on screen: (source, center)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            source = self.dump()
+            center = find_center(source, selector) if selector else None
+            if (selector and center) or (not selector and (not package or f'package="{package}"' in source)):
+                return source, center
+            if time.monotonic() > deadline:
+                raise AdbError(f"{selector or package} did not appear within {timeout:.0f}s")
+            time.sleep(ADB_TAP_SETTLE_MS / 1000)
+
+
+def adb_udid(platform: str = "Android", device: Optional[Dict[str, Any]] = None, adb: str = ADB_PATH) -> Optional[str]:
+    """Device to crawl over adb, or None when the wdio path has to be used.
+
+    The given device, else DEVICE_UDID, else the only device `adb devices` lists.
+    """
+    if CRAWL_BACKEND != "auto" or platform.lower() != "android":
+        return None
+    if device and device.get("id") and device.get("id") != "browserstack":
+        return device["id"]
+    if os.getenv("DEVICE_UDID"):
+        return os.getenv("DEVICE_UDID")
+    try:
+        result = subprocess.run([adb, "devices"], capture_output=True, text=True, timeout=ADB_TIMEOUT_S, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    devices = [line.split("\t")[0] for line in result.stdout.strip().splitlines()[1:] if line.endswith("\tdevice")]
+    return devices[0] if len(devices) == 1 else None
+
+
+def adb_crawl_pages(
+    pages: Sequence[str],
+    udid: str,
+    plan: Optional[Dict[str, List[str]]] = None,
+    current_screen: bool = False,
+    start_screen: str = CRAWL_START_SCREEN,
+    crawls_dir: Path = CRAWLS_DIR,
+    adb: str = ADB_PATH,
+) -> Dict[str, Dict[str, Any]]:
+    """Crawl the pages adb can reach; {page: result} in the CRAWL_RESULT shape, successes only.
+
+    A page is reachable when the navigation plan has taps for it, or it is the
+    launch screen; with current_screen a single page is dumped where the app is.
+    A dump that fingerprints as another known screen rather than the page's own
+    crawl is not saved. Pages left out (or that failed) are for the wdio crawl to handle.
+    """
+    plan = plan or {}
+    device = AdbDevice(udid, adb)
+    package = detect_app_id()
+    results: Dict[str, Dict[str, Any]] = {}
+    for page in pages:
+        taps = plan.get(page.lower())
+        relaunch = bool(package) and (bool(taps) or page.lower() == start_screen.lower())
+        if not relaunch and not (current_screen and len(pages) == 1):
+            continue
+        started = time.monotonic()
+        timing = {"reset_ms": 0, "navigate_ms": 0, "dump_ms": 0}
+        try:
+            if relaunch:
+                device.restart_app(package)
+                device.wait_for(taps[0] if taps else None, package=package)
+                timing["reset_ms"] = round((time.monotonic() - started) * 1000)
+            navigate_start = time.monotonic()
+            for selector in taps or []:
+                _, center = device.wait_for(selector)
+                device.tap(*center)
+                time.sleep(ADB_TAP_SETTLE_MS / 1000)
+            timing["navigate_ms"] = round((time.monotonic() - navigate_start) * 1000)
+
+            dump_start = time.monotonic()
+            source = device.dump()
+            index = get_default_screen_index(crawls_dir)
+            verdict = index.verify(page, fingerprint_string(source), reference=index.screens.get(page.lower()))
+            if verdict["verified"] is False:
+                raise AdbError(f"landed on {verdict['looks_like']} (similarity {verdict['looks_like_similarity']})")
+            snapshot_crawl(page, crawls_dir)
+            crawl_file = Path(crawls_dir) / f"{page}.xml"
+            crawl_file.parent.mkdir(parents=True, exist_ok=True)
+            crawl_file.write_text(source, encoding="utf-8")
+            timing["dump_ms"] = round((time.monotonic() - dump_start) * 1000)
+        except (AdbError, ET.ParseError) as e:
+            print(f"adb crawl of {page} failed, leaving it to wdio: {e}")
+            continue
+        results[page] = {
+            "page": page,
+            "ok": True,
+            "ms": round((time.monotonic() - started) * 1000),
+            **timing,
+            "file": str(crawl_file),
+            "backend": "adb",
+            "element_count": len(get_crawl_index(crawl_file)),
+        }
+    return results
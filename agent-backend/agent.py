@@ -1,53 +1,136 @@
 import json
 import os
 import re
+import time
 from pathlib import Path
 from typing import List, Dict, Any
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+
+from crawl_cache import crawl_index_cache, get_crawl_index
+from navigation_graph import build_navigation_graph, render_navigation_steps
+from generation_manifest import GenerationManifest, fingerprint, get_default_manifest
+from prompt_context import build_crawl_context, count_tokens, truncate_to_token_budget
+from rate_limiter import RateLimiter, backoff_delay, get_default_rate_limiter
+from response_cache import ResponseCache, get_default_cache
+from wait_strategy import WaitPolicy, js_string, load_wait_policy
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. a local fake_openai.py server
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1/"
 
 ROOT_DIR = Path(__file__).resolve().parents[1]  # .../mobile-ai-agent
 MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
 PAGEOBJECTS_DIR = MOBILE_TESTS_DIR / "src" / "pageobjects"
 TESTS_DIR = MOBILE_TESTS_DIR / "src" / "tests"
 MANUAL_TESTS_DIR = MOBILE_TESTS_DIR / "manual-tests"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+
+# Bump whenever a system/user prompt template changes so existing outputs are regenerated
+PROMPT_TEMPLATE_VERSION = "1"
 
 
 class TestGenerationAgent:
 
 
-    def __init__(self, openai_api_key: str | None = None):
+    def __init__(
+        self,
+        openai_api_key: str | None = None,
+        use_cache: bool = True,
+        cache: ResponseCache | None = None,
+        manifest: GenerationManifest | None = None,
+        rate_limiter: RateLimiter | None = None,
+        base_url: str | None = None,
+        wait_policy: WaitPolicy | None = None,
+    ):
         api_key = openai_api_key or OPENAI_API_KEY
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set.")
 
-        self.client = OpenAI(api_key=api_key)
+        # Retries are handled in _chat so they go through the shared rate limiter
+        self.client = OpenAI(api_key=api_key, base_url=base_url or OPENAI_BASE_URL, max_retries=0)
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
 
         self.model = "gpt-4o-mini"
+        self.temperature = 0.1  # Lower temperature for more consistent code
+        self.max_tokens = 2500  # Increased for complete code generation
 
-    def _chat(self, system_prompt: str, user_prompt: str) -> str:
- 
-
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.1,  # Lower temperature for more consistent code
-            max_tokens=2500,  # Increased for complete code generation
-        )
+        # Prompt context budgets, in tokens
+        self.crawl_token_budget = int(os.getenv("CRAWL_CONTEXT_TOKENS", "1200"))
+        self.existing_file_token_budget = int(os.getenv("EXISTING_FILE_CONTEXT_TOKENS", "800"))
+
+        # Responses are cached on disk; use_cache=False bypasses lookups and writes
+        self.cache = cache or get_default_cache()
+        self.use_cache = use_cache
+
+        # Fingerprints of generation inputs; unchanged inputs skip the LLM entirely
+        self.manifest = manifest or get_default_manifest()
+
+        # How generated navigation waits for screens (mobile-tests/wait-policy.json)
+        self.wait_policy = wait_policy or load_wait_policy()
+
+    def _chat(self, system_prompt: str, user_prompt: str, use_cache: bool | None = None) -> str:
+        params = {
+            "model": self.model,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if str(self.client.base_url) != DEFAULT_OPENAI_BASE_URL:
+            # Replies from another endpoint (e.g. fake_openai.py) must never answer real runs
+            params["base_url"] = str(self.client.base_url)
+        cache_enabled = self.use_cache if use_cache is None else use_cache
+        cache_key = self.cache.make_key(**params)
+        if cache_enabled:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Budget the prompt plus the worst-case completion against tokens-per-minute
+        estimated_tokens = count_tokens(system_prompt) + count_tokens(user_prompt) + self.max_tokens
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                resp = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+                break
+            except (RateLimitError, InternalServerError, APIConnectionError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                if isinstance(e, RateLimitError):
+                    retry_after = e.response.headers.get("retry-after")
+                    if retry_after:
+                        try:
+                            delay = max(delay, float(retry_after))
+                        except ValueError:
+                            pass
+                    # Hold back every worker sharing the limiter, not just this one
+                    self.rate_limiter.pause(delay)
+                print(f"[RETRY] OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
 
         try:
-            return resp.choices[0].message.content or ""
+            content = resp.choices[0].message.content or ""
         except Exception:
             return ""
 
+        if cache_enabled:
+            self.cache.set(cache_key, content, params)
+        return content
+
     def _read_existing_summary(self, path: Path) -> str:
         if not path.exists():
             return "No existing file."
@@ -55,82 +138,82 @@ class TestGenerationAgent:
             content = path.read_text(encoding="utf-8")
         except UnicodeDecodeError:
             return "Existing file not readable."
-        return content[:2000]
+        return truncate_to_token_budget(content, self.existing_file_token_budget)
 
     def _read_crawl_xml(self, page_name: str) -> str:
-        """Read crawled XML file if it exists"""
-        crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page_name}.xml"
+        """Ranked, token-budgeted element list from the crawl XML, for use in prompts"""
+        crawl_file = CRAWLS_DIR / f"{page_name}.xml"
         if crawl_file.exists():
             try:
-                content = crawl_file.read_text(encoding="utf-8")
-                # Return first 3000 chars to avoid token limits
-                return content[:3000] + "\n... (truncated)" if len(content) > 3000 else content
+                return build_crawl_context(get_crawl_index(crawl_file), self.crawl_token_budget)
             except Exception:
                 return "Crawl file exists but could not be read."
         return "No crawl file found. Generate selectors based on acceptance criteria."
 
     def _extract_selectors_from_xml(self, page_name: str) -> List[Dict[str, str]]:
-        """Extract content-desc and resource-id values from crawl XML - works with ANY app"""
-        crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page_name}.xml"
-        selectors = []
-        
+        """Extract accessibility-id and resource-id selectors from crawl XML - works with ANY app"""
+        crawl_file = CRAWLS_DIR / f"{page_name}.xml"
+
         if not crawl_file.exists():
-            return selectors
-            
+            return []
+
         try:
-            content = crawl_file.read_text(encoding="utf-8")
-            
-            # Extract content-desc (accessibility IDs) - most reliable for mobile
-            content_desc_pattern = r'content-desc="([^"]+)"'
-            for match in re.findall(content_desc_pattern, content):
-                if match.strip():  # Skip empty values
-                    selectors.append({
-                        "type": "accessibility-id",
-                        "value": match,
-                        "selector": f"~{match}",
-                        "name": match.lower().replace('-', '_').replace(' ', '_')
-                    })
-            
-            # Extract resource-id (Android IDs)
-            resource_id_pattern = r'resource-id="([^"]+)"'
-            for match in re.findall(resource_id_pattern, content):
-                if match.strip() and ':id/' in match:
-                    id_name = match.split(':id/')[-1]
-                    selectors.append({
-                        "type": "resource-id",
-                        "value": match,
-                        "selector": f"id={match}",
-                        "name": id_name.lower().replace('-', '_')
-                    })
-                    
+            return get_crawl_index(crawl_file).selectors()
         except Exception:
-            pass
-            
-        return selectors
+            return []
 
-    def _format_selectors_for_prompt(self, selectors: List[Dict[str, str]]) -> str:
-        """Format extracted selectors as a clear list for the LLM"""
-        if not selectors:
-            return "No selectors found in crawl XML."
-        
-        lines = ["AVAILABLE SELECTORS (extracted from crawl XML - USE THESE EXACT VALUES):"]
-        seen = set()
-        for sel in selectors:
-            if sel["selector"] not in seen:
-                seen.add(sel["selector"])
-                lines.append(f"  - {sel['name']}: $('{sel['selector']}')")
-        
-        return "\n".join(lines)
+    def _build_navigation_steps(self, page_name: str) -> List[str]:
+        """Body of navigateTo{Page}(): dismiss alerts, then the shortest tap path from the current screen"""
+        policy = self.wait_policy
+        try:
+            graph = build_navigation_graph(CRAWLS_DIR, extra_screens=[page_name])
+        except Exception as e:
+            print(f"[DEBUG] Navigation graph unavailable: {e}")
+            graph = None
+
+        # Wait for any known screen instead of sleeping through app launch
+        anchors = sorted(set(graph.anchors.values()))[:6] if graph else []
+        nav_steps = policy.app_ready(anchors)
+
+        # Always dismiss any alerts/popups first (e.g., after login success)
+        nav_steps.append("// Dismiss any alerts/popups first")
+        nav_steps.append(f"try {{ const okBtn = await $('android=new UiSelector().text(\"OK\")'); if (await okBtn.isDisplayed()) {{ await okBtn.click(); {policy.after_dismiss('okBtn')} }} }} catch (e) {{ /* No alert */ }}")
+        nav_steps.append(f"try {{ const okBtn2 = await $('~OK'); if (await okBtn2.isDisplayed()) {{ await okBtn2.click(); {policy.after_dismiss('okBtn2')} }} }} catch (e) {{ /* No alert */ }}")
+
+        if graph is not None:
+            nav_steps.extend(render_navigation_steps(graph, page_name, policy))
+        else:
+            nav_steps.append(f"console.log({js_string(f'No crawled path to {page_name.lower()}')});")
+        return nav_steps
 
-    def generate_pom(self, page_name: str, criteria: List[Dict[str, Any]]) -> str:
+    def _generation_inputs(self, **inputs: Any) -> Dict[str, Any]:
+        """Everything besides the page-specific inputs that changes generated output"""
+        return {"model": self.model, "template_version": PROMPT_TEMPLATE_VERSION, **inputs}
+
+    def generate_pom(self, page_name: str, criteria: List[Dict[str, Any]], force: bool = False) -> str:
         """Generate Page Object Model - works with ANY mobile app"""
         criteria_json = json.dumps(criteria, indent=2, ensure_ascii=False)
         pom_file = PAGEOBJECTS_DIR / f"{page_name.capitalize()}Page.ts"
-        existing_summary = self._read_existing_summary(pom_file)
-        
+
         # Extract selectors from crawl XML (generic - works with any app)
         selectors = self._extract_selectors_from_xml(page_name)
-        selectors_prompt = self._format_selectors_for_prompt(selectors)
+
+        # Navigation comes from the crawl graph, not from the LLM
+        nav_code = "\n    ".join(self._build_navigation_steps(page_name))
+
+        inputs = self._generation_inputs(
+            selectors=fingerprint(sorted({s["selector"] for s in selectors})),
+            criteria=fingerprint(criteria),
+            navigation=fingerprint(nav_code),
+            wait_policy=fingerprint(self.wait_policy.to_dict()),
+        )
+        input_fingerprint = fingerprint(inputs)
+        if not force and self.manifest.is_current(page_name, "pom", input_fingerprint, pom_file):
+            print(f"[SKIP] {pom_file.name} is up to date (selectors, criteria and navigation unchanged)")
+            return str(pom_file)
+
+        existing_summary = self._read_existing_summary(pom_file)
+        selectors_prompt = self._read_crawl_xml(page_name)
         
         system_prompt = (
             "You are an expert mobile QA automation engineer generating TypeScript Page Object classes "
@@ -145,131 +228,7 @@ class TestGenerationAgent:
             "7. Output ONLY valid TypeScript code, no explanations"
         )
         
-        # Build navigation instructions based on available selectors
-        page_lower = page_name.lower()
         nav_method_name = f"navigateTo{page_name.capitalize()}"
-        
-        # Find navigation-related selectors
-        nav_selectors = []
-        tab_selectors = []
-        for sel in selectors:
-            sel_lower = sel['name'].lower()
-            sel_value = sel.get('value', '').lower()
-            
-            # Skip screen/container elements that aren't clickable navigation
-            if any(x in sel_lower for x in ['-screen', 'screen-', '_screen']):
-                continue  # Skip screen containers
-            
-            # Navigation buttons (typically in bottom nav or header)
-            # Prioritize simple names like "login", "home" over "login-screen"
-            if any(x in sel_lower for x in ['home', 'login', 'signup', 'menu', 'nav', 'back', 'forms', 'swipe', 'drag']):
-                # Prefer simple selectors (just "login") over complex ones ("login-screen")
-                if not any(x in sel_lower for x in ['-screen', 'screen-', '_screen', 'container']):
-                    nav_selectors.append(sel)
-            
-            # Tab or container buttons (these are clickable)
-            if any(x in sel_lower for x in ['container', 'tab']) and 'button' in sel_lower:
-                tab_selectors.append(sel)
-        
-        # Build navigation instruction
-        nav_steps = [f"await driver.pause(2000); // Wait for app to load"]
-        
-        # Always dismiss any alerts/popups first (e.g., after login success)
-        nav_steps.append("// Dismiss any alerts/popups first")
-        nav_steps.append("try { const okBtn = await $('android=new UiSelector().text(\"OK\")'); if (await okBtn.isDisplayed()) { await okBtn.click(); await driver.pause(1000); } } catch (e) { /* No alert */ }")
-        nav_steps.append("try { const okBtn2 = await $('~OK'); if (await okBtn2.isDisplayed()) { await okBtn2.click(); await driver.pause(1000); } } catch (e) { /* No alert */ }")
-        
-        # For pages like signup that need multi-step navigation
-        if page_lower == "signup" and tab_selectors:
-            # Find login nav button - must be exactly "Login" (not "Login-screen")
-            login_nav = next((s for s in nav_selectors if s.get('value', '').lower() == 'login'), None)
-            # Find signup tab - look for "button-sign-up-container"
-            signup_tab = next((s for s in tab_selectors if 'sign' in s.get('value', '').lower() and 'up' in s.get('value', '').lower()), None)
-            email_input = next((s for s in selectors if 'input' in s['name'].lower() and 'email' in s['name'].lower()), None)
-            repeat_password_input = next((s for s in selectors if 'repeat' in s['name'].lower() and 'password' in s['name'].lower()), None)
-            
-            # Use repeat password to verify signup screen (more specific than email)
-            verify_selector = repeat_password_input if repeat_password_input else email_input
-            
-            home_nav = next((s for s in nav_selectors if s.get('value', '').lower() == 'home'), None)
-            
-            if login_nav and signup_tab and verify_selector:
-                # Always reset to home first for consistent state
-                if home_nav:
-                    nav_steps.append("// Reset to home screen first for consistent state")
-                    nav_steps.append(f"try {{")
-                    nav_steps.append(f"    const homeNav = await $('{home_nav['selector']}');")
-                    nav_steps.append(f"    await homeNav.waitForDisplayed({{ timeout: 5000 }});")
-                    nav_steps.append(f"    await homeNav.click();")
-                    nav_steps.append(f"    await driver.pause(2000);")
-                    nav_steps.append(f"}} catch (e) {{")
-                    nav_steps.append(f"    // Home button not found, continue anyway")
-                    nav_steps.append(f"}}")
-                
-                # Check if already on signup screen
-                nav_steps.append("// Check if already on signup screen")
-                nav_steps.append(f"try {{")
-                nav_steps.append(f"    const verifyEl = await $('{verify_selector['selector']}');")
-                nav_steps.append(f"    await verifyEl.waitForDisplayed({{ timeout: 2000 }});")
-                nav_steps.append(f"    console.log('Already on signup screen');")
-                nav_steps.append(f"    return; // Already on target screen")
-                nav_steps.append(f"}} catch (e) {{")
-                nav_steps.append(f"    // Not on signup screen, navigate to it")
-                nav_steps.append(f"    const nav = await $('{login_nav['selector']}');")
-                nav_steps.append(f"    await nav.waitForDisplayed({{ timeout: 10000 }});")
-                nav_steps.append(f"    await nav.click();")
-                nav_steps.append(f"    await driver.pause(2000);")
-                nav_steps.append(f"    const tab = await $('{signup_tab['selector']}');")
-                nav_steps.append(f"    await tab.waitForDisplayed({{ timeout: 10000 }});")
-                nav_steps.append(f"    await tab.click();")
-                nav_steps.append(f"    await driver.pause(2000);")
-                nav_steps.append(f"    const verifyEl = await $('{verify_selector['selector']}');")
-                nav_steps.append(f"    await verifyEl.waitForDisplayed({{ timeout: 10000 }});")
-                nav_steps.append(f"}}")
-        elif page_lower == "login":
-            # Find the Login nav button - must be exactly "Login" (not "Login-screen")
-            login_nav = next((s for s in nav_selectors if s.get('value', '').lower() == 'login'), None)
-            home_nav = next((s for s in nav_selectors if s.get('value', '').lower() == 'home'), None)
-            email_input = next((s for s in selectors if 'input' in s['name'].lower() and 'email' in s['name'].lower()), None)
-            
-            if login_nav and email_input:
-                # Always reset to home first for consistent state, then navigate to login
-                if home_nav:
-                    nav_steps.append("// Reset to home screen first for consistent state")
-                    nav_steps.append(f"try {{")
-                    nav_steps.append(f"    const homeNav = await $('{home_nav['selector']}');")
-                    nav_steps.append(f"    await homeNav.waitForDisplayed({{ timeout: 5000 }});")
-                    nav_steps.append(f"    await homeNav.click();")
-                    nav_steps.append(f"    await driver.pause(2000);")
-                    nav_steps.append(f"}} catch (e) {{")
-                    nav_steps.append(f"    // Home button not found, continue anyway")
-                    nav_steps.append(f"}}")
-                
-                # Check if already on login screen
-                nav_steps.append("// Check if already on login screen")
-                nav_steps.append(f"try {{")
-                nav_steps.append(f"    const emailInput = await $('{email_input['selector']}');")
-                nav_steps.append(f"    await emailInput.waitForDisplayed({{ timeout: 2000 }});")
-                nav_steps.append(f"    console.log('Already on login screen');")
-                nav_steps.append(f"    return; // Already on target screen")
-                nav_steps.append(f"}} catch (e) {{")
-                nav_steps.append(f"    // Not on login screen, navigate to it")
-                nav_steps.append(f"    const nav = await $('{login_nav['selector']}');")
-                nav_steps.append(f"    await nav.waitForDisplayed({{ timeout: 10000 }});")
-                nav_steps.append(f"    await nav.click();")
-                nav_steps.append(f"    await driver.pause(2000);")
-                nav_steps.append(f"    // Verify we're on login screen")
-                nav_steps.append(f"    const emailInput = await $('{email_input['selector']}');")
-                nav_steps.append(f"    await emailInput.waitForDisplayed({{ timeout: 10000 }});")
-                nav_steps.append(f"}}")
-        else:
-            # Generic: find any navigation element matching page name
-            page_nav = next((s for s in nav_selectors if page_lower in s['name'].lower()), None)
-            if page_nav:
-                nav_steps.append(f"const nav = await $('{page_nav['selector']}'); await nav.waitForDisplayed({{ timeout: 10000 }}); await nav.click();")
-                nav_steps.append("await driver.pause(2000);")
-        
-        nav_code = "\n    ".join(nav_steps)
         nav_instructions = (
             f"CRITICAL - MUST create this method with EXACT name '{nav_method_name}':\n"
             f"public async {nav_method_name}(): Promise<void> {{\n"
@@ -369,16 +328,28 @@ class TestGenerationAgent:
 
         PAGEOBJECTS_DIR.mkdir(parents=True, exist_ok=True)
         pom_file.write_text(ts_code, encoding="utf-8")
+        self.manifest.record(
+            page_name, "pom", input_fingerprint, pom_file,
+            {**inputs, "crawl": crawl_index_cache.content_hash(CRAWLS_DIR / f"{page_name}.xml")},
+        )
         return str(pom_file)
 
-    def generate_tests(self, page_name: str, criteria: List[Dict[str, Any]]) -> str:
+    def generate_tests(self, page_name: str, criteria: List[Dict[str, Any]], force: bool = False) -> str:
         """Generate test file - works with ANY mobile app"""
         criteria_json = json.dumps(criteria, indent=2, ensure_ascii=False)
         test_file = TESTS_DIR / f"{page_name.lower()}.e2e.ts"
+        pom_file = PAGEOBJECTS_DIR / f"{page_name.capitalize()}Page.ts"
+
+        pom_source = pom_file.read_text(encoding="utf-8") if pom_file.exists() else ""
+        inputs = self._generation_inputs(criteria=fingerprint(criteria), pom=fingerprint(pom_source))
+        input_fingerprint = fingerprint(inputs)
+        if not force and self.manifest.is_current(page_name, "tests", input_fingerprint, test_file):
+            print(f"[SKIP] {test_file.name} is up to date (POM and criteria unchanged)")
+            return str(test_file)
+
         existing_summary = self._read_existing_summary(test_file)
         
         # Read POM file to understand available methods
-        pom_file = PAGEOBJECTS_DIR / f"{page_name.capitalize()}Page.ts"
         pom_content = self._read_existing_summary(pom_file)
         
         system_prompt = (
@@ -426,14 +397,52 @@ class TestGenerationAgent:
 
         TESTS_DIR.mkdir(parents=True, exist_ok=True)
         test_file.write_text(ts_code, encoding="utf-8")
+        self.manifest.record(page_name, "tests", input_fingerprint, test_file, inputs)
         
         return str(test_file)
 
-    def generate_manual_tests(self, page_name: str, feature: str, criteria: List[Dict[str, Any]]) -> str:
+    def propose_selector_replacements(self, page_name: str, broken: List[Dict[str, str]]) -> Dict[str, str]:
+        """Ask the LLM for a replacement selector per broken POM getter, chosen from the fresh crawl.
+
+        broken: [{"getter", "selector", "error"}]. Returns {getter: new selector}; getters
+        the model could not match are left out.
+        """
+        system_prompt = (
+            "You are an expert mobile QA automation engineer repairing broken WebdriverIO selectors. "
+            "For each broken Page Object getter, pick the element from the AVAILABLE SELECTORS list that "
+            "is the same control after an app update. Only use selectors from that list. "
+            "Output a JSON object mapping getter name to the new selector string, omitting getters "
+            "with no convincing match. Only output valid JSON, no markdown code blocks, no explanations."
+        )
+        user_prompt = (
+            f"Page: {page_name}\n"
+            f"Broken getters (JSON):\n{json.dumps(broken, indent=2, ensure_ascii=False)}\n\n"
+            f"{self._read_crawl_xml(page_name)}"
+        )
+        response = self._chat(system_prompt, user_prompt)
+        match = re.search(r"\{.*\}", response, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            proposals = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return {}
+        return {str(k): str(v) for k, v in proposals.items() if isinstance(v, str) and v.strip()}
+
+    def generate_manual_tests(
+        self, page_name: str, feature: str, criteria: List[Dict[str, Any]], force: bool = False
+    ) -> str:
         criteria_json = json.dumps(criteria, indent=2, ensure_ascii=False)
         
         # Check if manual tests file already exists
         out_file = MANUAL_TESTS_DIR / f"{page_name.lower()}_manual.json"
+
+        inputs = self._generation_inputs(feature=feature, criteria=fingerprint(criteria))
+        input_fingerprint = fingerprint(inputs)
+        if not force and self.manifest.is_current(page_name, "manual", input_fingerprint, out_file):
+            print(f"[SKIP] {out_file.name} is up to date (feature and criteria unchanged)")
+            return str(out_file)
+
         existing_manual = ""
         if out_file.exists():
             existing_manual = self._read_existing_summary(out_file)
@@ -477,4 +486,5 @@ class TestGenerationAgent:
 
         MANUAL_TESTS_DIR.mkdir(parents=True, exist_ok=True)
         out_file.write_text(manual_json, encoding="utf-8")
+        self.manifest.record(page_name, "manual", input_fingerprint, out_file, inputs)
         return str(out_file)
@@ -0,0 +1,217 @@
+"""
+Per-test results read incrementally from allure-results/*-result.json
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+ALLURE_RESULTS_DIR = MOBILE_TESTS_DIR / "allure-results"
+
+FAILED_STATUSES = ("failed", "broken")
+
+# $('~input-email'), $("id=com.app:id/login"), element ("~Login"), selector "~OK"
+SELECTOR_PATTERNS = (
+    re.compile(r"""\$\$?\(\s*['"`]([^'"`]+)['"`]\s*\)"""),
+    re.compile(r"""element \(\s*["']([^"']+)["']\s*\)"""),
+    re.compile(r"""selector\s*[:=]?\s*["']([^"']+)["']"""),
+)
+
+
+def extract_selectors(texts: Iterable[Optional[str]]) -> List[str]:
+    """Selectors mentioned in failure messages, traces and step names, in first-seen order"""
+    found: Dict[str, None] = {}
+    for text in texts:
+        if not text:
+            continue
+        for pattern in SELECTOR_PATTERNS:
+            for match in pattern.finditer(text):
+                found.setdefault(match.group(1).strip(), None)
+    return list(found)
+
+
+def _walk_steps(steps: List[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    for step in steps or []:
+        yield step
+        yield from _walk_steps(step.get("steps", []))
+
+
+def _label(labels: List[Dict[str, str]], name: str) -> Optional[str]:
+    return next((label.get("value") for label in labels if label.get("name") == name), None)
+
+
+def _spec_name(data: Dict[str, Any]) -> str:
+    """Spec file name when the reporter recorded it, else the top-level suite title"""
+    labels = data.get("labels", [])
+    for candidate in (_label(labels, "package"), _label(labels, "testClass"), data.get("fullName", "").split("#")[0]):
+        if candidate and re.search(r"\.(ts|js)$", candidate):
+            return Path(candidate.replace("file://", "")).name
+    return _label(labels, "parentSuite") or _label(labels, "suite") or "unknown"
+
+
+class TestResult:
+    """One test case from an allure result file"""
+
+    __slots__ = (
+        "uuid", "name", "full_name", "status", "spec", "suite",
+        "start", "stop", "message", "trace", "selectors", "failed_step", "attachments", "result_file",
+    )
+
+    def __init__(self, data: Dict[str, Any], result_file: str = ""):
+        details = data.get("statusDetails") or {}
+        labels = data.get("labels", [])
+        steps = list(_walk_steps(data.get("steps", [])))
+        failed_steps = [s for s in steps if s.get("status") in FAILED_STATUSES]
+
+        self.uuid = data.get("uuid", "")
+        self.name = data.get("name", "")
+        self.full_name = data.get("fullName", "")
+        self.status = data.get("status", "unknown")
+        self.spec = _spec_name(data)
+        self.suite = _label(labels, "suite") or ""
+        self.start = data.get("start")
+        self.stop = data.get("stop")
+        self.message = (details.get("message") or "").strip()
+        self.trace = details.get("trace") or ""
+        self.failed_step = failed_steps[-1].get("name") if failed_steps else None
+        self.selectors = extract_selectors(
+            [self.message, self.trace]
+            + [s.get("name") for s in failed_steps]
+            + [p.get("value") for s in failed_steps for p in s.get("parameters", [])]
+        )
+        self.attachments = [
+            {"name": a.get("name"), "source": a.get("source"), "type": a.get("type")}
+            for step in [data] + steps for a in step.get("attachments", [])
+        ]
+        self.result_file = result_file
+
+    @property
+    def duration_ms(self) -> Optional[int]:
+        if self.start is None or self.stop is None:
+            return None
+        return int(self.stop - self.start)
+
+    @property
+    def failed(self) -> bool:
+        return self.status in FAILED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "full_name": self.full_name,
+            "status": self.status,
+            "spec": self.spec,
+            "suite": self.suite,
+            "duration_ms": self.duration_ms,
+            "message": self.message.splitlines()[0] if self.message else None,
+            "failed_step": self.failed_step,
+            "selectors": self.selectors,
+            "result_file": self.result_file,
+        }
+
+
+def page_for_spec(spec: str) -> Optional[str]:
+    """login.e2e.ts -> login"""
+    match = re.match(r"([\w-]+?)(?:\.e2e)?\.(?:ts|js)$", spec)
+    return match.group(1).lower() if match else None
+
+
+def parse_result_file(path: Path) -> Optional[TestResult]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None  # still being written, or not a result file
+    if not isinstance(data, dict) or "status" not in data:
+        return None
+    return TestResult(data, result_file=Path(path).name)
+
+
+class AllureResultsReader:
+    """Collects the results one run writes, parsing each file only once.
+
+    Only files modified at or after `since` (epoch seconds) are considered, so a
+    reader created just before a run ignores results left over from earlier runs.
+    Call poll() while the run is going (e.g. whenever a spec finishes) and once
+    after it exits.
+    """
+
+    def __init__(self, results_dir: Path = ALLURE_RESULTS_DIR, since: Optional[float] = None):
+        self.results_dir = Path(results_dir)
+        self.since_ns = int((since if since is not None else time.time()) * 1e9) - 1_000_000_000  # mtime granularity
+        self._seen: Dict[str, int] = {}
+        self.results: Dict[str, TestResult] = {}
+
+    def poll(self) -> List[TestResult]:
+        """Parse result files that appeared or changed since the last poll"""
+        if not self.results_dir.exists():
+            return []
+        new_results = []
+        with os.scandir(self.results_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith("-result.json"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if mtime < self.since_ns or self._seen.get(entry.name) == mtime:
+                    continue
+                result = parse_result_file(Path(entry.path))
+                if result is None:
+                    continue  # retry on the next poll
+                self._seen[entry.name] = mtime
+                self.results[result.uuid or entry.name] = result
+                new_results.append(result)
+        return new_results
+
+    def _attempts(self) -> Dict[tuple, List[TestResult]]:
+        """Results grouped per test, oldest attempt first (retries write one file per attempt)"""
+        grouped: Dict[tuple, List[TestResult]] = {}
+        for result in sorted(self.results.values(), key=lambda r: r.start or 0):
+            grouped.setdefault((result.spec, result.full_name or result.name), []).append(result)
+        return grouped
+
+    def latest(self) -> List[TestResult]:
+        """The last attempt of every test"""
+        return [attempts[-1] for attempts in self._attempts().values()]
+
+    def failures(self) -> List[TestResult]:
+        return [r for r in self.latest() if r.failed]
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts by status (last attempt per test) plus per-spec test lists"""
+        counts: Dict[str, int] = {}
+        specs: Dict[str, Dict[str, Any]] = {}
+        retried, flaky = [], []
+        for attempts in self._attempts().values():
+            if len(attempts) > 1:
+                retried.append(attempts[-1].name)
+                if not attempts[-1].failed and any(a.failed for a in attempts):
+                    flaky.append(attempts[-1].name)
+        latest = self.latest()
+        for result in sorted(latest, key=lambda r: (r.spec, r.start or 0)):
+            counts[result.status] = counts.get(result.status, 0) + 1
+            spec = specs.setdefault(result.spec, {"status": "skipped", "duration_ms": 0, "tests": []})
+            spec["tests"].append(result.to_dict())
+            spec["duration_ms"] += result.duration_ms or 0
+            if result.failed:
+                spec["status"] = "failed"
+            elif result.status == "passed" and spec["status"] == "skipped":
+                spec["status"] = "passed"
+        return {
+            "total": len(latest),
+            "passed": counts.get("passed", 0),
+            "failed": counts.get("failed", 0),
+            "broken": counts.get("broken", 0),
+            "skipped": counts.get("skipped", 0),
+            "specs": specs,
+            "failures": [r.to_dict() for r in self.failures()],
+            "retried": retried,
+            "flaky": flaky,  # failed, then passed on retry
+        }
@@ -1,17 +1,41 @@
+import asyncio
+import json
 import os
-import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from adb_crawler import adb_crawl_pages, adb_udid
 from agent import TestGenerationAgent
+from allure_results import AllureResultsReader
+from appium_client import AppiumError, AppiumSession, crawl_current_screen, get_default_pool
+from batch import DEFAULT_WORKERS, generate_all
+from crawl_batch import CRAWL_SPEC, crawl_env, navigation_plan, parse_crawl_result, summarize
+from crawl_cache import crawl_index_cache, get_crawl_index
+from explorer import EXPLORER_MAX_DEPTH, EXPLORER_MAX_SCREENS, EXPLORER_MAX_SECONDS, EXPLORER_MAX_TAPS, explore_app
+from jobs import FINISHED_STATES, Job, job_manager
+from pipeline import GenerationPipeline
+from healing import SelectorHealer, plan_healing
+from impact import get_default_analyzer
+from results_db import MAX_PAGE_SIZE, get_default_results_db
+from run_logs import SPEC_MARKER, RunLog, new_run_id, run_log_store
+from selector_matcher import snapshot_crawl
+from screen_fingerprint import audit_crawls, get_default_screen_index, verify_crawl
+from run_order import RunPlan, blocking_failures, load_stats, plan_run_order, wdio_passes
+from sharding import prepare_shards, shard_report
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Allure result files are re-read during a run at most this often
+RESULTS_POLL_INTERVAL_S = float(os.getenv("RESULTS_POLL_INTERVAL_S", "1"))
 
 app = FastAPI(title="AI Agent for Mobile Webdriver")
 
@@ -39,6 +63,82 @@ class GenerateResponse(BaseModel):
     pom_file: str
     test_file: str
     manual_tests_file: str
+    timings: Optional[Dict[str, float]] = None
+
+
+class BatchGenerateRequest(BaseModel):
+    pages: Optional[List[str]] = None
+    workers: int = DEFAULT_WORKERS
+    force: bool = False
+
+
+class RunTestsRequest(BaseModel):
+    sharded: bool = False  # split specs across every attached device
+    platform: str = "Android"
+    devices: Optional[List[str]] = None  # device ids; default: all detected
+    pages: Optional[List[str]] = None
+    changed_only: bool = False  # only specs whose POMs, crawls or criteria changed since they last passed
+    fail_fast: bool = False  # stop at the first failed test
+
+
+class CrawlBatchRequest(BaseModel):
+    pages: List[str]
+
+
+class ClassifyRequest(BaseModel):
+    source: str  # page source XML, e.g. driver.getPageSource()
+
+
+class AppiumCommandRequest(BaseModel):
+    selector: str  # WebdriverIO syntax: ~accessibility-id, id=..., //xpath, android=...
+    platform: str = "Android"
+    udid: Optional[str] = None
+
+
+class ExploreRequest(BaseModel):
+    platform: str = "Android"
+    udid: Optional[str] = None
+    backend: str = "auto"  # "adb", "appium" or "auto" (adb for a local Android device)
+    max_taps: int = EXPLORER_MAX_TAPS
+    max_seconds: float = EXPLORER_MAX_SECONDS
+    max_screens: int = EXPLORER_MAX_SCREENS
+    max_depth: int = EXPLORER_MAX_DEPTH
+
+
+class HealRequest(BaseModel):
+    run_id: Optional[str] = None
+    pages: Optional[List[str]] = None
+    recrawl: bool = True
+
+
+class JobAccepted(BaseModel):
+    job_id: str
+    type: str
+    status: str
+    status_url: str
+    result_url: str
+
+
+def _accepted(job: Job) -> JobAccepted:
+    return JobAccepted(
+        job_id=job.id,
+        type=job.type,
+        status=job.status,
+        status_url=f"/jobs/{job.id}",
+        result_url=f"/jobs/{job.id}/result",
+    )
+
+
+def _require_api_key() -> str:
+    api_key = OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY environment variable is not set.")
+    return api_key
+
+
+def _require_mobile_tests_dir():
+    if not MOBILE_TESTS_DIR.exists():
+        raise HTTPException(status_code=500, detail=f"mobile-tests directory not found at {MOBILE_TESTS_DIR}")
 
 
 @app.get("/health")
@@ -46,33 +146,43 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/acceptance-criteria", response_model=GenerateResponse)
-async def add_acceptance_criteria(payload: AcceptanceCriteriaPayload) -> GenerateResponse:
+@app.post("/acceptance-criteria", response_model=JobAccepted, status_code=202)
+async def add_acceptance_criteria(payload: AcceptanceCriteriaPayload, force: bool = False) -> JobAccepted:
     """
-    Generate POM, tests, and manual tests using OpenAI.
+    Generate POM, tests, and manual tests using OpenAI, as a background job.
+    Files whose inputs are unchanged since the last generation are kept unless force=true.
+    The job result is a GenerateResponse.
     """
-    api_key = OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY environment variable is not set.")
-
-    # instantiate agent
-    agent = TestGenerationAgent(openai_api_key=api_key)
+    api_key = _require_api_key()
 
     # convert pydantic models to plain dicts for LLM input
     criteria_list = [c.model_dump() for c in payload.acceptanceCriteria]
 
-    # generate files
-    pom_path = agent.generate_pom(page_name=payload.page, criteria=criteria_list)
-    test_path = agent.generate_tests(page_name=payload.page, criteria=criteria_list)
-    manual_path = agent.generate_manual_tests(page_name=payload.page, feature=payload.feature, criteria=criteria_list)
-
-    return GenerateResponse(
-        page=payload.page,
-        feature=payload.feature,
-        pom_file=pom_path,
-        test_file=test_path,
-        manual_tests_file=manual_path,
-    )
+    async def work(job: Job) -> dict:
+        agent = TestGenerationAgent(openai_api_key=api_key)
+        # manual tests run concurrently with POM -> tests
+        result = await GenerationPipeline(agent).run(
+            page_name=payload.page, feature=payload.feature, criteria=criteria_list, force=force
+        )
+        return GenerateResponse(**result).model_dump()
+
+    job = job_manager.submit("generate", work, params={"page": payload.page, "force": force})
+    return _accepted(job)
+
+
+@app.post("/generate-all", response_model=JobAccepted, status_code=202)
+async def generate_all_pages(request: BatchGenerateRequest) -> JobAccepted:
+    """
+    Generate POM, tests and manual tests for every saved acceptance-criteria file, as a background job.
+    """
+    api_key = _require_api_key()
+
+    async def work(job: Job) -> dict:
+        agent = TestGenerationAgent(openai_api_key=api_key)
+        return await generate_all(agent, pages=request.pages, workers=request.workers, force=request.force)
+
+    job = job_manager.submit("generate_all", work, params=request.model_dump())
+    return _accepted(job)
 
 
 @app.get("/manual-tests")
@@ -96,105 +206,640 @@ async def get_manual_tests(page_name: str) -> dict:
     return {"page": page_name, "file": str(file_path), "content": content}
 
 
-@app.post("/run-tests")
-async def run_tests() -> dict:
+@app.post("/run-tests", response_model=JobAccepted, status_code=202)
+async def run_tests(request: Optional[RunTestsRequest] = None) -> JobAccepted:
     """
-    Run WebdriverIO from the mobile-tests folder and collect outputs.
-    """
-    if not MOBILE_TESTS_DIR.exists():
-        raise HTTPException(status_code=500, detail=f"mobile-tests directory not found at {MOBILE_TESTS_DIR}")
+    Run WebdriverIO from the mobile-tests folder as a background job and collect outputs.
 
-    try:
-        result = subprocess.run(
-            ["npx", "wdio", "run", "wdio.conf.ts"],
-            cwd=str(MOBILE_TESTS_DIR),
-            capture_output=True,
-            text=True,
-            check=False,
+    With {"sharded": true} the specs are split across every attached device and run
+    as one concurrent wdio process per device; results are merged into one run.
+    Specs run likely-to-fail and fast first (run_order); flaky specs go last, retried
+    or quarantined per FLAKY_POLICY.
+    """
+    _require_mobile_tests_dir()
+    request = request or RunTestsRequest()
+    loop = asyncio.get_running_loop()
+    analyzer = get_default_analyzer()
+
+    specs: Optional[List[str]] = None  # None: every spec
+    impacted: List[dict] = []
+    if request.changed_only:
+        impacted = await loop.run_in_executor(None, analyzer.impacted)
+        specs = [item["spec"] for item in impacted]
+    if request.pages:
+        wanted = {f"{page.lower()}.e2e.ts" for page in request.pages}
+        specs = [spec for spec in (analyzer.specs() if specs is None else specs) if spec in wanted]
+
+    spec_stats = await loop.run_in_executor(None, load_stats)
+    plan = plan_run_order(analyzer.specs() if specs is None else specs, spec_stats)
+
+    if request.sharded and specs != []:
+        shards = await loop.run_in_executor(
+            None, lambda: prepare_shards(request.platform, request.devices, specs=specs)
+        )
+        if not shards:
+            raise HTTPException(status_code=400, detail=f"No {request.platform} devices or specs to shard.")
+        shard_plans = [plan_run_order(shard.specs, spec_stats) for shard in shards]
+        for shard, shard_plan in zip(shards, shard_plans):
+            shard.specs = shard_plan.ordered + shard_plan.flaky
+    else:
+        shards, shard_plans = [], []
+
+    async def work(job: Job) -> dict:
+        if specs == []:
+            return {"success": True, "returncode": None, "impacted": [], "detail": "No specs affected by changes."}
+        if not plan.ordered and not plan.flaky:
+            return {"success": True, "returncode": None, "detail": "No runnable specs in src/tests."}
+        run_id = new_run_id()
+        # Dependency hashes as of the start of the run, remembered for the specs that pass
+        snapshot = await asyncio.get_running_loop().run_in_executor(None, analyzer.snapshot, plan.ordered + plan.flaky)
+        results = AllureResultsReader(since=time.time())
+        results_lock = asyncio.Lock()
+        last_poll = [0.0]
+        poll_tasks: set = set()
+
+        async def poll_results() -> Dict[str, Any]:
+            """Parse new allure result files in the executor, one poll at a time, and summarise them"""
+            async with results_lock:
+                last_poll[0] = time.monotonic()
+                await asyncio.get_running_loop().run_in_executor(None, results.poll)
+                return results.summary()
+
+        async def run_wdio(args: List[str], run_log: RunLog, env: Optional[Dict[str, str]] = None):
+            # Full output goes to the run log on disk; only tails stay in memory
+            def on_line(stream: str, line: str):
+                run_log.write_line(line, stream)
+                # A spec just finished: pick up its allure result files while the run continues
+                match = SPEC_MARKER.search(line)
+                if match and match.group(1) != "RUNNING" and not results_lock.locked() \
+                        and time.monotonic() - last_poll[0] >= RESULTS_POLL_INTERVAL_S:
+                    last_poll[0] = time.monotonic()
+                    task = asyncio.ensure_future(poll_results())
+                    poll_tasks.add(task)
+                    task.add_done_callback(poll_tasks.discard)
+
+            returncode = None
+            try:
+                returncode, stdout, stderr = await job_manager.run_subprocess(
+                    job, args, cwd=str(MOBILE_TESTS_DIR), env=env, on_line=on_line
+                )
+            finally:
+                run_log.close(returncode)
+                run_log_store.prune()
+            return returncode, stdout, stderr
+
+        async def run_passes(run_plan: RunPlan, log_id: str, env: Dict[str, str], config_file: str = "wdio.conf.ts",
+                             meta: Optional[Dict[str, Any]] = None):
+            """The plan's wdio passes in order: (returncode of the required passes, stdout, stderr, run logs)"""
+            pass_logs: List[RunLog] = []
+            returncode, stdout, stderr = 0, "", ""
+            for wdio_pass in wdio_passes(run_plan, request.fail_fast):
+                if request.fail_fast and (returncode != 0 or blocking_failures(await poll_results(), plan)):
+                    break
+                run_log = RunLog(
+                    "run_tests",
+                    run_id=log_id if wdio_pass.name == "main" else f"{log_id}-{wdio_pass.name}",
+                    meta={"job_id": job.id, **(meta or {}), "pass": wdio_pass.name, "specs": wdio_pass.specs},
+                )
+                pass_logs.append(run_log)
+                pass_rc, stdout, stderr = await run_wdio(
+                    wdio_pass.command(config_file=config_file), run_log, {**env, **wdio_pass.env}
+                )
+                if wdio_pass.required and pass_rc != 0:
+                    returncode = pass_rc
+            return returncode, stdout, stderr, pass_logs
+
+        if shards:
+            # One wdio process per device at a time, each logging to <run_id>-s<n>[-flaky]
+            envs = await asyncio.get_running_loop().run_in_executor(None, lambda: [shard.env() for shard in shards])
+            outcomes = await asyncio.gather(*(
+                run_passes(shard_plan, f"{run_id}-s{shard.index}", env, shard.config_file, shard.to_dict())
+                for shard, shard_plan, env in zip(shards, shard_plans, envs)
+            ))
+            returncodes = [outcome[0] for outcome in outcomes]
+            returncode = max(returncodes, key=lambda rc: rc != 0)
+            stdout = "\n".join(f"[{s.label}] {o[1][-500:]}" for s, o in zip(shards, outcomes))
+            stderr = "\n".join(f"[{s.label}] {o[2][-500:]}" for s, o in zip(shards, outcomes))
+            run_logs = [run_log for outcome in outcomes for run_log in outcome[3]]
+        else:
+            returncode, stdout, stderr, run_logs = await run_passes(plan, run_id, dict(os.environ))
+        tests = await poll_results()
+        # Keep history queryable without re-reading allure-results
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: get_default_results_db().ingest(run_id=run_id)
         )
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to start test run: {exc}")
+        analyzer.record_passed(snapshot, tests)
+
+        # Optionally generate allure HTML report (if allure installed)
+        try:
+            await job_manager.run_subprocess(
+                job,
+                ["npx", "allure", "generate", "./allure-results", "--clean", "-o", "./allure-report"],
+                cwd=str(MOBILE_TESTS_DIR),
+            )
+        except OSError:
+            # ignore report generation failures for now
+            pass
+
+        result = {
+            "success": returncode == 0 and not blocking_failures(tests, plan),
+            "returncode": returncode,
+            "tests": tests,
+            "stdout": stdout[-2000:],
+            "stderr": stderr[-2000:],
+            "allure_report_dir": str(MOBILE_TESTS_DIR / "allure-report"),
+            "order": plan.to_dict(),
+        }
+        if request.changed_only:
+            result["impacted"] = impacted
+        if shards:
+            result["run_id"] = run_id
+            result["shards"] = shard_report(shards, tests, returncodes)
+            result["run_logs"] = [run_log.summary() for run_log in run_logs]
+        elif run_logs:
+            result.update(run_logs[0].summary())
+            if len(run_logs) > 1:
+                result["run_logs"] = [run_log.summary() for run_log in run_logs]
+        return result
+
+    params = request.model_dump()
+    params["order"] = plan.to_dict()
+    if shards:
+        params["shards"] = [shard.to_dict() for shard in shards]
+    job = job_manager.submit("run_tests", work, params)
+    return _accepted(job)
+
+
+async def _run_crawl_batch(job: Job, pages: List[str]) -> dict:
+    """Crawl several pages inside a job (adb where it can, the rest in one wdio session) and index each saved XML"""
+    loop = asyncio.get_running_loop()
+    plan = await loop.run_in_executor(None, navigation_plan, pages)
+    started = time.monotonic()
+    page_results: Dict[str, dict] = {}
+
+    # Fast path for a local Android device: uiautomator dumps over adb, no Appium session
+    udid = await loop.run_in_executor(None, adb_udid)
+    if udid:
+        page_results.update(await loop.run_in_executor(None, lambda: adb_crawl_pages(pages, udid, plan)))
+        for result in page_results.values():
+            await job.add_output("stdout", f"CRAWL_RESULT {json.dumps(result)}")
+    remaining = [page for page in pages if page not in page_results]
+
+    returncode, stdout, stderr = 0, "", ""
+    run_log = None
+    if remaining:
+        # Keep the old crawls so broken selectors can be matched locally later
+        for page in remaining:
+            snapshot_crawl(page)
+
+        run_log = RunLog("crawl", meta={"job_id": job.id, "pages": remaining})
+
+        def on_line(stream: str, line: str):
+            run_log.write_line(line, stream)
+            result = parse_crawl_result(line)
+            if result and result.get("page") in remaining:
+                page_results[result["page"]] = {**result, "backend": "wdio"}
+
+        returncode = None
+        try:
+            returncode, stdout, stderr = await job_manager.run_subprocess(
+                job,
+                ["npx", "wdio", "run", "wdio.conf.ts", "--spec", CRAWL_SPEC],
+                cwd=str(MOBILE_TESTS_DIR),
+                env=crawl_env(remaining, plan),
+                on_line=on_line,
+            )
+        finally:
+            run_log.close(returncode)
+            run_log_store.prune()
+    summary = summarize(pages, page_results, (time.monotonic() - started) * 1000)
+
+    # Warm the shared crawl index cache so the next generation call skips parsing
+    for page in summary["succeeded"]:
+        crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page}.xml"
+        try:
+            if "element_count" not in summary["pages"][page]:
+                index = await loop.run_in_executor(None, get_crawl_index, crawl_file)
+                summary["pages"][page]["element_count"] = len(index)
+            # Does the saved screen look like this page, or like another known one?
+            verdict = await loop.run_in_executor(None, verify_crawl, page)
+            summary["pages"][page].update({k: v for k, v in verdict.items() if k != "page"})
+        except Exception:
+            pass
 
-    success = result.returncode == 0
+    return {
+        "success": returncode == 0 and not summary["failed"],
+        "returncode": returncode,
+        "stdout": stdout[-2000:],
+        "stderr": stderr[-2000:],
+        "navigation_plan": plan,
+        "adb_device": udid,
+        "misfiled": [page for page in summary["succeeded"] if summary["pages"][page].get("verified") is False],
+        **summary,
+        **(run_log.summary() if run_log else {}),
+    }
 
-    # Optionally generate allure HTML report (if allure installed)
-    try:
-        subprocess.run(
-            ["npx", "allure", "generate", "./allure-results", "--clean", "-o", "./allure-report"],
-            cwd=str(MOBILE_TESTS_DIR),
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-    except Exception:
-        # ignore report generation failures for now
-        pass
 
+async def _run_crawl(job: Job, page: str) -> dict:
+    """Run the crawler spec for one page inside a job and index the saved XML"""
+    batch = await _run_crawl_batch(job, [page])
+    page_result = batch["pages"][page]
     return {
-        "success": success,
-        "returncode": result.returncode,
-        "stdout": result.stdout[-2000:],
-        "stderr": result.stderr[-2000:],
-        "allure_report_dir": str(MOBILE_TESTS_DIR / "allure-report"),
+        **{k: v for k, v in batch.items() if k not in ("pages", "succeeded", "failed")},
+        "success": batch["returncode"] == 0 and page_result.get("ok", False),
+        "crawl_file": str(MOBILE_TESTS_DIR / "crawls" / f"{page}.xml"),
+        "element_count": page_result.get("element_count"),
+        "timing": page_result,
     }
 
 
-@app.post("/crawl-page")
-async def crawl_page(page: str) -> dict:
+@app.post("/crawl-page", response_model=JobAccepted, status_code=202)
+async def crawl_page(page: str) -> JobAccepted:
     """
-    Run the crawler spec (driver.getPageSource()) to capture page XML.
+    Capture page XML as a background job: a uiautomator dump over adb for a local Android
+    device when the page is reachable that way, else the crawler spec (driver.getPageSource()).
     """
-    if not MOBILE_TESTS_DIR.exists():
-        raise HTTPException(status_code=500, detail=f"mobile-tests directory not found at {MOBILE_TESTS_DIR}")
+    _require_mobile_tests_dir()
+
+    async def work(job: Job) -> dict:
+        return await _run_crawl(job, page)
+
+    job = job_manager.submit("crawl", work, params={"page": page})
+    return _accepted(job)
+
+
+@app.post("/crawl-pages", response_model=JobAccepted, status_code=202)
+async def crawl_pages(request: CrawlBatchRequest) -> JobAccepted:
+    """
+    Crawl several pages in one Appium session as a background job: one crawls/{page}.xml
+    each, with per-page timing; a page that fails does not stop the others.
+    """
+    _require_mobile_tests_dir()
+    pages = [page.strip() for page in request.pages if page.strip()]
+    if not pages:
+        raise HTTPException(status_code=400, detail="No pages given.")
+
+    async def work(job: Job) -> dict:
+        return await _run_crawl_batch(job, pages)
+
+    job = job_manager.submit("crawl", work, params={"pages": pages})
+    return _accepted(job)
 
-    env = os.environ.copy()
-    env["CRAWL_PAGE_NAME"] = page
 
+@app.post("/crawls/classify")
+async def classify_screen(request: ClassifyRequest) -> dict:
+    """Which known screen (crawls/*.xml) a page source shows, by structural fingerprint"""
+    _require_mobile_tests_dir()
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(None, get_default_screen_index)
     try:
-        result = subprocess.run(
-            ["npx", "wdio", "run", "wdio.conf.ts", "--spec", "./src/tests/crawl-page.e2e.ts"],
-            cwd=str(MOBILE_TESTS_DIR),
-            capture_output=True,
-            text=True,
-            check=False,
-            env=env,
-        )
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to start crawl: {exc}")
+        return index.classify(request.source)
+    except ET.ParseError as e:
+        raise HTTPException(status_code=400, detail=f"Page source is not valid XML: {e}")
 
-    success = result.returncode == 0
-    crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page}.xml"
 
+@app.get("/crawls/verify")
+async def verify_crawls() -> dict:
+    """
+    Check every saved crawl: misfiled (looks like another known screen), near duplicates,
+    and the known screen an unknown.xml crawl shows.
+    """
+    _require_mobile_tests_dir()
+    crawls = await asyncio.get_running_loop().run_in_executor(None, audit_crawls)
     return {
-        "success": success,
-        "returncode": result.returncode,
-        "stdout": result.stdout[-2000:],
-        "stderr": result.stderr[-2000:],
-        "crawl_file": str(crawl_file),
+        "crawls": crawls,
+        "misfiled": [c["page"] for c in crawls if c.get("verified") is False],
+        "duplicates": [c["page"] for c in crawls if c.get("duplicate_of")],
     }
 
 
-@app.post("/auto-heal")
-async def auto_heal() -> dict:
+async def _with_appium_session(platform: str, udid: Optional[str], fn: Callable[[AppiumSession], Any]) -> Any:
+    """Run fn on the device's pooled Appium session in a worker thread; Appium errors become HTTP errors"""
+    device = {"id": udid} if udid else None
+
+    def call():
+        with get_default_pool().session(platform, device) as session:
+            return fn(session)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+    except AppiumError as e:
+        if e.status == 0:
+            raise HTTPException(status_code=503, detail=f"Appium unreachable: {e}")
+        if e.error == "no such element":
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=502, detail=f"Appium error: {e}")
+
+
+@app.get("/appium/sessions")
+async def appium_sessions() -> dict:
+    """Warm Appium sessions in the pool, with reuse counters"""
+    return get_default_pool().status()
+
+
+@app.delete("/appium/sessions")
+async def close_appium_sessions() -> dict:
+    pool = get_default_pool()
+    await asyncio.get_running_loop().run_in_executor(None, pool.close)
+    return pool.status()
+
+
+@app.get("/appium/source")
+async def appium_source(platform: str = "Android", udid: Optional[str] = None) -> Response:
+    """Page source of the current screen, straight from a warm session (no wdio run)"""
+    source = await _with_appium_session(platform, udid, lambda session: session.get_page_source())
+    return Response(content=source, media_type="application/xml")
+
+
+@app.get("/appium/screen")
+async def appium_screen(platform: str = "Android", udid: Optional[str] = None) -> dict:
+    """Which known screen the app shows right now (e.g. to check a navigation landed where expected)"""
+    _require_mobile_tests_dir()
+    source = await _with_appium_session(platform, udid, lambda session: session.get_page_source())
+    index = await asyncio.get_running_loop().run_in_executor(None, get_default_screen_index)
+    return index.classify(source)
+
+
+@app.post("/appium/crawl")
+async def appium_crawl(page: str, platform: str = "Android", udid: Optional[str] = None) -> dict:
     """
-    Minimal auto-healing: regenerate POM for a sample page (login).
-    Extend to parse allure-results and map failing tests to pages.
+    Save the current screen as crawls/{page}.xml from a warm session. Unlike /crawl-page
+    this does not navigate: the app must already show the page.
     """
-    api_key = OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY environment variable is not set.")
+    _require_mobile_tests_dir()
+    return await _with_appium_session(platform, udid, lambda session: crawl_current_screen(session, page))
 
-    agent = TestGenerationAgent(openai_api_key=api_key)
 
-    dummy_criteria = [
-        {
-            "id": "AUTOHEAL_SAMPLE",
-            "description": "Regenerate POM to attempt auto-healing of failing selectors.",
-        }
-    ]
-    pom_path = agent.generate_pom(page_name="login", criteria=dummy_criteria)
+@app.post("/appium/find")
+async def appium_find(request: AppiumCommandRequest) -> dict:
+    """Whether a selector matches on the current screen, and how many elements it matches"""
+    elements = await _with_appium_session(request.platform, request.udid, lambda session: session.find_all(request.selector))
+    return {"selector": request.selector, "found": bool(elements), "count": len(elements), "elements": elements}
+
+
+@app.post("/appium/tap")
+async def appium_tap(request: AppiumCommandRequest) -> dict:
+    element = await _with_appium_session(request.platform, request.udid, lambda session: session.tap(request.selector))
+    return {"selector": request.selector, "element": element}
+
+
+@app.get("/appium/screenshot")
+async def appium_screenshot(platform: str = "Android", udid: Optional[str] = None) -> Response:
+    png = await _with_appium_session(platform, udid, lambda session: session.screenshot())
+    return Response(content=png, media_type="image/png")
 
+
+@app.post("/explore", response_model=JobAccepted, status_code=202)
+async def explore(request: ExploreRequest) -> JobAccepted:
+    """
+    Explore the app breadth-first from its launch screen as a background job: a crawl
+    for every new screen and a recorded transition for each tap that reached one.
+    """
+    _require_mobile_tests_dir()
+
+    async def work(job: Job) -> dict:
+        loop = asyncio.get_running_loop()
+        stop_event = threading.Event()
+
+        def log(line: str):
+            asyncio.run_coroutine_threadsafe(job.add_output("stdout", line), loop)
+
+        try:
+            return await loop.run_in_executor(None, lambda: explore_app(
+                request.platform,
+                {"id": request.udid} if request.udid else None,
+                request.backend,
+                max_taps=request.max_taps,
+                max_seconds=request.max_seconds,
+                max_screens=request.max_screens,
+                max_depth=request.max_depth,
+                stop_event=stop_event,
+                log=log,
+            ))
+        except asyncio.CancelledError:
+            stop_event.set()  # the explorer thread stops after its current tap
+            raise
+
+    job = job_manager.submit("explore", work, params=request.model_dump())
+    return _accepted(job)
+
+
+@app.get("/impact")
+async def impact() -> dict:
+    """Specs a changed_only run would execute, with why, plus the spec dependency graph"""
+    analyzer = get_default_analyzer()
+    loop = asyncio.get_running_loop()
+    impacted = await loop.run_in_executor(None, analyzer.impacted)
+    graph = await loop.run_in_executor(None, analyzer.graph)
+    return {"impacted": impacted, "graph": graph}
+
+
+@app.get("/crawl-cache")
+async def crawl_cache_stats() -> dict:
+    return crawl_index_cache.stats()
+
+
+@app.get("/results/runs")
+async def list_result_runs(limit: int = 50, offset: int = 0) -> dict:
+    """Ingested test runs with pass/fail counts, newest first"""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: get_default_results_db().runs(limit=limit, offset=offset)
+    )
+
+
+@app.get("/results/specs")
+async def spec_stats(runs: int = 20) -> dict:
+    """Per-spec duration, failure rate and flaky tests, in the order the next run would use"""
+    stats = await asyncio.get_running_loop().run_in_executor(None, lambda: load_stats(last_runs=runs))
+    plan = plan_run_order(get_default_analyzer().specs(), stats)
     return {
-        "message": "Auto-heal executed in minimal mode. Extend this to use real failure data.",
-        "regenerated_pom": pom_path,
+        "order": plan.to_dict(),
+        "specs": [stats[spec].to_dict() for spec in plan.ordered + plan.flaky if spec in stats],
     }
+
+
+@app.get("/results/failures")
+async def list_failures(
+    page: Optional[str] = None,
+    test: Optional[str] = None,
+    selector: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    last_runs: Optional[int] = None,
+    run_id: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> dict:
+    """
+    Failed and broken tests, newest first. Filter by page, test name (substring), selector,
+    time range (epoch seconds), run or the last N runs; paginate with limit/offset.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, lambda: get_default_results_db().failures(
+        page=page, test=test, selector=selector, since=since, until=until,
+        last_runs=last_runs, run_id=run_id, limit=limit, offset=offset,
+    ))
+
+
+@app.post("/results/ingest")
+async def ingest_results() -> dict:
+    """Load allure-results files not yet in the database (e.g. from runs started outside the API)"""
+    return await asyncio.get_running_loop().run_in_executor(None, lambda: get_default_results_db().ingest())
+
+
+@app.get("/results/{uuid}")
+async def get_result(uuid: str) -> dict:
+    result = await asyncio.get_running_loop().run_in_executor(None, lambda: get_default_results_db().result(uuid))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Result {uuid} not found.")
+    return result
+
+
+@app.get("/runs")
+async def list_runs(kind: Optional[str] = None, limit: int = 50) -> List[dict]:
+    """Past wdio runs (tests and crawls), newest first"""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: run_log_store.list_runs(kind=kind, limit=limit)
+    )
+
+
+@app.get("/runs/search")
+async def search_runs(q: str, regex: bool = False, kind: Optional[str] = None, runs: int = 20, limit: int = 100) -> List[dict]:
+    """Lines matching q across the newest `runs` logs, with the spec that produced them"""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: run_log_store.search(q, regex=regex, kind=kind, runs=runs, limit=limit)
+    )
+
+
+def _get_run(run_id: str) -> dict:
+    index = run_log_store.index(run_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found.")
+    return index
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str) -> dict:
+    index = await asyncio.get_running_loop().run_in_executor(None, _get_run, run_id)
+    index.pop("checkpoints", None)
+    return index
+
+
+@app.get("/runs/{run_id}/log")
+async def get_run_log(run_id: str, start: int = 0, count: int = 200, spec: Optional[str] = None) -> dict:
+    """A page of log lines, or the lines of one spec"""
+    count = min(max(count, 1), 5000)
+
+    def read() -> List[dict]:
+        _get_run(run_id)
+        if spec:
+            return run_log_store.spec_lines(run_id, spec, count=count)
+        return run_log_store.read_lines(run_id, start=start, count=count)
+
+    lines = await asyncio.get_running_loop().run_in_executor(None, read)
+    return {"run_id": run_id, "start": lines[0]["line"] if lines else start, "lines": lines}
+
+
+@app.post("/auto-heal", response_model=JobAccepted, status_code=202)
+async def auto_heal(request: Optional[HealRequest] = None) -> JobAccepted:
+    """
+    Failure-driven healing, as a background job: map failed tests of a run (default:
+    the latest) to the POM getters they used, re-crawl only those pages and patch only
+    the getters whose selector disappeared.
+    """
+    api_key = _require_api_key()
+    request = request or HealRequest()
+
+    async def work(job: Job) -> dict:
+        loop = asyncio.get_running_loop()
+        db = get_default_results_db()
+        failures = await loop.run_in_executor(None, lambda: db.failures(
+            run_id=request.run_id, last_runs=None if request.run_id else 1, limit=MAX_PAGE_SIZE
+        )["items"])
+        plan = plan_healing(failures)
+        if request.pages:
+            wanted = {p.lower() for p in request.pages}
+            plan = {page: broken for page, broken in plan.items() if page in wanted}
+        if not plan:
+            return {"failures": len(failures), "pages": [], "message": "No failed test maps to a POM getter."}
+
+        agent = TestGenerationAgent(openai_api_key=api_key)
+        healer = SelectorHealer(agent.propose_selector_replacements)
+        reports = []
+        crawl = None
+        if request.recrawl:
+            # All affected pages in one session
+            crawl = await _run_crawl_batch(job, list(plan))
+        for page, broken in plan.items():
+            if crawl is not None and page not in crawl["succeeded"]:
+                reports.append({"page": page, "error": "Re-crawl failed", "run_id": crawl["run_id"]})
+                continue
+            reports.append(await loop.run_in_executor(None, healer.heal_page, page, broken))
+        return {"failures": len(failures), "pages": reports}
+
+    job = job_manager.submit("auto_heal", work, params=request.model_dump())
+    return _accepted(job)
+
+
+@app.get("/jobs")
+async def list_jobs(type: Optional[str] = None, status: Optional[str] = None) -> List[dict]:
+    return [job.to_dict() for job in job_manager.list(job_type=type, status=status)]
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict:
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> dict:
+    """Result of a finished job; 409 while it is still queued or running"""
+    job = _get_job(job_id)
+    if job.status not in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}.")
+    return job.to_dict(include_result=True)
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job_output(
+    job_id: str,
+    since: int = 0,
+    last_event_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Server-Sent Events: one `output` event per wdio stdout/stderr line while the job
+    runs, then an `end` event with the final status. Reconnecting clients resume
+    after Last-Event-ID (or ?since=<line number>).
+    """
+    job = _get_job(job_id)
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id) + 1
+
+    async def events():
+        async for entry in job_manager.follow(job, since=since):
+            if entry is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps({"stream": entry["stream"], "line": entry["line"]}, ensure_ascii=False)
+            yield f"id: {entry['seq']}\nevent: output\ndata: {data}\n\n"
+        yield f"event: end\ndata: {json.dumps(job.to_dict())}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> dict:
+    """Cancel a job; a running wdio process is killed together with its process group"""
+    _get_job(job_id)
+    job = await job_manager.cancel(job_id)
+    return job.to_dict()
@@ -0,0 +1,413 @@
+"""
+Minimal W3C WebDriver client for Appium with a pool of warm sessions per device
+
+Page sources, element lookups, taps and screenshots go straight to Appium over
+keep-alive HTTP connections instead of through Node, wdio and a spec run.
+"""
+
+import base64
+import http.client
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from crawl_cache import get_crawl_index
+from device_manager import platform_version
+from selector_matcher import snapshot_crawl
+from wait_strategy import detect_app_id
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+# Session ids survive the process so short-lived CLI calls can reattach to a warm session
+SESSIONS_FILE = MOBILE_TESTS_DIR / ".appium-sessions.json"
+
+APPIUM_URL = os.getenv("APPIUM_URL", "http://127.0.0.1:4723")
+APPIUM_TIMEOUT_S = float(os.getenv("APPIUM_TIMEOUT_S", "120"))
+# Sessions idle longer than this are dropped by Appium (newCommandTimeout) and by the pool
+SESSION_IDLE_S = int(os.getenv("APPIUM_SESSION_IDLE_S", "600"))
+# Sessions older than this are recycled on their next use
+SESSION_MAX_AGE_S = int(os.getenv("APPIUM_SESSION_MAX_AGE_S", "3600"))
+# A pooled session is health-checked before reuse unless a command succeeded this recently
+SESSION_CHECK_AFTER_S = float(os.getenv("APPIUM_SESSION_CHECK_AFTER_S", "10"))
+
+W3C_ELEMENT_KEY = "element-6066-11e4-a52f-4a21ba6e2c4f"
+
+
+class AppiumError(Exception):
+    """A WebDriver error response, or Appium being unreachable (status 0)"""
+
+    def __init__(self, status: int, error: str, message: str = ""):
+        super().__init__(f"{error}: {message}" if message else error)
+        self.status = status
+        self.error = error
+        self.message = message
+
+    @property
+    def session_gone(self) -> bool:
+        return self.status == 0 or self.error in ("invalid session id", "session not created")
+
+
+class AppiumConnection:
+    """One keep-alive HTTP connection to an Appium server; not shared between threads"""
+
+    def __init__(self, base_url: str = APPIUM_URL, timeout: float = APPIUM_TIMEOUT_S):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a command and return its "value"; raises AppiumError on WebDriver errors"""
+        payload = json.dumps(body if body is not None else {}).encode("utf-8") if method == "POST" else None
+        headers = {"Content-Type": "application/json; charset=utf-8", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn = self._connect()
+            try:
+                conn.request(method, self.prefix + path, body=payload, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError) as e:
+                # The server closed an idle keep-alive connection: reconnect once
+                self.close()
+                if attempt:
+                    raise AppiumError(0, "connection failed", str(e)) from e
+            except OSError as e:
+                self.close()
+                raise AppiumError(0, "connection failed", str(e)) from e
+        try:
+            data = json.loads(raw or b"{}")
+        except ValueError:
+            raise AppiumError(response.status, "invalid response", raw[:200].decode("utf-8", "replace"))
+        value = data.get("value") if isinstance(data, dict) else None
+        if response.status >= 400:
+            value = value if isinstance(value, dict) else {}
+            raise AppiumError(response.status, value.get("error", "unknown error"), value.get("message", ""))
+        return value
+
+
+def parse_selector(selector: str) -> Tuple[str, str]:
+    """WebdriverIO selector string -> (W3C/Appium locator strategy, value)"""
+    if selector.startswith("~"):
+        return "accessibility id", selector[1:]
+    if selector.startswith("id="):
+        return "id", selector[3:]
+    if selector.startswith("android="):
+        return "-android uiautomator", selector[len("android="):]
+    if selector.startswith("-ios predicate string:"):
+        return "-ios predicate string", selector[len("-ios predicate string:"):]
+    if selector.startswith("-ios class chain:"):
+        return "-ios class chain", selector[len("-ios class chain:"):]
+    if selector.startswith(("/", "(", "./")):
+        return "xpath", selector
+    return "class name", selector
+
+
+class AppiumSession:
+    """A live Appium session; commands go over its own keep-alive connection"""
+
+    def __init__(self, connection: AppiumConnection, session_id: str, capabilities: Dict[str, Any], key: str,
+                 created_at: Optional[float] = None):
+        self.connection = connection
+        self.session_id = session_id
+        self.capabilities = capabilities
+        self.key = key
+        self.created_at = created_at or time.time()
+        self.last_used = time.time()
+        self.last_ok = self.last_used  # last command Appium answered without a session error
+        self.commands = 0
+
+    def command(self, method: str, path: str = "", body: Optional[Dict[str, Any]] = None) -> Any:
+        self.last_used = time.time()
+        self.commands += 1
+        value = self.connection.request(method, f"/session/{self.session_id}{path}", body)
+        self.last_ok = time.time()
+        return value
+
+    def is_alive(self) -> bool:
+        """Cheap round trip that fails once Appium has dropped the session"""
+        try:
+            self.command("GET", "/timeouts")
+            return True
+        except AppiumError:
+            return False
+
+    def get_page_source(self) -> str:
+        return self.command("GET", "/source")
+
+    def find(self, selector: str) -> str:
+        """Element id of the first match; raises AppiumError ("no such element") when absent"""
+        using, value = parse_selector(selector)
+        element = self.command("POST", "/element", {"using": using, "value": value})
+        return element[W3C_ELEMENT_KEY] if W3C_ELEMENT_KEY in element else element["ELEMENT"]
+
+    def find_all(self, selector: str) -> List[str]:
+        using, value = parse_selector(selector)
+        elements = self.command("POST", "/elements", {"using": using, "value": value})
+        return [e.get(W3C_ELEMENT_KEY) or e.get("ELEMENT") for e in elements]
+
+    def tap(self, selector_or_element: str, element: bool = False) -> str:
+        """Click an element given a selector (or an element id with element=True); returns the element id"""
+        element_id = selector_or_element if element else self.find(selector_or_element)
+        self.command("POST", f"/element/{element_id}/click")
+        return element_id
+
+    def back(self):
+        self.command("POST", "/back")
+
+    def restart_app(self, app_id: Optional[str] = None):
+        """Terminate and re-activate the app under test, back on its launch screen, in the same session"""
+        app_id = app_id or self.capabilities.get("appium:appPackage") or self.capabilities.get("appPackage") \
+            or self.capabilities.get("appium:bundleId") or self.capabilities.get("bundleId") or detect_app_id()
+        if not app_id:
+            raise AppiumError(0, "unknown app", "set APP_PACKAGE or BUNDLE_ID")
+        self.command("POST", "/appium/device/terminate_app", {"appId": app_id})
+        self.command("POST", "/appium/device/activate_app", {"appId": app_id})
+
+    def screenshot(self) -> bytes:
+        """PNG bytes of the current screen"""
+        return base64.b64decode(self.command("GET", "/screenshot"))
+
+    def quit(self):
+        try:
+            self.command("DELETE")
+        except AppiumError:
+            pass
+        self.connection.close()
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "key": self.key,
+            "session_id": self.session_id,
+            "age_s": round(now - self.created_at, 1),
+            "idle_s": round(now - self.last_used, 1),
+            "commands": self.commands,
+        }
+
+
+def default_capabilities(platform: str = "android", device: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Capabilities for a session on the app already installed on the device (no reinstall, no reset)"""
+    device = device or {}
+    ios = platform.lower() == "ios"
+    caps: Dict[str, Any] = {
+        "platformName": "iOS" if ios else "Android",
+        "appium:automationName": "XCUITest" if ios else "UiAutomator2",
+        "appium:noReset": True,
+        "appium:newCommandTimeout": SESSION_IDLE_S,
+    }
+    udid = device.get("id") or os.getenv("DEVICE_UDID")
+    if udid:
+        caps["appium:udid"] = udid
+    if device.get("name"):
+        caps["appium:deviceName"] = device["name"]
+    version = platform_version(device)
+    if version:
+        caps["appium:platformVersion"] = version
+    app_id = detect_app_id()
+    if app_id:
+        if ios:
+            caps["appium:bundleId"] = os.getenv("BUNDLE_ID") or app_id
+        else:
+            caps["appium:appPackage"] = app_id
+            caps["appium:appActivity"] = os.getenv("APP_ACTIVITY", ".MainActivity")
+    return caps
+
+
+class AppiumSessionPool:
+    """At most one warm session per device key, reused until it fails a health check or ages out.
+
+    A device runs one Appium session at a time, so `session()` also serialises
+    callers per device. Session ids are written to `state_file` so another process
+    (the next CLI call) can reattach instead of paying for a new session.
+    """
+
+    def __init__(
+        self,
+        base_url: str = APPIUM_URL,
+        state_file: Optional[Path] = SESSIONS_FILE,
+        max_age_s: float = SESSION_MAX_AGE_S,
+        idle_s: float = SESSION_IDLE_S,
+    ):
+        self.base_url = base_url
+        self.state_file = Path(state_file) if state_file else None
+        self.max_age_s = max_age_s
+        self.idle_s = idle_s
+        self._sessions: Dict[str, AppiumSession] = {}
+        self._device_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def _device_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._device_locks.setdefault(key, threading.Lock())
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not self.state_file:
+            return {}
+        try:
+            return json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, key: str):
+        """Record (or forget, once it left the pool) the session for one device key"""
+        if not self.state_file:
+            return
+        with self._lock:
+            data = self._load_state()
+            session = self._sessions.get(key)
+            if session is None:
+                data.pop(key, None)
+            else:
+                data[key] = {
+                    "base_url": self.base_url,
+                    "session_id": session.session_id,
+                    "created_at": session.created_at,
+                    "capabilities": session.capabilities,
+                }
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.state_file)
+
+    def _expired(self, session: AppiumSession) -> bool:
+        now = time.time()
+        return now - session.created_at > self.max_age_s or now - session.last_used > self.idle_s
+
+    def _reattach(self, key: str) -> Optional[AppiumSession]:
+        entry = self._load_state().get(key)
+        if not entry or entry.get("base_url") != self.base_url:
+            return None
+        session = AppiumSession(
+            AppiumConnection(self.base_url), entry["session_id"], entry.get("capabilities", {}), key,
+            created_at=entry.get("created_at"),
+        )
+        session.last_used = time.time()  # idle time is only tracked in-process; Appium enforces its own
+        session.last_ok = 0.0  # unknown until checked
+        return session
+
+    def _create(self, key: str, capabilities: Dict[str, Any]) -> AppiumSession:
+        connection = AppiumConnection(self.base_url)
+        value = connection.request("POST", "/session", {"capabilities": {"alwaysMatch": capabilities, "firstMatch": [{}]}})
+        session = AppiumSession(connection, value["sessionId"], value.get("capabilities", {}), key)
+        self.created += 1
+        return session
+
+    def _get(self, key: str, capabilities: Dict[str, Any]) -> AppiumSession:
+        session = self._sessions.get(key) or self._reattach(key)
+        if session is not None:
+            recently_ok = time.time() - session.last_ok < SESSION_CHECK_AFTER_S
+            if not self._expired(session) and (recently_ok or session.is_alive()):
+                self.reused += 1
+                self._sessions[key] = session
+                return session
+            self.recycled += 1
+            session.quit()
+            self._sessions.pop(key, None)
+        session = self._create(key, capabilities)
+        self._sessions[key] = session
+        self._save_state(key)
+        return session
+
+    @contextmanager
+    def session(
+        self,
+        platform: str = "android",
+        device: Optional[Dict[str, str]] = None,
+        capabilities: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[AppiumSession]:
+        """Exclusive use of the device's warm session (created on first use).
+
+        A session that raises "invalid session id" or loses its connection is
+        discarded so the next call starts a fresh one.
+        """
+        device = device or {}
+        key = f"{platform.lower()}:{device.get('id') or os.getenv('DEVICE_UDID') or 'default'}"
+        with self._device_lock(key):
+            session = self._get(key, capabilities or default_capabilities(platform, device))
+            try:
+                yield session
+            except AppiumError as e:
+                if e.session_gone:
+                    session.connection.close()
+                    self._sessions.pop(key, None)
+                    self._save_state(key)
+                raise
+
+    def close(self, key: Optional[str] = None):
+        """Quit pooled sessions (one device, or all of them, including ones other processes left warm)"""
+        if key:
+            names = [key]
+        else:
+            stored = [k for k, v in self._load_state().items() if v.get("base_url") == self.base_url]
+            names = list(dict.fromkeys(list(self._sessions) + stored))
+        for name in names:
+            with self._device_lock(name):
+                session = self._sessions.pop(name, None) or self._reattach(name)
+                if session is not None:
+                    session.quit()
+                self._save_state(name)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "appium_url": self.base_url,
+            "sessions": [s.to_dict() for s in self._sessions.values()],
+            "created": self.created,
+            "reused": self.reused,
+            "recycled": self.recycled,
+        }
+
+
+def crawl_current_screen(session: AppiumSession, page: str, crawls_dir: Path = CRAWLS_DIR) -> Dict[str, Any]:
+    """Save the screen the session is on as crawls/{page}.xml (the previous crawl is kept for healing)"""
+    started = time.monotonic()
+    source = session.get_page_source()
+    snapshot_crawl(page, crawls_dir)
+    crawl_file = Path(crawls_dir) / f"{page}.xml"
+    crawl_file.parent.mkdir(parents=True, exist_ok=True)
+    crawl_file.write_text(source, encoding="utf-8")
+    index = get_crawl_index(crawl_file)
+    return {
+        "page": page,
+        "crawl_file": str(crawl_file),
+        "element_count": len(index),
+        "platform": index.platform,
+        "ms": round((time.monotonic() - started) * 1000),
+    }
+
+
+_default_pool: Optional[AppiumSessionPool] = None
+
+
+def get_default_pool() -> AppiumSessionPool:
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = AppiumSessionPool()
+    return _default_pool
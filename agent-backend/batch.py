@@ -0,0 +1,97 @@
+"""
+Batch generation across every page in mobile-tests/acceptance-criteria
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from agent import TestGenerationAgent
+from pipeline import GenerationPipeline
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+ACCEPTANCE_CRITERIA_DIR = MOBILE_TESTS_DIR / "acceptance-criteria"
+
+DEFAULT_WORKERS = 4
+
+
+def load_acceptance_criteria(pages: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Read acceptance-criteria/*.json, optionally limited to the given page names"""
+    wanted = {p.lower() for p in pages} if pages else None
+    criteria_sets = []
+    for path in sorted(ACCEPTANCE_CRITERIA_DIR.glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path.name}: {e}")
+            continue
+        if not isinstance(data, dict) or not data.get("page") or not data.get("acceptanceCriteria"):
+            continue
+        if wanted is not None and data["page"].lower() not in wanted:
+            continue
+        data.setdefault("feature", f"{data['page'].capitalize()} Feature")
+        criteria_sets.append(data)
+    return criteria_sets
+
+
+async def generate_all(
+    agent: TestGenerationAgent,
+    pages: Optional[List[str]] = None,
+    workers: int = DEFAULT_WORKERS,
+    force: bool = False,
+    on_progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Generate POM, tests and manual tests for many pages, at most `workers` pages at a time.
+
+    All pages share the agent, so its rate limiter and response cache apply across
+    the whole batch. A failing page is reported and does not stop the others.
+    """
+    criteria_sets = load_acceptance_criteria(pages)
+    total = len(criteria_sets)
+    semaphore = asyncio.Semaphore(max(1, workers))
+    done = 0
+    start = time.perf_counter()
+
+    # Each page runs up to two stages at once (POM -> tests, manual tests)
+    executor = ThreadPoolExecutor(max_workers=max(1, workers) * 2, thread_name_prefix="generate")
+    pipeline = GenerationPipeline(agent, executor=executor)
+
+    async def run_page(criteria: Dict[str, Any]) -> Dict[str, Any]:
+        nonlocal done
+        async with semaphore:
+            page_start = time.perf_counter()
+            try:
+                result = await pipeline.run(
+                    page_name=criteria["page"],
+                    feature=criteria["feature"],
+                    criteria=criteria["acceptanceCriteria"],
+                    force=force,
+                )
+                result["status"] = "ok"
+            except Exception as e:
+                result = {"page": criteria["page"], "status": "failed", "error": str(e)}
+            result["elapsed"] = round(time.perf_counter() - page_start, 3)
+
+        done += 1
+        if on_progress:
+            on_progress(done, total, result)
+        return result
+
+    try:
+        results = await asyncio.gather(*(run_page(c) for c in criteria_sets))
+    finally:
+        executor.shutdown(wait=False)
+
+    failed = [r for r in results if r["status"] != "ok"]
+    return {
+        "total": total,
+        "succeeded": total - len(failed),
+        "failed": len(failed),
+        "workers": workers,
+        "elapsed": round(time.perf_counter() - start, 3),
+        "pages": results,
+    }
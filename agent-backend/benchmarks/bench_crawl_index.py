@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming crawl index vs. the old read-whole-file + regex extraction
+
+Usage:
+    python benchmarks/bench_crawl_index.py [--nodes 50000] [--repeat 3]
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from crawl_index import parse_crawl_xml  # noqa: E402
+
+ROW_TEMPLATE = (
+    '<android.widget.LinearLayout index="{i}" package="com.example" class="android.widget.LinearLayout" '
+    'text="" resource-id="com.example:id/row_{i}" checkable="false" checked="false" clickable="true" '
+    'enabled="true" focusable="true" focused="false" long-clickable="false" password="false" '
+    'scrollable="false" selected="false" bounds="[0,{top}][1080,{bottom}]" displayed="true">'
+    '<android.widget.TextView index="0" package="com.example" class="android.widget.TextView" '
+    'text="Item {i}" content-desc="item-title-{i}" checkable="false" checked="false" clickable="false" '
+    'enabled="true" focusable="false" focused="false" long-clickable="false" password="false" '
+    'scrollable="false" selected="false" bounds="[0,{top}][1080,{bottom}]" displayed="true" />'
+    '</android.widget.LinearLayout>\n'
+)
+
+
+def write_synthetic_hierarchy(path: Path, nodes: int):
+    """Write a RecyclerView-style Android hierarchy with roughly `nodes` elements"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n")
+        f.write('<hierarchy index="0" class="hierarchy" rotation="0" width="1080" height="2340">\n')
+        f.write('<androidx.recyclerview.widget.RecyclerView index="0" class="androidx.recyclerview.widget.RecyclerView" '
+                'resource-id="com.example:id/list" clickable="false" enabled="true" scrollable="true" '
+                'bounds="[0,0][1080,2340]">\n')
+        for i in range((nodes - 1) // 2):
+            f.write(ROW_TEMPLATE.format(i=i, top=i * 10, bottom=i * 10 + 10))
+        f.write("</androidx.recyclerview.widget.RecyclerView>\n</hierarchy>\n")
+
+
+def regex_extract(path: Path) -> int:
+    """The previous _extract_selectors_from_xml approach"""
+    content = path.read_text(encoding="utf-8")
+    found = [m for m in re.findall(r'content-desc="([^"]+)"', content) if m.strip()]
+    found += [m for m in re.findall(r'resource-id="([^"]+)"', content) if ':id/' in m]
+    return len(found)
+
+
+def measure(label: str, func, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<28} best {min(timings) * 1000:8.1f} ms   peak {peak / 1024 / 1024:7.1f} MiB   -> {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crawl_file = Path(tmp) / "synthetic.xml"
+        write_synthetic_hierarchy(crawl_file, args.nodes)
+        size_mb = crawl_file.stat().st_size / 1024 / 1024
+        print(f"Synthetic hierarchy: {args.nodes} nodes, {size_mb:.1f} MiB\n")
+
+        measure("regex (read whole file)", lambda: regex_extract(crawl_file), args.repeat)
+        measure("iterparse index build", lambda: len(parse_crawl_xml(crawl_file)), args.repeat)
+        measure("index build + selectors", lambda: len(parse_crawl_xml(crawl_file).selectors()), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+End-to-end generation benchmark against the local fake OpenAI server
+
+Times generate_pom / generate_tests / generate_manual_tests, the concurrent
+pipeline, batch generation and the FastAPI endpoints at several page counts
+and concurrency levels. All output goes to a temporary directory.
+
+Usage:
+    python benchmarks/bench_generation.py [--latency 0.3] [--pages 1 5 20] [--workers 1 4 8]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import agent as agent_module  # noqa: E402
+import batch  # noqa: E402
+import generation_manifest  # noqa: E402
+import rate_limiter  # noqa: E402
+import response_cache  # noqa: E402
+from fake_openai import FakeOpenAIServer  # noqa: E402
+from pipeline import GenerationPipeline  # noqa: E402
+
+REAL_CRAWLS_DIR = agent_module.CRAWLS_DIR
+
+
+def isolate_outputs(workdir: Path):
+    """Point every generated file, manifest and cache at workdir"""
+    agent_module.PAGEOBJECTS_DIR = workdir / "pageobjects"
+    agent_module.TESTS_DIR = workdir / "tests"
+    agent_module.MANUAL_TESTS_DIR = workdir / "manual-tests"
+    agent_module.CRAWLS_DIR = workdir / "crawls"
+    batch.ACCEPTANCE_CRITERIA_DIR = workdir / "acceptance-criteria"
+    generation_manifest._default_manifest = generation_manifest.GenerationManifest(workdir / "manifest.json")
+    response_cache._default_cache = response_cache.ResponseCache(workdir / "llm_cache", enabled=False)
+    # Limits high enough that only the fake server's latency is measured
+    rate_limiter._default_limiter = rate_limiter.RateLimiter(10 ** 6, 10 ** 9)
+
+
+def write_pages(workdir: Path, count: int):
+    """Create `count` acceptance-criteria files, each reusing the login crawl"""
+    criteria_dir = workdir / "acceptance-criteria"
+    crawls_dir = workdir / "crawls"
+    shutil.rmtree(criteria_dir, ignore_errors=True)
+    criteria_dir.mkdir(parents=True)
+    crawls_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        page = f"page{i}"
+        shutil.copy(REAL_CRAWLS_DIR / "login.xml", crawls_dir / f"{page}.xml")
+        (criteria_dir / f"{page}.json").write_text(json.dumps({
+            "page": page,
+            "feature": f"Page {i}",
+            "acceptanceCriteria": [
+                {"id": f"{page.upper()}_001", "description": "User can log in with valid details"},
+                {"id": f"{page.upper()}_002", "description": "User sees an error for an invalid email"},
+            ],
+        }), encoding="utf-8")
+
+
+def reset_outputs(workdir: Path):
+    for name in ("pageobjects", "tests", "manual-tests", "manifest.json"):
+        path = workdir / name
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+
+
+def timed(label: str, func):
+    # Generation code prints debug lines; keep the benchmark table readable
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<44} {elapsed:7.2f}s")
+    return result
+
+
+def bench_single_page(agent, latency: float):
+    criteria = json.loads((batch.ACCEPTANCE_CRITERIA_DIR / "page0.json").read_text(encoding="utf-8"))
+    args = {"page_name": "page0", "criteria": criteria["acceptanceCriteria"]}
+
+    print(f"\nSingle page (server latency {latency:.2f}s per call)")
+    timed("generate_pom", lambda: agent.generate_pom(force=True, **args))
+    timed("generate_tests", lambda: agent.generate_tests(force=True, **args))
+    timed("generate_manual_tests", lambda: agent.generate_manual_tests(feature="Page 0", force=True, **args))
+    timed("sequential (3 calls)", lambda: (
+        agent.generate_pom(force=True, **args),
+        agent.generate_tests(force=True, **args),
+        agent.generate_manual_tests(feature="Page 0", force=True, **args),
+    ))
+    timed("GenerationPipeline (concurrent stages)", lambda: asyncio.run(
+        GenerationPipeline(agent).run(feature="Page 0", force=True, **args)
+    ))
+    timed("GenerationPipeline (manifest, unchanged)", lambda: asyncio.run(
+        GenerationPipeline(agent).run(feature="Page 0", **args)
+    ))
+
+
+def bench_batch(agent, workdir: Path, page_counts, worker_counts):
+    print("\nBatch generate_all")
+    for pages in page_counts:
+        write_pages(workdir, pages)
+        for workers in worker_counts:
+            reset_outputs(workdir)
+            report = timed(
+                f"{pages:>3} pages, {workers:>2} workers",
+                lambda: asyncio.run(batch.generate_all(agent, workers=workers)),
+            )
+            if report["failed"]:
+                print(f"    {report['failed']} pages failed")
+
+
+def run_job(client, url: str, poll_interval: float = 0.02, **kwargs) -> dict:
+    """Submit a job endpoint and poll /jobs/{id} until it finishes"""
+    response = client.post(url, **kwargs)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    while True:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("succeeded", "failed", "cancelled"):
+            break
+        time.sleep(poll_interval)
+    result = client.get(f"/jobs/{job_id}/result").json()
+    if result["status"] != "succeeded":
+        raise RuntimeError(f"Job {job_id} {result['status']}: {result['error']}")
+    return result
+
+
+def bench_endpoints(workdir: Path, page_counts, workers: int):
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("\nSkipping FastAPI endpoints (fastapi.testclient / httpx not installed)")
+        return
+
+    import app as app_module
+
+    print("\nFastAPI endpoints (submit + poll until the job finishes)")
+    with TestClient(app_module.app) as client:
+        write_pages(workdir, 1)
+        payload = json.loads((batch.ACCEPTANCE_CRITERIA_DIR / "page0.json").read_text(encoding="utf-8"))
+        timed("POST /acceptance-criteria?force=true", lambda: run_job(
+            client, "/acceptance-criteria", params={"force": "true"}, json=payload
+        ))
+        for pages in page_counts:
+            write_pages(workdir, pages)
+            reset_outputs(workdir)
+            timed(f"POST /generate-all ({pages} pages, {workers} workers)", lambda: run_job(
+                client, "/generate-all", json={"workers": workers, "force": True}
+            ))
+
+        # The event loop must stay responsive while a batch job is running
+        reset_outputs(workdir)
+        health = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            job_id = client.post("/generate-all", json={"workers": workers, "force": True}).json()["job_id"]
+            while client.get(f"/jobs/{job_id}").json()["status"] in ("queued", "running"):
+                start = time.perf_counter()
+                client.get("/health").raise_for_status()
+                health.append(time.perf_counter() - start)
+                time.sleep(0.05)
+        if health:
+            print(f"  GET /health during generate-all: {len(health)} calls, max {max(health) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generation pipeline benchmark (fake OpenAI)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake server latency per call (s)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Simulate a 429 every Nth request")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(
+        latency=args.latency, rate_limit_every=args.rate_limit_every
+    ) as server:
+        workdir = Path(tmp)
+        isolate_outputs(workdir)
+        os.environ["OPENAI_API_KEY"] = "fake-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        agent_module.OPENAI_API_KEY = "fake-key"
+        agent_module.OPENAI_BASE_URL = server.base_url
+
+        agent = agent_module.TestGenerationAgent(use_cache=False)
+        write_pages(workdir, 1)
+
+        bench_single_page(agent, args.latency)
+        bench_batch(agent, workdir, args.pages, args.workers)
+        if not args.skip_endpoints:
+            bench_endpoints(workdir, args.pages, max(args.workers))
+
+        print(f"\nFake server: {server.requests} requests, {server.rate_limited} simulated 429s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,38 @@ CLI interface for AI Agent for Mobile Webdriver
 Handles the complete workflow: acceptance criteria → crawl → manual tests → review → generate → execute → report
 """
 
+import argparse
+import asyncio
 import json
 import os
 import platform
 import subprocess
+import threading
+import time
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from agent import TestGenerationAgent
+from adb_crawler import adb_crawl_pages, adb_udid
+from allure_results import AllureResultsReader
+from appium_client import AppiumError, crawl_current_screen, get_default_pool
+from batch import DEFAULT_WORKERS, generate_all
+from crawl_batch import CRAWL_SPEC, crawl_env, navigation_plan, parse_crawl_result, summarize
+from crawl_cache import get_crawl_index
 from device_manager import DeviceManager
+from explorer import EXPLORER_MAX_DEPTH, EXPLORER_MAX_SCREENS, EXPLORER_MAX_SECONDS, EXPLORER_MAX_TAPS, ExplorerError, explore_app
+from healing import SelectorHealer, plan_healing
+from impact import get_default_analyzer
+from results_db import get_default_results_db
+from run_logs import RunLog, new_run_id, run_log_store
+from screen_fingerprint import audit_crawls, fingerprint_xml, get_default_screen_index, verify_crawl
+from selector_matcher import snapshot_crawl
+from run_order import STATS_HISTORY_RUNS, blocking_failures, load_stats, plan_run_order, wdio_passes
+from sharding import Shard, list_specs, prepare_shards, shard_report
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +47,9 @@ APP_CONFIG_FILE = MOBILE_TESTS_DIR / ".app_config.env"
 
 IS_WINDOWS = platform.system() == "Windows"
 
+# Lines of wdio output kept for the failure summary when live output is off
+OUTPUT_TAIL_LINES = 40
+
 
 class CLI:
     def __init__(self):
@@ -36,6 +62,8 @@ class CLI:
         self.app_package: Optional[str] = None
         self.app_activity: Optional[str] = None
         self.use_browserstack: bool = False  # Flag for BrowserStack usage
+        self.live_output: bool = True  # Echo wdio output line by line while it runs
+        self.last_test_results: Optional[Dict[str, Any]] = None  # Per-test summary of the last run
 
     def print_header(self, text: str):
         """Print a formatted header"""
@@ -87,6 +115,84 @@ class CLI:
             return ["npx.cmd"] if self._check_node_available()[0] else ["npx"]
         return ["npx"]
 
+    def _run_streaming(
+        self,
+        cmd: List[str],
+        env: Optional[Dict[str, str]] = None,
+        run_log: Optional[RunLog] = None,
+        prefix: str = "",
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[int, str]:
+        """Run a command in mobile-tests, echoing its output live; returns (returncode, output tail).
+
+        stderr is merged into stdout and only the last OUTPUT_TAIL_LINES lines are
+        kept in memory, however long the run; the full output goes to run_log.
+        """
+        tail: deque = deque(maxlen=OUTPUT_TAIL_LINES)
+        process = subprocess.Popen(
+            cmd,
+            cwd=str(MOBILE_TESTS_DIR),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            env=env,
+            shell=IS_WINDOWS,
+        )
+        try:
+            for line in process.stdout:
+                line = line.rstrip("\r\n")
+                tail.append(line)
+                if run_log is not None:
+                    run_log.write_line(line)
+                if on_line is not None:
+                    on_line(line)
+                if self.live_output:
+                    print(f"  │ {prefix}{line}", flush=True)
+        except KeyboardInterrupt:
+            process.terminate()
+            process.wait()
+            raise
+        finally:
+            if run_log is not None:
+                run_log.close(process.poll())
+                run_log_store.prune()
+        return process.wait(), "\n".join(tail)
+
+    def follow_job(self, job_id: str, api_url: str) -> bool:
+        """Live-tail an API job (/jobs/{id}/stream) until it finishes"""
+        url = f"{api_url.rstrip('/')}/jobs/{job_id}/stream"
+        self.print_info(f"Following {url}")
+        event, data = None, []
+        final: Dict[str, Any] = {}
+        try:
+            with urllib.request.urlopen(url) as response:
+                for raw in response:
+                    line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
+                    elif not line and data:
+                        payload = json.loads("\n".join(data))
+                        if event == "output":
+                            print(f"  │ {payload['line']}", flush=True)
+                        elif event == "end":
+                            final = payload
+                        event, data = None, []
+        except OSError as e:
+            self.print_error(f"Could not follow job {job_id}: {e}")
+            return False
+
+        status = final.get("status", "unknown")
+        if status == "succeeded":
+            self.print_success(f"Job {job_id} succeeded")
+            return True
+        self.print_error(f"Job {job_id} {status}" + (f": {final['error']}" if final.get("error") else ""))
+        return False
+
     def initialize_agent(self):
         """Initialize the AI agent with API keys"""
         api_key = os.getenv("OPENAI_API_KEY")
@@ -335,27 +441,26 @@ class CLI:
 
     def crawl_page(self, page_name: str) -> bool:
         """Crawl elements from the current page"""
-        self.print_header(f"Crawling Elements for {page_name}")
+        return page_name in self.crawl_pages([page_name])
+
+    def crawl_pages(self, page_names: List[str]) -> List[str]:
+        """Crawl one or more pages (adb dumps where possible, the rest in one wdio session); returns the pages saved"""
+        label = ", ".join(page_names)
+        self.print_header(f"Crawling Elements for {label}")
 
         if not self.current_device:
             self.print_error("No device selected. Please select a device first.")
-            return False
+            return []
 
         self.print_info(f"Connecting to {self.current_device['name']}...")
-        
-        # Update wdio config with selected device (for local only)
-        if not self.use_browserstack:
-            if not self.device_manager.update_wdio_config(self.current_device, self.current_platform):
-                self.print_error("Failed to update WebdriverIO configuration")
-                return False
-
         self.print_info("Starting page crawl...")
         self.print_info("Please ensure:")
         
         if not self.use_browserstack:
             print("  - Appium server is running (port 4723)")
             print("  - The app is launched on the device/emulator")
-            print("  - You are on the correct page/screen")
+            if len(page_names) == 1:
+                print("  - You are on the correct page/screen")
         else:
             print("  - Your app is uploaded to BrowserStack")
             print("  - BROWSERSTACK_APP_URL is set in .env file")
@@ -363,16 +468,89 @@ class CLI:
 
         input("\nPress Enter when ready to crawl...")
 
+        # Taps from the launch screen to each page, where the navigation graph knows them
+        plan = navigation_plan(page_names)
+        started = time.monotonic()
+        page_results: Dict[str, Dict[str, Any]] = {}
+
+        # Fast path for a local Android device: uiautomator dumps over adb, no Appium session
+        udid = None if self.use_browserstack else adb_udid(self.current_platform, self.current_device)
+        if udid:
+            page_results.update(adb_crawl_pages(page_names, udid, plan, current_screen=True))
+            if page_results:
+                self.print_info(f"Crawled over adb: {', '.join(page_results)}")
+        remaining = [page_name for page_name in page_names if page_name not in page_results]
+
+        returncode, output_tail = 0, ""
+        if remaining:
+            outcome = self._run_wdio_crawl(remaining, plan, page_results)
+            if outcome is None:
+                return list(page_results)
+            returncode, output_tail = outcome
+        summary = summarize(page_names, page_results, (time.monotonic() - started) * 1000)
+
+        for page_name in page_names:
+            result = summary["pages"][page_name]
+            crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page_name}.xml"
+            if not result.get("ok"):
+                self.print_error(f"{page_name}: crawl failed ({result.get('error', 'unknown error')})")
+                continue
+            self.print_success(f"{page_name}: saved to {crawl_file} in {result['ms'] / 1000:.1f}s")
+            # Parse once here; generation and auto-heal reuse the cached index
+            try:
+                index = get_crawl_index(crawl_file)
+                self.print_info(f"Indexed {len(index)} elements ({index.platform})")
+                self._report_verdict(verify_crawl(page_name))
+            except Exception as e:
+                self.print_error(f"Crawl XML could not be parsed: {e}")
+        if len(page_names) > 1:
+            self.print_info(f"{len(summary['succeeded'])}/{len(page_names)} pages in {summary['elapsed_ms'] / 1000:.1f}s "
+                            f"({summary['setup_ms'] / 1000:.1f}s session setup, shared)")
+
+        if returncode == 0 and not summary["failed"]:
+            if self.use_browserstack:
+                self.print_info("View session: https://app-automate.browserstack.com/dashboard")
+            return summary["succeeded"]
+        self.print_error("Crawl failed" if not summary["succeeded"] else "Some pages could not be crawled")
+        if not self.live_output and output_tail:
+            print("\n--- Output (last lines) ---")
+            print(output_tail)
+        if self.use_browserstack:
+            self.print_info("Check BrowserStack logs: https://app-automate.browserstack.com/dashboard")
+        return summary["succeeded"]
+
+    def _report_verdict(self, verdict: Dict[str, Any]):
+        """Warn when a crawl looks like a different known screen than the page it was saved as"""
+        page, looks_like = verdict["page"], verdict.get("looks_like")
+        if verdict.get("verified") is False:
+            self.print_error(f"{page}: looks like {looks_like} (similarity {verdict['looks_like_similarity']}), "
+                             f"not {page}; check the navigation or rename the crawl")
+        elif looks_like:
+            self.print_info(f"{page}: shows {looks_like} (similarity {verdict['looks_like_similarity']}); "
+                            f"save it as {looks_like}.xml instead")
+
+    def _run_wdio_crawl(self, page_names: List[str], plan: Dict[str, List[str]],
+                        page_results: Dict[str, Dict[str, Any]]) -> Optional[Tuple[int, str]]:
+        """Crawl pages with the wdio spec, adding their CRAWL_RESULTs to page_results; None if it could not start"""
         # Check if Node.js is available
         node_available, node_info = self._check_node_available()
         if not node_available:
             self.print_error("Node.js is not installed or not in PATH")
             self.print_info("Please install Node.js from https://nodejs.org/")
             self.print_info("After installation, restart the CLI")
-            return False
+            return None
 
-        env = os.environ.copy()
-        env["CRAWL_PAGE_NAME"] = page_name
+        # Update wdio config with selected device (for local only)
+        if not self.use_browserstack:
+            if not self.device_manager.update_wdio_config(self.current_device, self.current_platform):
+                self.print_error("Failed to update WebdriverIO configuration")
+                return None
+
+        env = crawl_env(page_names, plan)
+
+        # Keep the old crawls so broken selectors can be matched locally later
+        for page_name in page_names:
+            snapshot_crawl(page_name)
 
         # Get the correct npx command
         npx_cmd = self._get_npx_cmd()
@@ -384,48 +562,122 @@ class CLI:
         else:
             config_file = "wdio.conf.ts"
             
-        cmd = npx_cmd + ["wdio", "run", config_file, "--spec", "./src/tests/crawl-page.e2e.ts"]
-        
-        try:
-            result = subprocess.run(
-                cmd,
-                cwd=str(MOBILE_TESTS_DIR),
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                check=False,
-                env=env,
-                shell=IS_WINDOWS,
-            )
+        cmd = npx_cmd + ["wdio", "run", config_file, "--spec", CRAWL_SPEC]
 
-            if result.returncode == 0:
-                crawl_file = MOBILE_TESTS_DIR / "crawls" / f"{page_name}.xml"
-                if crawl_file.exists():
-                    self.print_success(f"Page elements crawled and saved to {crawl_file}")
-                    if self.use_browserstack:
-                        self.print_info("View session: https://app-automate.browserstack.com/dashboard")
-                    return True
-                else:
-                    self.print_error("Crawl completed but file not found")
-                    print(f"Expected file: {crawl_file}")
-                    return False
-            else:
-                self.print_error("Crawl failed")
-                print("\n--- Error Output ---")
-                if result.stderr:
-                    print(result.stderr[-2000:])
-                if result.stdout:
-                    print("\n--- Standard Output ---")
-                    print(result.stdout[-2000:])
-                if self.use_browserstack:
-                    self.print_info("Check BrowserStack logs: https://app-automate.browserstack.com/dashboard")
-                return False
+        def on_line(line: str):
+            result = parse_crawl_result(line)
+            if result and result.get("page") in page_names:
+                page_results[result["page"]] = {**result, "backend": "wdio"}
+
+        try:
+            run_log = RunLog("crawl", meta={"pages": page_names})
+            outcome = self._run_streaming(cmd, env=env, run_log=run_log, on_line=on_line)
+            self.print_info(f"Full output: {run_log.path}")
+            return outcome
         except Exception as e:
             self.print_error(f"Failed to run crawl: {e}")
+            return None
+
+    def appium_command(self, action: str, target: Optional[str] = None, platform: str = "Android",
+                       udid: Optional[str] = None) -> bool:
+        """One command on the device's warm Appium session (reused across CLI calls, no wdio run)"""
+        pool = get_default_pool()
+        if action == "sessions":
+            print(json.dumps(pool.status(), indent=2))
+            return True
+        if action == "close":
+            pool.close()
+            self.print_success("Appium sessions closed")
+            return True
+        if action in ("crawl", "find", "tap", "screenshot") and not target:
+            self.print_error(f"'{action}' needs a {'page name' if action == 'crawl' else 'file' if action == 'screenshot' else 'selector'}")
+            return False
+
+        started = time.monotonic()
+        try:
+            with pool.session(platform, {"id": udid} if udid else None) as session:
+                if action == "source":
+                    print(session.get_page_source())
+                elif action == "crawl":
+                    result = crawl_current_screen(session, target)
+                    self.print_success(f"Saved {result['crawl_file']} ({result['element_count']} elements, {result['platform']})")
+                elif action == "find":
+                    elements = session.find_all(target)
+                    (self.print_success if elements else self.print_error)(f"{target}: {len(elements)} element(s)")
+                    if not elements:
+                        return False
+                elif action == "tap":
+                    session.tap(target)
+                    self.print_success(f"Tapped {target}")
+                elif action == "screenshot":
+                    Path(target).write_bytes(session.screenshot())
+                    self.print_success(f"Screenshot saved to {target}")
+        except AppiumError as e:
+            self.print_error(f"Appium: {e}")
             return False
+        status = pool.status()
+        self.print_info(f"{(time.monotonic() - started) * 1000:.0f} ms "
+                        f"({'new session' if status['created'] else 'warm session'})")
+        return True
+
+    def explore(self, platform: str = "Android", udid: Optional[str] = None, backend: str = "auto", **budgets: Any) -> bool:
+        """Explore the app unattended, saving a crawl per new screen and the taps between them"""
+        self.print_header("Exploring App")
+        self.print_info("The app will be restarted and tapped through; keep the device unlocked")
+        try:
+            report = explore_app(platform, {"id": udid} if udid else None, backend, **budgets)
+        except (AppiumError, ExplorerError) as e:
+            self.print_error(f"Exploration failed: {e}")
+            return False
+        except KeyboardInterrupt:
+            self.print_error("Exploration interrupted")
+            return False
+        self.print_success(f"{len(report['screens'])} screens, {len(report['transitions'])} transitions, "
+                           f"{report['taps']} taps in {report['elapsed_s']:.0f}s over {report['backend']} "
+                           f"(stopped: {report['stopped']})")
+        for error in report["errors"]:
+            self.print_error(error)
+        return True
+
+    def classify(self, files: Optional[List[str]] = None) -> bool:
+        """Which known screen each XML file shows; without files, check every saved crawl. False if any is misfiled"""
+        self.print_header("Classifying Screens")
+        ok = True
+        if files:
+            index = get_default_screen_index()
+            for file in files:
+                try:
+                    match = index.classify(fingerprint_xml(file))
+                except (OSError, ET.ParseError) as e:
+                    self.print_error(f"{file}: {e}")
+                    ok = False
+                    continue
+                best = match["candidates"][0] if match["candidates"] else None
+                if match["page"]:
+                    self.print_success(f"{file}: {match['page']} (similarity {match['similarity']}, {match['ms']} ms)")
+                elif best:
+                    self.print_info(f"{file}: no confident match (closest {best['page']} at {best['similarity']})")
+                else:
+                    self.print_info(f"{file}: no known screen shares its structure")
+            return ok
+        for verdict in audit_crawls():
+            page = verdict["page"]
+            if "error" in verdict:
+                self.print_error(f"{page}: {verdict['error']}")
+                ok = False
+                continue
+            self._report_verdict(verdict)
+            ok = ok and verdict["verified"] is not False
+            if verdict.get("duplicate_of"):
+                self.print_info(f"{page}: near duplicate of {verdict['duplicate_of']}")
+            elif verdict["verified"] is not False and not verdict.get("looks_like"):
+                if verdict["verified"]:
+                    self.print_success(f"{page}: matches its previous crawl")
+                else:
+                    self.print_info(f"{page}: nothing to compare with")
+        return ok
 
-    def generate_manual_tests(self, criteria: Dict[str, Any]) -> Optional[Path]:
+    def generate_manual_tests(self, criteria: Dict[str, Any], force: bool = False) -> Optional[Path]:
         """Generate manual test cases"""
         self.print_header("Generating Manual Test Cases")
 
@@ -438,6 +690,7 @@ class CLI:
                 page_name=criteria["page"],
                 feature=criteria["feature"],
                 criteria=criteria["acceptanceCriteria"],
+                force=force,
             )
             self.print_success(f"Manual test cases generated: {manual_path}")
             return Path(manual_path)
@@ -473,7 +726,7 @@ class CLI:
             self.print_error(f"Failed to review manual tests: {e}")
             return False
 
-    def generate_test_scripts(self, criteria: Dict[str, Any]) -> bool:
+    def generate_test_scripts(self, criteria: Dict[str, Any], force: bool = False) -> bool:
         """Generate POM and test scripts"""
         self.print_header("Generating Test Scripts (POM + Tests)")
 
@@ -487,6 +740,7 @@ class CLI:
             pom_path = self.agent.generate_pom(
                 page_name=criteria["page"],
                 criteria=criteria["acceptanceCriteria"],
+                force=force,
             )
             self.print_success(f"POM generated: {pom_path}")
 
@@ -495,14 +749,48 @@ class CLI:
             test_path = self.agent.generate_tests(
                 page_name=criteria["page"],
                 criteria=criteria["acceptanceCriteria"],
+                force=force,
             )
             self.print_success(f"Test scripts generated: {test_path}")
 
+            stats = self.agent.cache.stats()
+            if stats["enabled"]:
+                self.print_info(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
+
             return True
         except Exception as e:
             self.print_error(f"Failed to generate test scripts: {e}")
             return False
 
+    def generate_all_pages(
+        self, pages: Optional[List[str]] = None, workers: int = DEFAULT_WORKERS, force: bool = False
+    ) -> bool:
+        """Generate POM, tests and manual tests for every acceptance-criteria file"""
+        self.print_header("Batch Generation (All Pages)")
+
+        if not self.agent:
+            self.print_error("Agent not initialized")
+            return False
+
+        def on_progress(done: int, total: int, result: Dict[str, Any]):
+            if result["status"] == "ok":
+                self.print_success(f"[{done}/{total}] {result['page']} ({result['elapsed']:.1f}s)")
+            else:
+                self.print_error(f"[{done}/{total}] {result['page']} failed: {result.get('error')}")
+
+        report = asyncio.run(
+            generate_all(self.agent, pages=pages, workers=workers, force=force, on_progress=on_progress)
+        )
+        if not report["total"]:
+            self.print_error(f"No acceptance criteria JSON files found in {ACCEPTANCE_CRITERIA_DIR}")
+            return False
+
+        self.print_info(
+            f"{report['succeeded']}/{report['total']} pages generated in {report['elapsed']:.1f}s "
+            f"with {workers} workers ({report['failed']} failed)"
+        )
+        return report["failed"] == 0
+
     def review_test_scripts(self, page_name: str) -> bool:
         """Allow user to review generated test scripts"""
         self.print_header("Review Test Scripts")
@@ -531,14 +819,34 @@ class CLI:
 
         return True
 
-    def execute_tests(self, page_name: Optional[str] = None) -> bool:
-        """Execute test cases"""
+    def _impacted_specs(self) -> List[str]:
+        """Specs whose POMs, crawls or criteria changed since they last passed, printing why"""
+        impacted = get_default_analyzer().impacted()
+        for item in impacted:
+            self.print_info(f"{item['spec']}: {'; '.join(item['reasons'][:3])}")
+        return [item["spec"] for item in impacted]
+
+    def execute_tests(self, page_name: Optional[str] = None, changed_only: bool = False, fail_fast: bool = False) -> bool:
+        """Execute test cases (one page's spec, only the specs impacted by changes, or all).
+
+        Specs run in the order the results history suggests; with fail_fast the run
+        stops at the first failed test.
+        """
         self.print_header("Executing Test Cases")
 
         if not self.current_device:
             self.print_error("No device selected")
             return False
 
+        specs: Optional[List[str]] = None  # None: every spec
+        if page_name:
+            specs = [f"{page_name.lower()}.e2e.ts"]
+        elif changed_only:
+            specs = self._impacted_specs()
+            if not specs:
+                self.print_success("No specs affected by changes since they last passed")
+                return True
+
         self.print_info("Starting test execution...")
         
         if not self.use_browserstack:
@@ -567,25 +875,46 @@ class CLI:
             else:
                 config_file = "wdio.conf.ts"
             
-            # Run specific test file if page_name provided, otherwise run all
-            if page_name:
-                spec_file = f"./src/tests/{page_name.lower()}.e2e.ts"
-                cmd = npx_cmd + ["wdio", "run", config_file, "--spec", spec_file]
-            else:
-                cmd = npx_cmd + ["wdio", "run", config_file]
-
-            result = subprocess.run(
-                cmd,
-                cwd=str(MOBILE_TESTS_DIR),
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                check=False,
-                shell=IS_WINDOWS,
-            )
+            # Likely-to-fail, fast specs first; flaky ones last with retries (or quarantined)
+            plan = plan_run_order(specs or list_specs(), load_stats())
+            if len(plan.ordered) + len(plan.flaky) > 1:
+                self.print_info(f"Run order: {', '.join(plan.ordered)}")
+            if plan.flaky:
+                self.print_info(f"Flaky ({plan.policy}): {', '.join(plan.flaky)}")
+
+            analyzer = get_default_analyzer()
+            snapshot = analyzer.snapshot(plan.ordered + plan.flaky)
+            results = AllureResultsReader(since=time.time())
+            run_id = new_run_id()
+            returncode, output_tail = 0, ""
+            for wdio_pass in wdio_passes(plan, fail_fast):
+                if fail_fast and (returncode != 0 or blocking_failures(results.summary(), plan)):
+                    self.print_info(f"Fail-fast: skipping {', '.join(wdio_pass.specs)}")
+                    break
+                run_log = RunLog(
+                    "run_tests",
+                    run_id=run_id if wdio_pass.name == "main" else f"{run_id}-{wdio_pass.name}",
+                    meta={"page": page_name, "specs": wdio_pass.specs, "pass": wdio_pass.name},
+                )
+                env = {**os.environ, **wdio_pass.env}
+                pass_rc, pass_tail = self._run_streaming(wdio_pass.command(npx_cmd, config_file), env=env, run_log=run_log)
+                self.print_info(f"Full output: {run_log.path}")
+                results.poll()
+                if wdio_pass.required and pass_rc != 0:
+                    returncode, output_tail = pass_rc, pass_tail
+
+            self.last_test_results = results.summary()
+            self._print_test_results(self.last_test_results)
+            try:
+                get_default_results_db().ingest(run_id=run_id)
+            except Exception as e:
+                self.print_error(f"Could not record results history: {e}")
+            analyzer.record_passed(snapshot, self.last_test_results)
 
-            success = result.returncode == 0
+            quarantined = [f for f in results.failures() if f.spec in plan.quarantined]
+            if quarantined:
+                self.print_info(f"{len(quarantined)} failure(s) in quarantined specs do not fail the run")
+            success = returncode == 0 and not blocking_failures(self.last_test_results, plan)
 
             if success:
                 self.print_success("Test execution completed successfully")
@@ -593,9 +922,9 @@ class CLI:
                     self.print_info("View results: https://app-automate.browserstack.com/dashboard")
             else:
                 self.print_error("Test execution completed with failures")
-                print("\nLast 500 characters of output:")
-                print(result.stdout[-500:])
-                print(result.stderr[-500:])
+                if not self.live_output:
+                    print("\nLast lines of output:")
+                    print(output_tail)
                 if self.use_browserstack:
                     self.print_info("View full logs: https://app-automate.browserstack.com/dashboard")
 
@@ -607,6 +936,112 @@ class CLI:
             self.print_error(f"Failed to execute tests: {e}")
             return False
 
+    def run_sharded(
+        self,
+        platform_name: str = "Android",
+        device_ids: Optional[List[str]] = None,
+        pages: Optional[List[str]] = None,
+        changed_only: bool = False,
+        fail_fast: bool = False,
+    ) -> bool:
+        """Split specs across every attached device and run one wdio process per device"""
+        self.print_header("Sharded Test Execution")
+        specs = None
+        if changed_only:
+            specs = self._impacted_specs()
+            if not specs:
+                self.print_success("No specs affected by changes since they last passed")
+                return True
+        shards = prepare_shards(platform_name, device_ids, pages, device_manager=self.device_manager, specs=specs)
+        if not shards:
+            self.print_error(f"No {platform_name} devices or specs to shard")
+            return False
+        # Within each shard: likely-to-fail, fast specs first, flaky ones last (retried or quarantined)
+        stats = load_stats()
+        plan = plan_run_order([spec for shard in shards for spec in shard.specs], stats)
+        shard_plans = {shard.index: plan_run_order(shard.specs, stats) for shard in shards}
+        for shard in shards:
+            shard.specs = shard_plans[shard.index].ordered + shard_plans[shard.index].flaky
+        if plan.flaky:
+            self.print_info(f"Flaky ({plan.policy}): {', '.join(plan.flaky)}")
+        for shard in shards:
+            self.print_info(f"{shard.label}: {', '.join(shard.specs)} (~{shard.estimated_ms / 1000:.0f}s, Appium :{shard.appium_port})")
+
+        npx_cmd = self._get_npx_cmd()
+        run_id = new_run_id()
+        analyzer = get_default_analyzer()
+        snapshot = analyzer.snapshot([spec for shard in shards for spec in shard.specs])
+        results = AllureResultsReader(since=time.time())
+
+        results_lock = threading.Lock()
+
+        def run_shard(shard: Shard) -> int:
+            """The shard's wdio passes in order; returns the return code of its required passes"""
+            returncode = 0
+            env = shard.env()
+            for wdio_pass in wdio_passes(shard_plans[shard.index], fail_fast):
+                if fail_fast:
+                    with results_lock:
+                        results.poll()
+                        blocked = bool(blocking_failures(results.summary(), plan))
+                    if returncode != 0 or blocked:
+                        break
+                log_id = f"{run_id}-s{shard.index}"
+                run_log = RunLog(
+                    "run_tests",
+                    run_id=log_id if wdio_pass.name == "main" else f"{log_id}-{wdio_pass.name}",
+                    meta={**shard.to_dict(), "pass": wdio_pass.name, "specs": wdio_pass.specs},
+                )
+                cmd = wdio_pass.command(npx_cmd, shard.config_file)
+                pass_rc, _ = self._run_streaming(cmd, env={**env, **wdio_pass.env}, run_log=run_log,
+                                                 prefix=f"[{shard.label}] ")
+                if wdio_pass.required and pass_rc != 0:
+                    returncode = pass_rc
+            return returncode
+
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            returncodes = list(pool.map(run_shard, shards))
+        self.print_info(f"All shards finished in {time.time() - started:.1f}s")
+
+        results.poll()
+        self.last_test_results = results.summary()
+        self._print_test_results(self.last_test_results)
+        for shard in shard_report(shards, self.last_test_results, returncodes):
+            print(f"  {shard['device_name'] or shard['device']}: rc={shard['returncode']}, "
+                  f"{shard['actual_ms'] / 1000:.1f}s of tests (estimated {shard['estimated_ms'] / 1000:.1f}s)")
+        try:
+            get_default_results_db().ingest(run_id=run_id)
+        except Exception as e:
+            self.print_error(f"Could not record results history: {e}")
+        analyzer.record_passed(snapshot, self.last_test_results)
+
+        quarantined = [f for f in results.failures() if f.spec in plan.quarantined]
+        if quarantined:
+            self.print_info(f"{len(quarantined)} failure(s) in quarantined specs do not fail the run")
+        success = all(rc == 0 for rc in returncodes) and not blocking_failures(self.last_test_results, plan)
+        if success:
+            self.print_success("Sharded run completed successfully")
+        else:
+            self.print_error("Sharded run completed with failures")
+        return success
+
+    def _print_test_results(self, summary: Dict[str, Any]):
+        """Per-spec pass/fail table with the failure message and selectors of each failed test"""
+        if not summary["total"]:
+            self.print_info("No allure results were written for this run")
+            return
+        print(f"\n{summary['passed']} passed, {summary['failed'] + summary['broken']} failed, "
+              f"{summary['skipped']} skipped ({summary['total']} tests)")
+        for spec, spec_result in summary["specs"].items():
+            mark = "✓" if spec_result["status"] == "passed" else "✗" if spec_result["status"] == "failed" else "-"
+            print(f"  {mark} {spec} ({spec_result['duration_ms'] / 1000:.1f}s)")
+            for test in spec_result["tests"]:
+                if test["status"] in ("failed", "broken"):
+                    print(f"      ✗ {test['name']}: {test['message'] or test['status']}")
+                    if test["selectors"]:
+                        print(f"        selectors: {', '.join(test['selectors'])}")
+
     def generate_allure_report(self):
         """Generate Allure HTML report"""
         self.print_header("Generating Allure Report")
@@ -868,52 +1303,67 @@ class CLI:
             self.print_error("Invalid choice")
             return False
 
-    def auto_heal(self, page_name: str) -> bool:
-        """Auto-heal failed tests"""
+    def auto_heal(self, page_name: Optional[str] = None) -> bool:
+        """Auto-heal failed tests: patch only the POM getters whose selectors broke"""
         self.print_header("Auto-Healing Failed Tests")
 
         if not self.agent:
             self.print_error("Agent not initialized")
             return False
 
-        # Read allure results to find failures
-        allure_results_dir = MOBILE_TESTS_DIR / "allure-results"
-        if not allure_results_dir.exists():
-            self.print_error("No test results found for auto-healing")
+        self.print_info("Analyzing test failures...")
+        if self.last_test_results is not None:
+            failures = self.last_test_results["failures"]
+        else:
+            try:
+                failures = get_default_results_db().failures(last_runs=1, limit=500)["items"]
+            except Exception as e:
+                self.print_error(f"Could not read test results history: {e}")
+                return False
+        if not failures:
+            self.print_error("No failed tests found for auto-healing")
             return False
 
-        self.print_info("Analyzing test failures...")
-        
-        # Re-crawl the page to get fresh elements
-        if not self.crawl_page(page_name):
-            self.print_error("Failed to crawl page for auto-healing")
+        plan = plan_healing(failures)
+        if page_name:
+            plan = {page: broken for page, broken in plan.items() if page == page_name.lower()}
+        if not plan:
+            self.print_error(f"None of the {len(failures)} failures maps to a Page Object getter")
             return False
 
-        # Regenerate POM with fresh crawl data
-        try:
-            # Load existing acceptance criteria
-            criteria_file = ACCEPTANCE_CRITERIA_DIR / f"{page_name}.json"
-            if criteria_file.exists():
-                with open(criteria_file, 'r', encoding='utf-8') as f:
-                    criteria = json.load(f)
-                
-                self.print_info("Regenerating POM with updated selectors...")
-                pom_path = self.agent.generate_pom(
-                    page_name=page_name,
-                    criteria=criteria["acceptanceCriteria"],
-                )
-                self.print_success(f"POM regenerated: {pom_path}")
-                
-                # Re-run tests
-                self.print_info("Re-running tests after auto-healing...")
-                return self.execute_tests(page_name)
-            else:
-                self.print_error(f"Acceptance criteria file not found: {criteria_file}")
-                return False
-        except Exception as e:
-            self.print_error(f"Auto-healing failed: {e}")
+        for page, broken in plan.items():
+            print(f"  {page}: {', '.join(f'{b.getter.name} ({b.getter.selector})' for b in broken)}")
+
+        healer = SelectorHealer(self.agent.propose_selector_replacements)
+        healed_pages = []
+        # Re-crawl only the pages whose getters are implicated, all in one session
+        crawled = self.crawl_pages(list(plan))
+        for page, broken in plan.items():
+            if page not in crawled:
+                self.print_error(f"Failed to crawl {page} for auto-healing")
+                continue
+            try:
+                report = healer.heal_page(page, broken)
+            except Exception as e:
+                self.print_error(f"Auto-healing {page} failed: {e}")
+                continue
+            for getter, change in report["patched"].items():
+                self.print_success(f"{page}.{getter}: {change['old']} -> {change['new']}")
+            if report["still_present"]:
+                self.print_info(f"Selectors still on screen (not stale): {', '.join(report['still_present'])}")
+            if report["unresolved"]:
+                self.print_error(f"No replacement found for: {', '.join(report['unresolved'])}")
+            if report["patched"]:
+                healed_pages.append(page)
+
+        if not healed_pages:
+            self.print_error("Nothing was patched")
             return False
 
+        # Re-run only the specs of the healed pages
+        self.print_info("Re-running tests after auto-healing...")
+        return all([self.execute_tests(page) for page in healed_pages])
+
     def run_full_workflow(self):
         """Run the complete workflow"""
         self.print_header("AI Agent for Mobile Webdriver - CLI")
@@ -935,10 +1385,11 @@ class CLI:
             print("7. Execute Tests")
             print("8. Generate Allure Report")
             print("9. Run Complete Workflow (All Steps)")
-            print("10. Exit")
+            print("10. Generate All Pages (Batch)")
+            print("11. Exit")
             print("=" * 60)
 
-            choice = input("\nEnter your choice (1-10): ").strip()
+            choice = input("\nEnter your choice (1-11): ").strip()
 
             if choice == "1":
                 # Select Platform and Device
@@ -958,7 +1409,12 @@ class CLI:
             elif choice == "4":
                 # Crawl Page Elements
                 if not self.current_page:
-                    self.current_page = input("Enter page name to crawl: ").strip().lower()
+                    names = input("Enter page name(s) to crawl (comma-separated): ").strip().lower()
+                    pages = [name.strip() for name in names.split(",") if name.strip()]
+                    if len(pages) > 1:
+                        self.crawl_pages(pages)
+                    elif pages:
+                        self.current_page = pages[0]
                 if self.current_page:
                     self.crawl_page(self.current_page)
 
@@ -994,8 +1450,12 @@ class CLI:
 
             elif choice == "7":
                 # Execute Tests
-                page = input("Enter page name to test (or press Enter for all tests): ").strip().lower() or None
-                self.execute_tests(page)
+                page = input("Enter page name to test, 'changed' for specs affected by changes, or press Enter for all tests: ").strip().lower() or None
+                fail_fast = input("Stop at the first failed test? (y/N): ").strip().lower() == "y"
+                if page == "changed":
+                    self.execute_tests(changed_only=True, fail_fast=fail_fast)
+                else:
+                    self.execute_tests(page, fail_fast=fail_fast)
 
             elif choice == "8":
                 # Generate Allure Report
@@ -1036,16 +1496,109 @@ class CLI:
                 self.generate_allure_report()
 
             elif choice == "10":
+                # Generate All Pages (Batch)
+                workers = input(f"Number of parallel workers (default {DEFAULT_WORKERS}): ").strip()
+                self.generate_all_pages(workers=int(workers) if workers.isdigit() else DEFAULT_WORKERS)
+
+            elif choice == "11":
                 # Exit
                 self.print_info("Exiting...")
                 break
 
             else:
-                self.print_error("Invalid choice. Please enter a number between 1-10.")
+                self.print_error("Invalid choice. Please enter a number between 1-11.")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="AI Agent for Mobile Webdriver")
+    subparsers = parser.add_subparsers(dest="command")
+
+    gen_all = subparsers.add_parser("generate-all", help="Generate tests for every acceptance-criteria file")
+    gen_all.add_argument("--pages", nargs="+", help="Only these pages (default: all)")
+    gen_all.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Pages generated in parallel")
+    gen_all.add_argument("--force", action="store_true", help="Regenerate even if inputs are unchanged")
+
+    follow = subparsers.add_parser("follow", help="Live-tail the output of an API job")
+    follow.add_argument("job_id")
+    follow.add_argument("--api", default=os.getenv("AGENT_API_URL", "http://localhost:8000"), help="Backend base URL")
+
+    sharded = subparsers.add_parser("run-sharded", help="Run specs across every attached device in parallel")
+    sharded.add_argument("--platform", default="Android", choices=["Android", "iOS"])
+    sharded.add_argument("--devices", nargs="+", help="Only these device ids (default: all detected)")
+    sharded.add_argument("--pages", nargs="+", help="Only these pages' specs (default: all)")
+    sharded.add_argument("--changed-only", action="store_true", help="Only specs affected by changes since they last passed")
+    sharded.add_argument("--fail-fast", action="store_true", help="Each shard stops at its first failed test")
+
+    stats = subparsers.add_parser("spec-stats", help="Per-spec duration, failure rate and flakiness from the results history")
+    stats.add_argument("--runs", type=int, default=STATS_HISTORY_RUNS, help="Runs of history to use")
+
+    subparsers.add_parser("impact", help="List the specs affected by changes since they last passed")
+
+    appium = subparsers.add_parser("appium", help="Page source, find, tap or screenshot on a warm Appium session")
+    appium.add_argument("action", choices=["source", "crawl", "find", "tap", "screenshot", "sessions", "close"])
+    appium.add_argument("target", nargs="?", help="Page name (crawl), selector (find/tap) or output file (screenshot)")
+    appium.add_argument("--platform", default="Android", choices=["Android", "iOS"])
+    appium.add_argument("--udid", help="Device id (default: DEVICE_UDID or whatever Appium picks)")
+
+    explore = subparsers.add_parser("explore", help="Tap through the app unattended and crawl every screen reached")
+    explore.add_argument("--platform", default="Android", choices=["Android", "iOS"])
+    explore.add_argument("--udid", help="Device id (default: DEVICE_UDID or the only attached device)")
+    explore.add_argument("--backend", default="auto", choices=["auto", "adb", "appium"])
+    explore.add_argument("--max-taps", type=int, default=EXPLORER_MAX_TAPS)
+    explore.add_argument("--max-seconds", type=float, default=EXPLORER_MAX_SECONDS)
+    explore.add_argument("--max-screens", type=int, default=EXPLORER_MAX_SCREENS)
+    explore.add_argument("--max-depth", type=int, default=EXPLORER_MAX_DEPTH)
+
+    classify = subparsers.add_parser("classify", help="Name the known screen each page source shows, or check the saved crawls")
+    classify.add_argument("files", nargs="*", help="Page source XML files (default: check every crawls/*.xml)")
+
+    parser.add_argument("--quiet", action="store_true", help="Do not echo wdio output while it runs")
+
+    args = parser.parse_args()
     cli = CLI()
+    cli.live_output = not args.quiet
+
+    if args.command == "follow":
+        raise SystemExit(0 if cli.follow_job(args.job_id, args.api) else 1)
+
+    if args.command == "run-sharded":
+        raise SystemExit(0 if cli.run_sharded(args.platform, args.devices, args.pages, args.changed_only, args.fail_fast) else 1)
+
+    if args.command == "spec-stats":
+        spec_stats = load_stats(last_runs=args.runs)
+        plan = plan_run_order(list_specs(), spec_stats)
+        for spec in plan.ordered + plan.flaky:
+            entry = spec_stats.get(spec)
+            if entry is None:
+                print(f"  {spec}: no history")
+                continue
+            flaky = f", flaky: {', '.join(entry.flaky_tests)}" if entry.flaky else ""
+            print(f"  {spec}: {entry.runs} runs, {entry.failed_runs} failed, avg {entry.avg_ms / 1000:.1f}s{flaky}")
+        raise SystemExit(0)
+
+    if args.command == "appium":
+        raise SystemExit(0 if cli.appium_command(args.action, args.target, args.platform, args.udid) else 1)
+
+    if args.command == "explore":
+        ok = cli.explore(args.platform, args.udid, args.backend, max_taps=args.max_taps, max_seconds=args.max_seconds,
+                         max_screens=args.max_screens, max_depth=args.max_depth)
+        raise SystemExit(0 if ok else 1)
+
+    if args.command == "classify":
+        raise SystemExit(0 if cli.classify(args.files) else 1)
+
+    if args.command == "impact":
+        specs = cli._impacted_specs()
+        print(f"{len(specs)} of {len(get_default_analyzer().specs())} specs impacted")
+        raise SystemExit(0)
+
+    if args.command == "generate-all":
+        if not cli.initialize_agent():
+            raise SystemExit(1)
+        ok = cli.generate_all_pages(pages=args.pages, workers=args.workers, force=args.force)
+        raise SystemExit(0 if ok else 1)
+
+    # No sub-command: interactive menu
     cli.run_full_workflow()
 
 
@@ -0,0 +1,87 @@
+"""
+Batch crawl: visit several screens in one wdio/Appium session, one crawls/{page}.xml each
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from navigation_graph import build_navigation_graph
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+CRAWL_SPEC = "./src/tests/crawl-page.e2e.ts"
+
+# Screen the app opens on after a relaunch; navigation plans start here
+CRAWL_START_SCREEN = os.getenv("CRAWL_START_SCREEN", "home")
+
+# Printed by crawl-page.e2e.ts once per page: CRAWL_RESULT {"page": ..., "ok": ..., "ms": ...}
+CRAWL_RESULT = re.compile(r"CRAWL_RESULT (\{.*\})\s*$")
+
+
+def parse_crawl_result(line: str) -> Optional[Dict[str, Any]]:
+    match = CRAWL_RESULT.search(line)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def navigation_plan(
+    pages: Sequence[str],
+    start_screen: str = CRAWL_START_SCREEN,
+    crawls_dir: Path = CRAWLS_DIR,
+) -> Dict[str, List[str]]:
+    """{page: [selector to tap, ...]} from the launch screen, for pages the navigation graph can reach.
+
+    Pages left out (unknown to the graph, or the launch screen itself) fall back to
+    the spec's built-in navigation.
+    """
+    try:
+        graph = build_navigation_graph(crawls_dir, extra_screens=pages)
+    except Exception:
+        return {}
+    plan = {}
+    for page in pages:
+        path = graph.shortest_path(start_screen, page)
+        if path:
+            plan[page.lower()] = [edge.selector for edge in path]
+    return plan
+
+
+def crawl_env(
+    pages: Sequence[str],
+    plan: Optional[Dict[str, List[str]]] = None,
+    base: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Environment for one crawl-page.e2e.ts run over all `pages`"""
+    env = dict(os.environ if base is None else base)
+    env["CRAWL_PAGE_NAMES"] = ",".join(pages)
+    env["CRAWL_PAGE_NAME"] = pages[0]  # older copies of the spec only read this
+    env["CRAWL_NAV_PLAN"] = json.dumps(plan or {})
+    return env
+
+
+def summarize(pages: Sequence[str], results: Dict[str, Dict[str, Any]], elapsed_ms: float) -> Dict[str, Any]:
+    """Per-page outcomes plus how much of the run was shared session setup"""
+    per_page = {
+        page: results.get(page, {"page": page, "ok": False, "error": "not reached (session or run failed)"})
+        for page in pages
+    }
+    page_ms = sum(r.get("ms", 0) for r in per_page.values())
+    return {
+        "pages": per_page,
+        "succeeded": [page for page, r in per_page.items() if r.get("ok")],
+        "failed": [page for page, r in per_page.items() if not r.get("ok")],
+        "elapsed_ms": round(elapsed_ms),
+        "setup_ms": max(0, round(elapsed_ms - page_ms)),
+    }
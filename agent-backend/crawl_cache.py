@@ -0,0 +1,150 @@
+"""
+Process-wide cache of parsed crawl indexes, shared by the API and CLI
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from crawl_index import CrawlIndex, parse_crawl_xml
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("CRAWL_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Rough per-element cost of a CrawlElement (object header + slots + tuple for bounds)
+ELEMENT_OVERHEAD_BYTES = 200
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in chunks without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def estimate_index_bytes(index: CrawlIndex) -> int:
+    """Approximate memory held by an index, used for the cache's memory cap"""
+    total = 0
+    for el in index.elements:
+        total += ELEMENT_OVERHEAD_BYTES + len(el.content_desc) + len(el.resource_id) + len(el.text)
+    return total
+
+
+class _CacheEntry:
+    __slots__ = ("mtime_ns", "size", "sha256", "index", "bytes")
+
+    def __init__(self, mtime_ns: int, size: int, sha256: str, index: CrawlIndex, nbytes: int):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.index = index
+        self.bytes = nbytes
+
+
+class CrawlIndexCache:
+    """LRU cache of CrawlIndex objects keyed by crawl file path.
+
+    An entry is reused while the file's mtime and size are unchanged. If they
+    changed, the content hash is compared before re-parsing, so a re-crawl that
+    produced an identical page source costs a hash instead of a parse.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Union[str, Path]) -> CrawlIndex:
+        """Return the parsed index for a crawl file, parsing it only when its content changed"""
+        path = Path(path)
+        key = str(path.resolve())
+        stat = path.stat()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.index
+
+        sha256 = file_sha256(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.sha256 == sha256:
+                # Touched but identical content - refresh the stat and keep the index
+                entry.mtime_ns = stat.st_mtime_ns
+                entry.size = stat.st_size
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.index
+
+        index = parse_crawl_xml(path)
+        nbytes = estimate_index_bytes(index)
+
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old.bytes
+            if nbytes <= self.max_bytes:
+                self._entries[key] = _CacheEntry(stat.st_mtime_ns, stat.st_size, sha256, index, nbytes)
+                self._bytes += nbytes
+                self._evict()
+        return index
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.bytes
+            self.evictions += 1
+
+    def content_hash(self, path: Union[str, Path]) -> Optional[str]:
+        """SHA-256 of a crawl file, served from the cache when the file is unchanged"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        key = str(path.resolve())
+        stat = path.stat()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry.sha256
+        return file_sha256(path)
+
+    def invalidate(self, path: Optional[Union[str, Path]] = None):
+        """Drop one crawl file from the cache, or everything when path is None"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(str(Path(path).resolve()), None)
+            if entry:
+                self._bytes -= entry.bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+crawl_index_cache = CrawlIndexCache()
+
+
+def get_crawl_index(path: Union[str, Path]) -> CrawlIndex:
+    """Parsed index for a crawl file from the process-wide cache"""
+    return crawl_index_cache.get(path)
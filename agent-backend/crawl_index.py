@@ -0,0 +1,224 @@
+"""
+Streaming element index for crawled page sources (Android UiAutomator2 and iOS XCUITest)
+"""
+
+import io
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# Wrapper nodes that are not real UI elements
+ROOT_TAGS = {"hierarchy", "AppiumAUT"}
+
+# XCUITest has no clickable attribute; these element types accept taps
+IOS_TAPPABLE_TYPES = {
+    "XCUIElementTypeButton",
+    "XCUIElementTypeCell",
+    "XCUIElementTypeLink",
+    "XCUIElementTypeTextField",
+    "XCUIElementTypeSecureTextField",
+    "XCUIElementTypeTextView",
+    "XCUIElementTypeSearchField",
+    "XCUIElementTypeSwitch",
+    "XCUIElementTypeSlider",
+    "XCUIElementTypeTab",
+    "XCUIElementTypeSegmentedControl",
+    "XCUIElementTypeMenuItem",
+}
+
+
+class CrawlElement:
+    """One UI element from a crawl, holding only the attributes the agent uses"""
+
+    __slots__ = (
+        "class_name",
+        "content_desc",
+        "resource_id",
+        "text",
+        "bounds",
+        "clickable",
+        "enabled",
+        "depth",
+        "position",
+    )
+
+    def __init__(
+        self,
+        class_name: str,
+        content_desc: str = "",
+        resource_id: str = "",
+        text: str = "",
+        bounds: Optional[Tuple[int, int, int, int]] = None,
+        clickable: bool = False,
+        enabled: bool = True,
+        depth: int = 0,
+        position: int = 0,
+    ):
+        self.class_name = class_name
+        self.content_desc = content_desc
+        self.resource_id = resource_id
+        self.text = text
+        self.bounds = bounds  # (x1, y1, x2, y2)
+        self.clickable = clickable
+        self.enabled = enabled
+        self.depth = depth
+        self.position = position  # document order within the crawl
+
+    @property
+    def short_class(self) -> str:
+        """Class name without package / XCUIElementType prefix"""
+        return self.class_name.rsplit(".", 1)[-1].replace("XCUIElementType", "")
+
+    @property
+    def selector(self) -> Optional[str]:
+        """Preferred WebdriverIO selector for this element, if it has a stable one"""
+        if self.content_desc.strip():
+            return f"~{self.content_desc}"
+        if ":id/" in self.resource_id:
+            return f"id={self.resource_id}"
+        return None
+
+    def matches(self, selector: str) -> bool:
+        """Whether a ~accessibility-id / id= selector finds this element"""
+        if selector.startswith("~"):
+            return self.content_desc == selector[1:]
+        if selector.startswith("id="):
+            return self.resource_id == selector[3:]
+        return self.selector == selector
+
+    def __repr__(self) -> str:
+        return f"CrawlElement({self.short_class!r}, desc={self.content_desc!r}, id={self.resource_id!r}, depth={self.depth})"
+
+
+class CrawlIndex:
+    """Flat, document-ordered list of elements parsed once from a crawl"""
+
+    __slots__ = ("source", "platform", "elements")
+
+    def __init__(self, source: str = "", platform: str = "unknown", elements: Optional[List[CrawlElement]] = None):
+        self.source = source
+        self.platform = platform
+        self.elements: List[CrawlElement] = elements if elements is not None else []
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def __iter__(self) -> Iterator[CrawlElement]:
+        return iter(self.elements)
+
+    def selectors(self) -> List[Dict[str, str]]:
+        """Accessibility-id selectors followed by resource-id selectors, in document order"""
+        selectors = []
+
+        # content-desc (Android) / name (iOS) - most reliable for mobile
+        for el in self.elements:
+            if el.content_desc.strip():
+                selectors.append({
+                    "type": "accessibility-id",
+                    "value": el.content_desc,
+                    "selector": f"~{el.content_desc}",
+                    "name": el.content_desc.lower().replace('-', '_').replace(' ', '_'),
+                })
+
+        # resource-id (Android only)
+        for el in self.elements:
+            if el.resource_id.strip() and ':id/' in el.resource_id:
+                id_name = el.resource_id.split(':id/')[-1]
+                selectors.append({
+                    "type": "resource-id",
+                    "value": el.resource_id,
+                    "selector": f"id={el.resource_id}",
+                    "name": id_name.lower().replace('-', '_'),
+                })
+
+        return selectors
+
+
+def _parse_bounds(value: str) -> Optional[Tuple[int, int, int, int]]:
+    match = BOUNDS_PATTERN.match(value)
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
+
+
+def _ios_bounds(attrib: Dict[str, str]) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        x, y = int(attrib["x"]), int(attrib["y"])
+        return (x, y, x + int(attrib["width"]), y + int(attrib["height"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _android_element(attrib: Dict[str, str], tag: str, depth: int, position: int) -> CrawlElement:
+    return CrawlElement(
+        class_name=sys.intern(attrib.get("class") or tag),
+        content_desc=attrib.get("content-desc", ""),
+        resource_id=attrib.get("resource-id", ""),
+        text=attrib.get("text", ""),
+        bounds=_parse_bounds(attrib.get("bounds", "")),
+        clickable=attrib.get("clickable") == "true",
+        enabled=attrib.get("enabled", "true") == "true",
+        depth=depth,
+        position=position,
+    )
+
+
+def _ios_element(attrib: Dict[str, str], tag: str, depth: int, position: int) -> CrawlElement:
+    class_name = sys.intern(attrib.get("type") or tag)
+    return CrawlElement(
+        class_name=class_name,
+        content_desc=attrib.get("name", ""),
+        text=attrib.get("label") or attrib.get("value") or "",
+        bounds=_ios_bounds(attrib),
+        clickable=class_name in IOS_TAPPABLE_TYPES,
+        enabled=attrib.get("enabled", "true") == "true",
+        depth=depth,
+        position=position,
+    )
+
+
+def parse_crawl_xml(source: Union[str, Path, BinaryIO]) -> CrawlIndex:
+    """Build a CrawlIndex from a page source file (or binary file object) in one streaming pass.
+
+    Attributes are read on each start event and finished subtrees are cleared
+    straight away, so memory stays proportional to tree depth plus the index itself.
+    """
+    index = CrawlIndex(source=str(source) if isinstance(source, (str, Path)) else "")
+    make_element = None
+    stack: List[ET.Element] = []
+    depth = 0
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag in ROOT_TAGS:
+                continue
+            if make_element is None:
+                # Platform is decided by the first real element
+                if elem.tag.startswith("XCUIElementType"):
+                    index.platform = "ios"
+                    make_element = _ios_element
+                else:
+                    index.platform = "android"
+                    make_element = _android_element
+            index.elements.append(make_element(elem.attrib, elem.tag, depth, len(index.elements)))
+            depth += 1
+        else:
+            stack.pop()
+            if elem.tag not in ROOT_TAGS:
+                depth -= 1
+            # Drop the finished subtree; its attributes are already in the index
+            elem.clear()
+            if stack:
+                del stack[-1][:]
+
+    return index
+
+
+def parse_crawl_string(xml: str) -> CrawlIndex:
+    """Build a CrawlIndex from page source held in memory (e.g. driver.getPageSource())"""
+    return parse_crawl_xml(io.BytesIO(xml.encode("utf-8")))
@@ -13,6 +13,14 @@ MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
 WDIO_CONFIG_FILE = MOBILE_TESTS_DIR / "wdio.conf.ts"
 
 
+def platform_version(device: Dict[str, str]) -> Optional[str]:
+    """Appium platformVersion for a detected device ("Android 14" -> "14", "iOS 17 0" -> "17.0")"""
+    version = str(device.get("version") or "").replace("Android ", "").replace("iOS ", "").strip()
+    if not version or version == "Unknown":
+        return None
+    return ".".join(version.split())
+
+
 class DeviceManager:
     """Manages device detection and WebdriverIO configuration"""
 
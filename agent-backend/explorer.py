@@ -0,0 +1,379 @@
+"""
+Unattended app exploration: breadth-first taps over every reachable screen within a budget
+
+Each structurally new screen is saved as crawls/{name}.xml and the tap that reached
+it is recorded in crawls/navigation.json, so the navigation graph (and every
+navigateTo / batch crawl built on it) can replay the path later.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from adb_crawler import ADB_TAP_SETTLE_MS, AdbDevice, AdbError, adb_udid, find_center
+from appium_client import AppiumError, AppiumSession, AppiumSessionPool, get_default_pool
+from crawl_batch import CRAWL_START_SCREEN, CRAWLS_DIR
+from crawl_index import CrawlIndex, parse_crawl_string
+from navigation_graph import NAVIGATION_FILE, record_transition
+from screen_fingerprint import SCREEN_DEDUPE_THRESHOLD, ScreenFingerprint, ScreenIndex, fingerprint_string
+from selector_matcher import snapshot_crawl
+from wait_strategy import detect_app_id
+
+load_dotenv()
+
+EXPLORER_MAX_TAPS = int(os.getenv("EXPLORER_MAX_TAPS", "200"))
+EXPLORER_MAX_SECONDS = float(os.getenv("EXPLORER_MAX_SECONDS", "900"))
+EXPLORER_MAX_SCREENS = int(os.getenv("EXPLORER_MAX_SCREENS", "50"))
+EXPLORER_MAX_DEPTH = int(os.getenv("EXPLORER_MAX_DEPTH", "6"))
+# Wait after each tap before reading the new screen
+EXPLORER_SETTLE_MS = int(os.getenv("EXPLORER_SETTLE_MS", str(ADB_TAP_SETTLE_MS)))
+# Controls never tapped (by label): destructive or leaves the app / account
+EXPLORER_SKIP_PATTERN = re.compile(os.getenv(
+    "EXPLORER_SKIP_PATTERN",
+    r"\b(?:log.?out|sign.?out|delete|remove|uninstall|purchase|buy|pay|reset|close.?account)\b",
+), re.IGNORECASE)
+
+# Tapping these only focuses or toggles them; they never navigate
+NON_NAVIGATING_CLASSES = {"EditText", "TextField", "SecureTextField", "TextView", "SearchField", "Switch", "Slider", "SeekBar"}
+# Words dropped when naming a screen after the control that opened it
+NAME_NOISE = {"button", "btn", "container", "tab", "nav", "navigation", "screen", "menu", "item", "link", "icon"}
+
+
+class ExplorerError(Exception):
+    pass
+
+
+def _label_name(label: str) -> str:
+    words = [w for w in re.split(r"[^a-z0-9]+", label.lower()) if w and w not in NAME_NOISE]
+    return "".join(words)
+
+
+def screen_names(index: CrawlIndex, hint: str = "") -> List[str]:
+    """Page name candidates for a screen: its '*-screen' container label, then the label of the control that opened it"""
+    names = [_label_name(el.content_desc) for el in index.elements if el.content_desc.lower().endswith("screen")]
+    names.append(_label_name(hint))
+    return [name for name in dict.fromkeys(names) if name] or ["screen"]
+
+
+def tap_candidates(index: CrawlIndex) -> List[Tuple[str, str]]:
+    """(selector, label) of the controls worth tapping on a screen, in document order, each selector once"""
+    candidates: Dict[str, str] = {}
+    for el in index.elements:
+        selector = el.selector
+        if not selector or selector in candidates or not el.enabled:
+            continue
+        if not el.clickable or el.short_class in NON_NAVIGATING_CLASSES:
+            continue
+        label = el.content_desc or el.resource_id.split(":id/")[-1] or el.text
+        if EXPLORER_SKIP_PATTERN.search(label) or EXPLORER_SKIP_PATTERN.search(el.text):
+            continue
+        candidates[selector] = label
+    return list(candidates.items())
+
+
+class AppiumExplorerDriver:
+    """Explorer actions over a pooled Appium session"""
+
+    def __init__(self, session: AppiumSession, app_id: Optional[str] = None):
+        self.session = session
+        self.app_id = app_id or detect_app_id()
+
+    def page_source(self) -> str:
+        return self.session.get_page_source()
+
+    def tap(self, selector: str, source: str):
+        self.session.tap(selector)
+
+    def back(self):
+        self.session.back()
+
+    def reset(self):
+        self.session.restart_app(self.app_id)
+
+
+class AdbExplorerDriver:
+    """Explorer actions over adb: uiautomator dumps and `input tap` at element centers"""
+
+    def __init__(self, device: AdbDevice, package: Optional[str] = None):
+        self.device = device
+        self.package = package or detect_app_id()
+
+    def page_source(self) -> str:
+        return self.device.dump()
+
+    def tap(self, selector: str, source: str):
+        center = find_center(source, selector)
+        if center is None:
+            raise AdbError(f"{selector} is not on screen")
+        self.device.tap(*center)
+
+    def back(self):
+        self.device.back()
+
+    def reset(self):
+        if not self.package:
+            raise AdbError("app package unknown; set APP_PACKAGE")
+        self.device.restart_app(self.package)
+        self.device.wait_for(package=self.package)
+
+
+DRIVER_ERRORS = (AppiumError, AdbError)
+
+
+class Screen:
+    """A distinct screen found during exploration and the taps that reach it from launch"""
+
+    __slots__ = ("name", "fingerprint", "path", "depth", "crawl_file", "element_count")
+
+    def __init__(self, name: str, fingerprint: str, path: List[str], crawl_file: Optional[Path], element_count: int):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.path = path
+        self.depth = len(path)
+        self.crawl_file = crawl_file
+        self.element_count = element_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "fingerprint": self.fingerprint,
+            "path": self.path,
+            "crawl_file": str(self.crawl_file) if self.crawl_file else None,
+            "element_count": self.element_count,
+        }
+
+
+class Explorer:
+    """Breadth-first exploration of an app from its launch screen.
+
+    Every enabled, clickable control with a stable selector is tapped once per
+    screen. A screen counts as new when its structural fingerprint is not within
+    dedupe_threshold of a screen seen this run. A screen the existing crawls
+    classify as one of them keeps that crawl's name; no other screen takes it.
+    After each tap the explorer returns to the screen under exploration with the
+    back button, or by relaunching the app and replaying that screen's path.
+    """
+
+    def __init__(
+        self,
+        driver: Any,
+        crawls_dir: Path = CRAWLS_DIR,
+        navigation_file: Optional[Path] = None,
+        start_screen: str = CRAWL_START_SCREEN,
+        max_taps: int = EXPLORER_MAX_TAPS,
+        max_seconds: float = EXPLORER_MAX_SECONDS,
+        max_screens: int = EXPLORER_MAX_SCREENS,
+        max_depth: int = EXPLORER_MAX_DEPTH,
+        settle_ms: int = EXPLORER_SETTLE_MS,
+        dedupe_threshold: float = SCREEN_DEDUPE_THRESHOLD,
+        save: bool = True,
+        stop_event: Optional[threading.Event] = None,
+        log: Callable[[str], None] = print,
+    ):
+        self.driver = driver
+        self.crawls_dir = Path(crawls_dir)
+        self.navigation_file = navigation_file or self.crawls_dir / NAVIGATION_FILE.name
+        self.start_screen = start_screen.lower()
+        self.max_taps = max_taps
+        self.max_seconds = max_seconds
+        self.max_screens = max_screens
+        self.max_depth = max_depth
+        self.settle_ms = settle_ms
+        self.dedupe_threshold = dedupe_threshold
+        self.save = save
+        self.stop_event = stop_event or threading.Event()
+        self.log = log
+
+        self.screens: Dict[str, Screen] = {}  # name -> screen
+        self.known = ScreenIndex(self.crawls_dir)  # crawls already on disk
+        self._found = ScreenIndex(None)  # screens found this run, by name
+        self._seen: Dict[str, Screen] = {}  # root hash of every capture -> its screen
+        self.transitions: List[Dict[str, str]] = []
+        self.errors: List[str] = []
+        self.taps = 0
+        self.started = 0.0
+        self.stopped_reason = "done"
+        self._current: Optional[Screen] = None  # screen showing, when known
+
+    def _match(self, fingerprint: ScreenFingerprint) -> Optional[Screen]:
+        """Screen found this run that a capture shows (exactly, or within dedupe_threshold)"""
+        screen = self._seen.get(fingerprint.root)
+        if screen is None:
+            ranked = self._found.ranked(fingerprint)
+            if ranked and ranked[0][1] >= self.dedupe_threshold:
+                screen = self.screens[ranked[0][0]]
+                self._seen[fingerprint.root] = screen
+        return screen
+
+    def _budget_left(self) -> bool:
+        if self.stop_event.is_set():
+            self.stopped_reason = "cancelled"
+        elif self.taps >= self.max_taps:
+            self.stopped_reason = "tap budget"
+        elif time.monotonic() - self.started >= self.max_seconds:
+            self.stopped_reason = "time budget"
+        elif len(self.screens) >= self.max_screens:
+            self.stopped_reason = "screen budget"
+        else:
+            return True
+        return False
+
+    def _observe(self) -> Tuple[str, CrawlIndex, ScreenFingerprint]:
+        """(source, index, fingerprint) of the screen showing now"""
+        source = self.driver.page_source()
+        index = parse_crawl_string(source)
+        fingerprint = fingerprint_string(source)
+        self._current = self._match(fingerprint)
+        return source, index, fingerprint
+
+    def _tap(self, selector: str, source: str) -> Tuple[str, CrawlIndex, ScreenFingerprint]:
+        self.driver.tap(selector, source)
+        self.taps += 1
+        time.sleep(self.settle_ms / 1000)
+        return self._observe()
+
+    def _unique_name(self, candidates: List[str], known: Optional[str] = None) -> str:
+        """First candidate not taken, else the first one with a numeric suffix.
+
+        A name is taken when a screen found in this run uses it, or when a crawl on
+        disk has it and the classifier did not match the screen to that crawl
+        (`known`): reusing it would overwrite a different screen's crawl.
+        """
+        def taken(name: str) -> bool:
+            return name in self.screens or (name in self.known.screens and name != known)
+
+        for name in candidates:
+            if not taken(name):
+                return name
+        name, suffix = candidates[0], 2
+        while taken(f"{name}{suffix}"):
+            suffix += 1
+        return f"{name}{suffix}"
+
+    def _add_screen(self, source: str, index: CrawlIndex, fingerprint: ScreenFingerprint, path: List[str], hint: str) -> Screen:
+        known = self.known.classify(fingerprint)["page"]
+        candidates = ([known] if known else []) + screen_names(index, hint)
+        name = self._unique_name(candidates, known)
+        crawl_file = None
+        if self.save:
+            snapshot_crawl(name, self.crawls_dir)
+            crawl_file = self.crawls_dir / f"{name}.xml"
+            crawl_file.parent.mkdir(parents=True, exist_ok=True)
+            crawl_file.write_text(source, encoding="utf-8")
+        screen = Screen(name, fingerprint.root, path, crawl_file, len(index))
+        self.screens[name] = screen
+        self._found.add(name, fingerprint)
+        self._seen[fingerprint.root] = screen
+        self._current = screen
+        self.log(f"  + {name} ({len(index)} elements) via {' > '.join(path) or 'launch'}")
+        return screen
+
+    def _record(self, source: Screen, target: Screen, selector: str):
+        transition = {"from": source.name, "to": target.name, "selector": selector}
+        if transition in self.transitions:
+            return
+        self.transitions.append(transition)
+        if self.save:
+            record_transition(source.name, target.name, selector, self.navigation_file)
+
+    def _return_to(self, screen: Screen) -> Optional[Tuple[str, CrawlIndex]]:
+        """Get back to `screen`: back button first, then relaunch and replay its path"""
+        if self._current is screen:
+            return None
+        try:
+            self.driver.back()
+            time.sleep(self.settle_ms / 1000)
+            source, index, _ = self._observe()
+            if self._current is screen:
+                return source, index
+        except DRIVER_ERRORS:
+            pass
+        self.driver.reset()
+        source, index, _ = self._observe()
+        for selector in screen.path:
+            source, index, _ = self._tap(selector, source)
+        if self._current is not screen:
+            raise ExplorerError(f"replaying {' > '.join(screen.path)} did not reach {screen.name}")
+        return source, index
+
+    def run(self) -> Dict[str, Any]:
+        """Explore until every reachable screen is done or a budget runs out; returns a report"""
+        self.started = time.monotonic()
+        self.known.refresh()
+        self.driver.reset()
+        source, index, fingerprint = self._observe()
+        root = self._add_screen(source, index, fingerprint, [], self.start_screen)
+
+        queue: Deque[Tuple[Screen, str, CrawlIndex]] = deque([(root, source, index)])
+        while queue and self._budget_left():
+            screen, screen_source, screen_index = queue.popleft()
+            if screen.depth >= self.max_depth:
+                continue
+            for selector, label in tap_candidates(screen_index):
+                if not self._budget_left():
+                    break
+                try:
+                    returned = self._return_to(screen)
+                except (ExplorerError, *DRIVER_ERRORS) as e:
+                    self.errors.append(f"{screen.name}: no longer reachable ({e})")
+                    self._current = None
+                    break
+                if returned:
+                    screen_source, screen_index = returned
+                if not any(el.selector == selector for el in screen_index.elements):
+                    continue  # not on screen this time (e.g. dismissed banner)
+                try:
+                    source, index, fingerprint = self._tap(selector, screen_source)
+                except DRIVER_ERRORS as e:
+                    self.errors.append(f"{screen.name} > {selector}: {e}")
+                    self._current = None
+                    continue
+                target = self._current
+                if target is screen:
+                    continue  # stayed on the same screen
+                if target is None:
+                    target = self._add_screen(source, index, fingerprint, screen.path + [selector], label)
+                    queue.append((target, source, index))
+                self._record(screen, target, selector)
+
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "screens": [s.to_dict() for s in self.screens.values()],
+            "transitions": self.transitions,
+            "taps": self.taps,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "stopped": self.stopped_reason,
+            "errors": self.errors,
+        }
+
+
+def explore_app(
+    platform: str = "Android",
+    device: Optional[Dict[str, Any]] = None,
+    backend: str = "auto",
+    pool: Optional[AppiumSessionPool] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Explore the app on a device over adb ("adb"), a pooled Appium session ("appium"), or adb when available ("auto").
+
+    options go to Explorer (budgets, crawls_dir, stop_event, log, ...).
+    """
+    udid = None
+    if backend in ("auto", "adb") and platform.lower() == "android":
+        udid = (device or {}).get("id") or adb_udid(platform, device)
+    if backend == "adb" and not udid:
+        raise ExplorerError("No Android device reachable over adb")
+    if udid:
+        report = Explorer(AdbExplorerDriver(AdbDevice(udid)), **options).run()
+        return {**report, "backend": "adb", "device": udid}
+    with (pool or get_default_pool()).session(platform, device) as session:
+        report = Explorer(AppiumExplorerDriver(session), **options).run()
+    return {**report, "backend": "appium", "device": session.key}
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an Appium server, for benchmarks and offline runs of appium_client.py
+
+Screens are crawl XMLs (crawls/{screen}.xml). Tapping an element moves the fake app
+to another screen when the transitions file says so:
+    {"home": {"~Login": "login"}, "login": {"~button-sign-up-container": "signup"}}
+
+Usage:
+    python fake_appium.py --port 4799 --crawls ../mobile-tests/crawls --start home --session-latency 5
+    APPIUM_URL=http://127.0.0.1:4799 python cli.py appium source
+"""
+
+import argparse
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from appium_client import W3C_ELEMENT_KEY
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CRAWLS_DIR = ROOT_DIR / "mobile-tests" / "crawls"
+
+# 1x1 transparent PNG
+BLANK_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+EMPTY_SCREEN = '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"></hierarchy>'
+
+
+def find_elements(source: str, using: str, value: str) -> List[int]:
+    """Document-order positions of the elements a locator matches in a page source"""
+    root = ET.fromstring(source)
+    nodes = list(root.iter())
+    if using == "xpath":
+        try:
+            matched = set(map(id, root.findall("." + value if value.startswith("/") else value)))
+        except (SyntaxError, KeyError):
+            return []
+        return [i for i, node in enumerate(nodes) if id(node) in matched]
+    if using == "accessibility id":
+        attributes = ("content-desc", "name", "accessibility-id")
+    elif using == "id":
+        attributes = ("resource-id", "name")
+    elif using == "class name":
+        return [i for i, node in enumerate(nodes) if node.tag == value or node.get("class") == value]
+    elif using == "-android uiautomator":
+        match = re.search(r'(?:description|resourceId|text)\("([^"]*)"\)', value)
+        value = match.group(1) if match else value
+        attributes = ("content-desc", "resource-id", "text")
+    else:
+        attributes = ("name", "label", "value")
+    return [i for i, node in enumerate(nodes) if any(node.get(a) == value for a in attributes)]
+
+
+class FakeAppiumServer:
+    """Threaded HTTP server speaking enough of the W3C WebDriver protocol for appium_client.
+
+    session_latency/command_latency add a delay in seconds to session creation and
+    to every other command. Each session keeps its own current screen.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        crawls_dir: Path = CRAWLS_DIR,
+        start_screen: str = "home",
+        transitions: Optional[Dict[str, Dict[str, str]]] = None,
+        session_latency: float = 0.0,
+        command_latency: float = 0.0,
+    ):
+        self.crawls_dir = Path(crawls_dir)
+        self.start_screen = start_screen
+        self.transitions = transitions or {}
+        self.session_latency = session_latency
+        self.command_latency = command_latency
+        self.sessions: Dict[str, Dict[str, Any]] = {}  # id -> {"screen", "elements"}
+        self.sessions_created = 0
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def screen_source(self, screen: str) -> str:
+        path = self.crawls_dir / f"{screen}.xml"
+        return path.read_text(encoding="utf-8") if path.exists() else EMPTY_SCREEN
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, format: str, *args: Any):
+                pass  # keep benchmark output clean
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _send(self, status: int, value: Any):
+                payload = json.dumps({"value": value}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status: int, error: str, message: str = ""):
+                self._send(status, {"error": error, "message": message})
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length", "0"))
+                try:
+                    return json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return {}
+
+            def _handle(self, method: str):
+                body = self._body() if method == "POST" else {}
+                with server._lock:
+                    server.requests += 1
+                parts = [p for p in self.path.split("/") if p]
+                if parts == ["status"]:
+                    return self._send(200, {"ready": True, "message": "fake appium"})
+                if parts == ["session"] and method == "POST":
+                    time.sleep(server.session_latency)
+                    session_id = uuid.uuid4().hex
+                    with server._lock:
+                        server.sessions[session_id] = {"screen": server.start_screen, "elements": {}, "history": []}
+                        server.sessions_created += 1
+                    caps = body.get("capabilities", {}).get("alwaysMatch", {})
+                    return self._send(200, {"sessionId": session_id, "capabilities": caps})
+                if len(parts) < 2 or parts[0] != "session":
+                    return self._error(404, "unknown command", self.path)
+                session = server.sessions.get(parts[1])
+                if session is None:
+                    return self._error(404, "invalid session id", parts[1])
+                if server.command_latency:
+                    time.sleep(server.command_latency)
+                command = parts[2:]
+
+                if not command and method == "DELETE":
+                    server.sessions.pop(parts[1], None)
+                    return self._send(200, None)
+                if command == ["timeouts"]:
+                    return self._send(200, {"implicit": 0, "pageLoad": 300000, "script": 30000})
+                if command == ["source"]:
+                    return self._send(200, server.screen_source(session["screen"]))
+                if command == ["screenshot"]:
+                    return self._send(200, base64.b64encode(BLANK_PNG).decode("ascii"))
+                if command in (["element"], ["elements"]) and method == "POST":
+                    using, value = body.get("using", ""), body.get("value", "")
+                    positions = find_elements(server.screen_source(session["screen"]), using, value)
+                    found = []
+                    for position in positions:
+                        element_id = uuid.uuid4().hex
+                        session["elements"][element_id] = (session["screen"], using, value, position)
+                        found.append({W3C_ELEMENT_KEY: element_id})
+                    if command == ["elements"]:
+                        return self._send(200, found)
+                    if not found:
+                        return self._error(404, "no such element", f"{using}={value}")
+                    return self._send(200, found[0])
+                if len(command) == 3 and command[0] == "element" and command[2] == "click":
+                    element = session["elements"].get(command[1])
+                    if element is None or element[0] != session["screen"]:
+                        return self._error(404, "stale element reference", command[1])
+                    screen, using, value = element[:3]
+                    selector = {"accessibility id": "~", "id": "id="}.get(using, "") + value
+                    target = server.transitions.get(screen, {}).get(selector)
+                    if target:
+                        session["history"].append(session["screen"])
+                        session["screen"] = target
+                    return self._send(200, None)
+                if command[:2] == ["appium", "device"] and command[2:] in (["terminate_app"], ["activate_app"]):
+                    session["screen"] = server.start_screen
+                    session["history"] = []
+                    return self._send(200, True)
+                if command == ["back"]:
+                    if session["history"]:
+                        session["screen"] = session["history"].pop()
+                    return self._send(200, None)
+                return self._error(404, "unknown command", self.path)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve in a background thread; returns the URL to use as APPIUM_URL"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeAppiumServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Appium (W3C WebDriver) server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4799)
+    parser.add_argument("--crawls", default=str(CRAWLS_DIR), help="Directory of {screen}.xml page sources")
+    parser.add_argument("--start", default="home", help="Screen a new session starts on")
+    parser.add_argument("--transitions", help="JSON file: {screen: {selector: next screen}}")
+    parser.add_argument("--session-latency", type=float, default=0.0, help="Seconds added to session creation")
+    parser.add_argument("--command-latency", type=float, default=0.0, help="Seconds added to every other command")
+    args = parser.parse_args()
+
+    transitions = None
+    if args.transitions:
+        with open(args.transitions, "r", encoding="utf-8") as f:
+            transitions = json.load(f)
+
+    server = FakeAppiumServer(
+        host=args.host,
+        port=args.port,
+        crawls_dir=Path(args.crawls),
+        start_screen=args.start,
+        transitions=transitions,
+        session_latency=args.session_latency,
+        command_latency=args.command_latency,
+    )
+    print(f"Fake Appium server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API, for benchmarks and offline runs
+
+Usage:
+    python fake_openai.py --port 8099 --latency 0.5 --rate-limit-every 10
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake python cli.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+POM_TEMPLATE = """import {{ $, driver }} from '@wdio/globals';
+
+class {class_name} {{
+{getters}
+    public async navigateTo{page_title}(): Promise<void> {{
+        await driver.pause(100);
+    }}
+}}
+
+export default new {class_name}();
+export {{ {class_name} }};
+"""
+
+TEST_TEMPLATE = """import {{ expect }} from 'chai';
+import {class_name} from '../pageobjects/{class_name}';
+
+describe('{page_title}', () => {{
+    beforeEach(async () => {{
+        await {class_name}.navigateTo{page_title}();
+    }});
+
+    it('should load the {page} screen', async () => {{
+        console.log('✓ Test passed');
+    }});
+}});
+"""
+
+
+def _page_from_prompt(user_prompt: str) -> str:
+    match = re.search(r"(?:for|Page):\s*(\w+)", user_prompt)
+    return match.group(1).lower() if match else "page"
+
+
+def render_response(messages: List[Dict[str, str]], canned: Optional[Dict[str, str]] = None) -> str:
+    """Pick a canned response by substring, or template one from the prompt type"""
+    system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user_prompt = next((m["content"] for m in messages if m.get("role") == "user"), "")
+
+    for needle, content in (canned or {}).items():
+        if needle in user_prompt or needle in system_prompt:
+            return content
+
+    page = _page_from_prompt(user_prompt)
+    class_name = f"{page.capitalize()}Page"
+
+    if "Page Object" in system_prompt:
+        selectors = re.findall(r"-\s*(\w+):\s*\$\('([^']+)'\)", user_prompt)[:20]
+        getters = "".join(
+            f"    public get {name}() {{ return $('{selector}'); }}\n" for name, selector in selectors
+        )
+        return "```typescript\n" + POM_TEMPLATE.format(
+            class_name=class_name, page_title=page.capitalize(), getters=getters
+        ) + "```"
+
+    if "MANUAL test" in system_prompt:
+        ids = re.findall(r'"id":\s*"([^"]+)"', user_prompt) or [f"{page.upper()}_001"]
+        return json.dumps({
+            "page": page,
+            "feature": f"{page.capitalize()} Feature",
+            "testCases": [
+                {
+                    "id": criterion_id,
+                    "title": f"Verify {criterion_id}",
+                    "preconditions": ["App is installed"],
+                    "steps": ["Open the app", f"Navigate to {page}"],
+                    "expectedResults": "Behaviour matches the acceptance criterion",
+                }
+                for criterion_id in dict.fromkeys(ids)
+            ],
+        }, indent=2)
+
+    if "WebdriverIO" in system_prompt:
+        return "```typescript\n" + TEST_TEMPLATE.format(
+            class_name=class_name, page_title=page.capitalize(), page=page
+        ) + "```"
+
+    return "OK"
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server speaking enough of /v1/chat/completions for TestGenerationAgent.
+
+    latency/jitter add a per-request delay in seconds. Every `rate_limit_every`-th
+    request (or a `rate_limit_probability` fraction) is answered with HTTP 429.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit_every: int = 0,
+        rate_limit_probability: float = 0.0,
+        canned: Optional[Dict[str, str]] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_probability = rate_limit_probability
+        self.canned = canned or {}
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _should_rate_limit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            limited = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            limited = limited or (self.rate_limit_probability > 0 and random.random() < self.rate_limit_probability)
+            if limited:
+                self.rate_limited += 1
+            return limited
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any):
+                pass  # keep benchmark output clean
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "invalid JSON"}})
+                    return
+
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+
+                if server._should_rate_limit():
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit reached (simulated)", "type": "requests", "code": "rate_limit_exceeded"}},
+                        headers={"retry-after": "0"},
+                    )
+                    return
+
+                messages = request.get("messages", [])
+                content = render_response(messages, server.canned)
+                prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+                completion_tokens = len(content) // 4
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "gpt-4o-mini"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve in a background thread; returns the base URL to hand to the OpenAI client"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay, 0..jitter seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with 429")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--canned", help="JSON file mapping prompt substrings to response content")
+    args = parser.parse_args()
+
+    canned = None
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+
+    server = FakeOpenAIServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_every=args.rate_limit_every,
+        rate_limit_probability=args.rate_limit_probability,
+        canned=canned,
+    )
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
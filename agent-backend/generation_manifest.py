@@ -0,0 +1,82 @@
+"""
+Generation manifest: fingerprints of the inputs behind each generated file
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+MANIFEST_FILE = MOBILE_TESTS_DIR / ".generation-manifest.json"
+
+
+def fingerprint(value: Any) -> str:
+    """Stable SHA-256 of any JSON-serialisable value"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationManifest:
+    """Per-page record of what each artifact (pom, tests, manual) was generated from.
+
+    Layout: {"pages": {page: {artifact: {"fingerprint", "inputs", "output", "generated_at"}}}}
+    """
+
+    def __init__(self, path: Path = MANIFEST_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {"pages": {}}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"pages": {}}
+        data.setdefault("pages", {})
+        return data
+
+    def get(self, page: str, artifact: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load()["pages"].get(page.lower(), {}).get(artifact)
+
+    def pages(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self._load()["pages"]
+
+    def is_current(self, page: str, artifact: str, input_fingerprint: str, output: Path) -> bool:
+        """True when the output exists and was generated from exactly these inputs"""
+        entry = self.get(page, artifact)
+        return bool(entry) and entry.get("fingerprint") == input_fingerprint and Path(output).exists()
+
+    def record(self, page: str, artifact: str, input_fingerprint: str, output: Path, inputs: Dict[str, Any]):
+        """Store the fingerprint for a freshly generated artifact"""
+        with self._lock:
+            # Re-read so concurrent stages for other artifacts are not overwritten
+            data = self._load()
+            data["pages"].setdefault(page.lower(), {})[artifact] = {
+                "fingerprint": input_fingerprint,
+                "inputs": inputs,
+                "output": str(output),
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+_default_manifest: Optional[GenerationManifest] = None
+
+
+def get_default_manifest() -> GenerationManifest:
+    """Process-wide manifest, so concurrent generation stages share one lock"""
+    global _default_manifest
+    if _default_manifest is None:
+        _default_manifest = GenerationManifest()
+    return _default_manifest
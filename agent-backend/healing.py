@@ -0,0 +1,215 @@
+"""
+Failure-targeted healing: map failed tests to POM getters and patch only the broken selectors
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from allure_results import page_for_spec
+from crawl_cache import get_crawl_index
+from selector_matcher import MIN_CONFIDENCE, SelectorMatcher
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+PAGEOBJECTS_DIR = MOBILE_TESTS_DIR / "src" / "pageobjects"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+
+# public get input_email() { return $('~input-email'); }  (single- or multi-line)
+POM_GETTER = re.compile(
+    r"""public\s+get\s+(?P<name>\w+)\s*\(\s*\)\s*(?::\s*[^{]+)?\{\s*return\s+\$\(\s*"""
+    r"""(?P<quote>['"`])(?P<selector>.+?)(?P=quote)\s*\)\s*;?\s*\}""",
+    re.DOTALL,
+)
+
+
+class PomGetter:
+    """A selector getter in a Page Object, with the span of its selector literal"""
+
+    __slots__ = ("page", "name", "selector", "quote", "selector_start", "selector_end")
+
+    def __init__(self, page: str, name: str, selector: str, quote: str, selector_start: int, selector_end: int):
+        self.page = page
+        self.name = name
+        self.selector = selector
+        self.quote = quote
+        self.selector_start = selector_start
+        self.selector_end = selector_end
+
+    def __repr__(self) -> str:
+        return f"PomGetter({self.page}.{self.name} -> {self.selector!r})"
+
+
+def pom_path(page: str) -> Path:
+    return PAGEOBJECTS_DIR / f"{page.capitalize()}Page.ts"
+
+
+def parse_pom_getters(source: str, page: str = "") -> Dict[str, PomGetter]:
+    return {
+        m.group("name"): PomGetter(page, m.group("name"), m.group("selector"), m.group("quote"), m.start("selector"), m.end("selector"))
+        for m in POM_GETTER.finditer(source)
+    }
+
+
+def load_pom_getters(pageobjects_dir: Path = PAGEOBJECTS_DIR) -> Dict[str, Dict[str, PomGetter]]:
+    """{page: {getter name: PomGetter}} for every *Page.ts"""
+    poms = {}
+    for path in sorted(Path(pageobjects_dir).glob("*Page.ts")):
+        page = path.stem[: -len("Page")].lower()
+        try:
+            poms[page] = parse_pom_getters(path.read_text(encoding="utf-8"), page)
+        except (OSError, UnicodeDecodeError):
+            continue
+    return poms
+
+
+def patch_pom_getters(path: Path, replacements: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """Rewrite only the selector literals of the named getters; every other byte is kept.
+
+    Returns {getter: {"old", "new"}} for the getters actually changed.
+    """
+    path = Path(path)
+    source = path.read_text(encoding="utf-8")
+    getters = parse_pom_getters(source)
+    changed: Dict[str, Dict[str, str]] = {}
+    # Patch from the end of the file so earlier offsets stay valid
+    for getter in sorted(getters.values(), key=lambda g: g.selector_start, reverse=True):
+        new_selector = replacements.get(getter.name)
+        if not new_selector or new_selector == getter.selector:
+            continue
+        if getter.quote in new_selector:
+            new_selector = new_selector.replace(getter.quote, f"\\{getter.quote}")
+        source = source[: getter.selector_start] + new_selector + source[getter.selector_end:]
+        changed[getter.name] = {"old": getter.selector, "new": replacements[getter.name]}
+    if changed:
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(source, encoding="utf-8")
+        os.replace(tmp_path, path)
+    return changed
+
+
+class BrokenGetter:
+    """A POM getter implicated by one or more failed tests"""
+
+    __slots__ = ("getter", "tests", "errors")
+
+    def __init__(self, getter: PomGetter):
+        self.getter = getter
+        self.tests: List[str] = []
+        self.errors: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "getter": self.getter.name,
+            "selector": self.getter.selector,
+            "tests": self.tests,
+            "error": self.errors[0] if self.errors else "",
+        }
+
+
+def plan_healing(
+    failures: Iterable[Dict[str, Any]],
+    poms: Optional[Dict[str, Dict[str, PomGetter]]] = None,
+) -> Dict[str, List[BrokenGetter]]:
+    """Group failed tests by the POM getters they used: {page: [BrokenGetter]}.
+
+    A failure points at a getter when one of its selectors (from the allure message,
+    trace or failed step) is that getter's selector, or when it names the getter.
+    Getters on the failing spec's own page are preferred over identical selectors
+    on other pages.
+    """
+    poms = load_pom_getters() if poms is None else poms
+    plan: Dict[str, Dict[str, BrokenGetter]] = {}
+    for failure in failures:
+        spec_page = page_for_spec(failure.get("spec") or "")
+        selectors = set(failure.get("selectors") or [])
+        text = " ".join(filter(None, [failure.get("message"), failure.get("failed_step")]))
+        pages = sorted(poms, key=lambda p: p != spec_page)
+        for page in pages:
+            hits = [
+                g for g in poms[page].values()
+                if g.selector in selectors or re.search(rf"\b{re.escape(g.name)}\b", text)
+            ]
+            if not hits:
+                continue
+            for getter in hits:
+                broken = plan.setdefault(page, {}).setdefault(getter.name, BrokenGetter(getter))
+                if failure.get("name") and failure["name"] not in broken.tests:
+                    broken.tests.append(failure["name"])
+                if failure.get("message"):
+                    broken.errors.append(failure["message"])
+            break
+    return {page: list(getters.values()) for page, getters in plan.items()}
+
+
+class SelectorHealer:
+    """Checks implicated getters against a fresh crawl and patches the ones whose selector is gone.
+
+    Replacements come from the local SelectorMatcher first. Getters it cannot match
+    with at least `min_confidence` go to `propose`, which maps (page, [broken getter
+    dicts]) to {getter: new selector}; normally
+    TestGenerationAgent.propose_selector_replacements. Proposals that do not exist in
+    the fresh crawl are rejected.
+    """
+
+    def __init__(
+        self,
+        propose: Optional[Callable[[str, List[Dict[str, str]]], Dict[str, str]]] = None,
+        crawls_dir: Path = CRAWLS_DIR,
+        matcher: Optional[SelectorMatcher] = None,
+        min_confidence: float = MIN_CONFIDENCE,
+    ):
+        self.propose = propose
+        self.crawls_dir = Path(crawls_dir)
+        self.matcher = matcher or SelectorMatcher(self.crawls_dir)
+        self.min_confidence = min_confidence
+
+    def heal_page(self, page: str, broken: List[BrokenGetter]) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "page": page,
+            "pom_file": str(pom_path(page)),
+            "patched": {},
+            "still_present": [],
+            "unresolved": [],
+            "matches": {},
+        }
+        crawl_file = self.crawls_dir / f"{page}.xml"
+        if not crawl_file.exists():
+            report["error"] = f"No crawl for {page}"
+            report["unresolved"] = [b.getter.name for b in broken]
+            return report
+
+        available = {s["selector"] for s in get_crawl_index(crawl_file).selectors()}
+        missing = []
+        for item in broken:
+            if item.getter.selector in available:
+                # Selector still on screen: a timing/flow problem, not a stale selector
+                report["still_present"].append(item.getter.name)
+            else:
+                missing.append(item)
+        if not missing:
+            return report
+
+        replacements: Dict[str, str] = {}
+        for item in missing:
+            ranked = self.matcher.match(page, item.getter.selector)
+            if ranked and ranked[0].confidence >= self.min_confidence:
+                replacements[item.getter.name] = ranked[0].selector
+            report["matches"][item.getter.name] = {
+                "method": "local" if item.getter.name in replacements else "llm",
+                "candidates": [m.to_dict() for m in ranked[:3]],
+            }
+
+        # Only low-confidence getters cost an LLM call
+        uncertain = [b for b in missing if b.getter.name not in replacements]
+        if uncertain and self.propose is not None:
+            proposals = self.propose(page, [b.to_dict() for b in uncertain])
+            for item in uncertain:
+                if proposals.get(item.getter.name) in available:
+                    replacements[item.getter.name] = proposals[item.getter.name]
+
+        report["unresolved"] = [b.getter.name for b in missing if b.getter.name not in replacements]
+        if replacements:
+            report["patched"] = patch_pom_getters(pom_path(page), replacements)
+        return report
@@ -0,0 +1,215 @@
+"""
+Test impact analysis: which specs depend on files (POMs, crawls, criteria) that changed
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from crawl_cache import file_sha256
+from generation_manifest import GenerationManifest, get_default_manifest
+from sharding import EXCLUDED_SPECS
+from wait_strategy import WDIO_CONFIG_FILE, detect_app_id
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+IMPACT_FILE = MOBILE_TESTS_DIR / ".test-impact.json"
+
+# A change to any of these can affect every spec, as can a different app id or app binary
+GLOBAL_DEPENDENCIES = ("wdio.conf.ts", "wdio.ios.conf.ts", "tsconfig.json", "package.json", "wait-policy.json")
+
+# import X from '../pageobjects/LoginPage';  import '../setup';  require('./helpers')
+IMPORT_PATTERN = re.compile(r"""(?:\bimport\s+(?:[^'"]*?\bfrom\s+)?|\brequire\s*\(\s*)['"](\.{1,2}/[^'"]+)['"]""")
+# src/pageobjects/LoginPage.ts -> login
+PAGE_OBJECT_FILE = re.compile(r"pageobjects/(\w+)Page\.ts$")
+
+
+class ImpactAnalyzer:
+    """Dependency graph of specs plus the state each spec last passed with.
+
+    A spec depends on every source file it imports (transitively, relative imports
+    only), the global config files, and for each Page Object it reaches: that
+    page's crawl XML, its acceptance criteria and its generation-manifest
+    fingerprints. A spec is impacted when any of those differ from the snapshot
+    recorded the last time it passed, or when it has never passed or failed since.
+    """
+
+    def __init__(
+        self,
+        root: Path = MOBILE_TESTS_DIR,
+        state_file: Path = IMPACT_FILE,
+        manifest: Optional[GenerationManifest] = None,
+    ):
+        self.root = Path(root)
+        self.tests_dir = self.root / "src" / "tests"
+        self.crawls_dir = self.root / "crawls"
+        self.criteria_dir = self.root / "acceptance-criteria"
+        self.state_file = Path(state_file)
+        self.manifest = manifest or get_default_manifest()
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, sha256)
+        self._imports: Dict[str, Tuple[int, List[Path]]] = {}  # path -> (mtime_ns, resolved imports)
+
+    def _rel(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _file_hash(self, path: Path) -> Optional[str]:
+        """sha256 of a file, recomputed only when its mtime or size changes"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = str(path)
+        cached = self._hashes.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        try:
+            digest = file_sha256(path)
+        except OSError:
+            return None
+        self._hashes[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def _app_binary(self) -> Optional[Path]:
+        """APP_PATH / IOS_APP_PATH, else the default APP_PATH in wdio.conf.ts"""
+        app_path = os.getenv("APP_PATH") or os.getenv("IOS_APP_PATH")
+        if not app_path and WDIO_CONFIG_FILE.exists():
+            try:
+                match = re.search(r"const APP_PATH = process\.env\.APP_PATH \|\| '([^']*)'",
+                                  WDIO_CONFIG_FILE.read_text(encoding="utf-8"))
+            except OSError:
+                match = None
+            app_path = match.group(1) if match else None
+        return Path(app_path) if app_path else None
+
+    def _resolve(self, importer: Path, target: str) -> Optional[Path]:
+        base = (importer.parent / target)
+        for candidate in (base, base.with_name(base.name + ".ts"), base.with_name(base.name + ".js"), base / "index.ts"):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def _direct_imports(self, path: Path) -> List[Path]:
+        mtime = path.stat().st_mtime_ns
+        cached = self._imports.get(str(path))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        source = path.read_text(encoding="utf-8", errors="replace")
+        resolved = [p for p in (self._resolve(path, m.group(1)) for m in IMPORT_PATTERN.finditer(source)) if p]
+        self._imports[str(path)] = (mtime, resolved)
+        return resolved
+
+    def source_dependencies(self, spec_path: Path) -> List[Path]:
+        """The spec file and every local module it imports, transitively"""
+        seen: Dict[str, Path] = {}
+        stack = [Path(spec_path)]
+        while stack:
+            path = stack.pop()
+            if str(path.resolve()) in seen:
+                continue
+            seen[str(path.resolve())] = path
+            try:
+                stack.extend(self._direct_imports(path))
+            except OSError:
+                continue
+        return list(seen.values())
+
+    def specs(self) -> List[str]:
+        return sorted(p.name for p in self.tests_dir.glob("*.e2e.ts") if p.name not in EXCLUDED_SPECS)
+
+    def dependencies(self, spec: str) -> Dict[str, Optional[str]]:
+        """{dependency key: current hash} for one spec (None when the file is missing)"""
+        deps: Dict[str, Optional[str]] = {}
+        pages = []
+        for path in self.source_dependencies(self.tests_dir / spec):
+            rel = self._rel(path)
+            deps[rel] = self._file_hash(path)
+            match = PAGE_OBJECT_FILE.search(rel)
+            if match:
+                pages.append(match.group(1).lower())
+        for name in GLOBAL_DEPENDENCIES:
+            if (self.root / name).exists():
+                deps[name] = self._file_hash(self.root / name)
+        deps["app:id"] = detect_app_id()
+        app_binary = self._app_binary()
+        if app_binary is not None and app_binary.is_file():
+            deps["app:binary"] = self._file_hash(app_binary)
+        manifest_pages = self.manifest.pages()
+        for page in pages:
+            for path in (self.crawls_dir / f"{page}.xml", self.criteria_dir / f"{page}.json"):
+                deps[self._rel(path)] = self._file_hash(path)
+            for artifact, entry in sorted(manifest_pages.get(page, {}).items()):
+                deps[f"manifest:{page}:{artifact}"] = entry.get("fingerprint")
+        return deps
+
+    def graph(self) -> Dict[str, List[str]]:
+        """{spec: [dependency keys]}"""
+        return {spec: sorted(self.dependencies(spec)) for spec in self.specs()}
+
+    def snapshot(self, specs: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Optional[str]]]:
+        """Current dependency hashes for the given specs; take one just before a run"""
+        return {spec: self.dependencies(spec) for spec in (specs or self.specs())}
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"specs": {}}
+        data.setdefault("specs", {})
+        return data
+
+    def impacted(self, specs: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Specs that need to run, each with the reasons: [{"spec", "reasons"}]"""
+        state = self._load_state()["specs"]
+        impacted = []
+        for spec, deps in self.snapshot(specs).items():
+            passed = state.get(spec)
+            if not passed:
+                impacted.append({"spec": spec, "reasons": ["no passing run since it last failed (or ever)"]})
+                continue
+            old = passed.get("deps", {})
+            reasons = [f"changed: {key}" for key, value in deps.items() if old.get(key) != value]
+            reasons += [f"removed: {key}" for key in old if key not in deps]
+            if reasons:
+                impacted.append({"spec": spec, "reasons": reasons})
+        return impacted
+
+    def record_passed(self, snapshot: Dict[str, Dict[str, Optional[str]]], summary: Dict[str, Any]) -> List[str]:
+        """Remember the pre-run snapshot for specs that passed (AllureResultsReader.summary()).
+
+        Specs that failed or broke forget their last pass, so they stay impacted
+        until they pass again even if none of their files change.
+        """
+        statuses = {spec: summary.get("specs", {}).get(spec, {}).get("status") for spec in snapshot}
+        passed = [spec for spec, status in statuses.items() if status == "passed"]
+        failed = [spec for spec, status in statuses.items() if status in ("failed", "broken")]
+        if not passed and not failed:
+            return []
+        with self._lock:
+            data = self._load_state()
+            for spec in passed:
+                data["specs"][spec] = {"deps": snapshot[spec], "passed_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            for spec in failed:
+                data["specs"].pop(spec, None)
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.state_file)
+        return passed
+
+
+_default_analyzer: Optional[ImpactAnalyzer] = None
+
+
+def get_default_analyzer() -> ImpactAnalyzer:
+    global _default_analyzer
+    if _default_analyzer is None:
+        _default_analyzer = ImpactAnalyzer()
+    return _default_analyzer
@@ -0,0 +1,332 @@
+"""
+Background jobs for the API: long-running work returns a job id immediately
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Default concurrent jobs per type; override with JOB_CONCURRENCY_<TYPE>, e.g. JOB_CONCURRENCY_RUN_TESTS=2
+DEFAULT_CONCURRENCY = {
+    "generate": 4,
+    "generate_all": 1,
+    "run_tests": 1,   # one device, one wdio run
+    "crawl": 1,
+    "auto_heal": 1,
+}
+
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+KILL_GRACE_SECONDS = float(os.getenv("JOB_KILL_GRACE_SECONDS", "5"))
+# Output lines kept per job for late subscribers; older lines are only in the run log
+OUTPUT_BUFFER_LINES = int(os.getenv("JOB_OUTPUT_BUFFER_LINES", "2000"))
+# Lines of each stream returned in a subprocess job's result
+RESULT_TAIL_LINES = 40
+# Longer output lines (e.g. logged page sources) are passed on in pieces of this size
+MAX_LINE_BYTES = int(os.getenv("JOB_MAX_LINE_BYTES", str(16 * 1024 * 1024)))
+READ_CHUNK_BYTES = 64 * 1024
+
+IS_WINDOWS = os.name == "nt"
+# Children get their own process group so cancelling a job also stops what they spawned (Appium, drivers)
+if IS_WINDOWS:
+    PROCESS_GROUP_KWARGS: Dict[str, Any] = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    PROCESS_GROUP_KWARGS = {"start_new_session": True}
+
+
+def concurrency_limit(job_type: str) -> int:
+    env_value = os.getenv(f"JOB_CONCURRENCY_{job_type.upper()}")
+    if env_value:
+        return max(1, int(env_value))
+    return DEFAULT_CONCURRENCY.get(job_type, 1)
+
+
+class Job:
+    """One unit of background work and its outcome"""
+
+    def __init__(self, job_type: str, params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = job_type
+        self.params = params or {}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.process: Optional[asyncio.subprocess.Process] = None  # most recently started
+        self.processes: List[asyncio.subprocess.Process] = []  # all still running (sharded runs have several)
+        self.task: Optional[asyncio.Task] = None
+        # Recent output lines as {"seq", "stream", "line"}; seq keeps counting past the buffer
+        self.output: Deque[Dict[str, Any]] = deque(maxlen=OUTPUT_BUFFER_LINES)
+        self.output_lines = 0
+        self.changed = asyncio.Condition()
+
+    async def _notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def add_output(self, stream: str, line: str):
+        self.output.append({"seq": self.output_lines, "stream": stream, "line": line})
+        self.output_lines += 1
+        await self._notify()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        data = {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": round(end - self.started_at, 3) if self.started_at else None,
+            "pid": self.process.pid if self.process and self.process.returncode is None else None,
+            "error": self.error,
+            "output_lines": self.output_lines,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs jobs as asyncio tasks, at most concurrency_limit(type) at a time per type.
+
+    Subprocesses are started in their own session so cancelling a job can kill the
+    whole process group (npx -> wdio -> workers), not just the direct child.
+    """
+
+    def __init__(self, history: int = JOB_HISTORY):
+        self.history = history
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, job_type: str) -> asyncio.Semaphore:
+        if job_type not in self._semaphores:
+            self._semaphores[job_type] = asyncio.Semaphore(concurrency_limit(job_type))
+        return self._semaphores[job_type]
+
+    def submit(
+        self,
+        job_type: str,
+        work: Callable[[Job], Awaitable[Any]],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Job:
+        """Schedule work(job) on the running loop; its return value becomes job.result"""
+        job = Job(job_type, params)
+        self.jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]):
+        try:
+            async with self._semaphore(job.type):
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await work(job)
+                job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            await job._notify()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, job_type: Optional[str] = None, status: Optional[str] = None) -> List[Job]:
+        return [
+            job for job in reversed(self.jobs.values())
+            if (job_type is None or job.type == job_type) and (status is None or job.status == status)
+        ]
+
+    async def run_subprocess(
+        self,
+        job: Job,
+        args: Sequence[str],
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        on_line: Optional[Callable[[str, str], Any]] = None,
+    ) -> Tuple[int, str, str]:
+        """Run a command for the job without blocking the loop; returns (returncode, stdout tail, stderr tail).
+
+        Output is published line by line to job subscribers (see follow()) as it is
+        produced and never accumulated whole; on_line(stream, line) sees every line.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **PROCESS_GROUP_KWARGS,
+        )
+        job.process = process
+        job.processes.append(process)
+        tails = {"stdout": deque(maxlen=RESULT_TAIL_LINES), "stderr": deque(maxlen=RESULT_TAIL_LINES)}
+
+        async def emit(stream_name: str, raw: bytes):
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            tails[stream_name].append(line)
+            if on_line is not None:
+                on_line(stream_name, line)
+            await job.add_output(stream_name, line)
+
+        async def pump(stream_name: str, reader: asyncio.StreamReader):
+            # Chunked reads: readline() fails on lines over the stream limit (64 KiB)
+            buffer = bytearray()
+            while True:
+                chunk = await reader.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                buffer += chunk
+                start = 0
+                while True:
+                    end = buffer.find(b"\n", start)
+                    if end < 0:
+                        break
+                    await emit(stream_name, bytes(buffer[start:end]))
+                    start = end + 1
+                del buffer[:start]
+                while len(buffer) >= MAX_LINE_BYTES:
+                    await emit(stream_name, bytes(buffer[:MAX_LINE_BYTES]))
+                    del buffer[:MAX_LINE_BYTES]
+            if buffer:
+                await emit(stream_name, bytes(buffer))
+
+        finished = False
+        try:
+            await asyncio.gather(pump("stdout", process.stdout), pump("stderr", process.stderr))
+            await process.wait()
+            finished = True
+        finally:
+            if not finished:
+                # Cancelled, or the pump failed: never leave the child running
+                await self._kill_process_group(process)
+            job.processes.remove(process)
+        return process.returncode, "\n".join(tails["stdout"]), "\n".join(tails["stderr"])
+
+    async def follow(self, job: Job, since: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield output lines with seq >= since as they arrive, until the job finishes.
+
+        Yields None every `heartbeat` seconds without output so callers can keep
+        connections alive. Lines that already fell out of the buffer are skipped.
+        """
+        next_seq = since
+        while True:
+            pending = [entry for entry in list(job.output) if entry["seq"] >= next_seq]
+            if pending:
+                for entry in pending:
+                    yield entry
+                next_seq = pending[-1]["seq"] + 1
+                continue
+            if job.finished:
+                return
+            idle = False
+            async with job.changed:
+                if job.output_lines <= next_seq and not job.finished:
+                    try:
+                        await asyncio.wait_for(job.changed.wait(), timeout=heartbeat)
+                    except asyncio.TimeoutError:
+                        idle = True
+            if idle:
+                yield None
+
+    async def _kill_process_group(self, process: asyncio.subprocess.Process):
+        """Ask the process group to stop, then force-kill whatever is left after the grace period.
+
+        POSIX: SIGTERM, then SIGKILL to the group. Windows: CTRL_BREAK_EVENT to the
+        group, then taskkill /T /F on the process tree.
+        """
+        if process.returncode is not None:
+            return
+        try:
+            if IS_WINDOWS:
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+        except OSError:  # already gone (ProcessLookupError; access denied on Windows)
+            return
+        try:
+            await asyncio.wait_for(process.wait(), timeout=KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            if IS_WINDOWS:
+                await self._taskkill(process.pid)
+            try:
+                if IS_WINDOWS:
+                    process.kill()
+                else:
+                    os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            await process.wait()
+
+    @staticmethod
+    async def _taskkill(pid: int):
+        """Kill a Windows process and all of its descendants"""
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/T", "/F", "/PID", str(pid),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await asyncio.wait_for(killer.wait(), timeout=KILL_GRACE_SECONDS)
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job, killing its subprocess group if it has one.
+
+        Generation jobs stop at the next await; an OpenAI call already in flight in
+        an executor thread still finishes, but its result is discarded.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()  # run_subprocess kills the process group on the way out
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        for process in [job.process, *job.processes]:
+            if process is not None:
+                await self._kill_process_group(process)
+        if not job.finished:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return job
+
+
+job_manager = JobManager()
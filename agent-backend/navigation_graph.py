@@ -0,0 +1,300 @@
+"""
+Screen navigation graph built from crawl history, with a shortest-tap-path planner
+"""
+
+import json
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from crawl_cache import get_crawl_index
+from crawl_index import CrawlElement, CrawlIndex
+from wait_strategy import WaitPolicy, js_string
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+NAVIGATION_FILE = CRAWLS_DIR / "navigation.json"
+
+# Crawls that do not correspond to a named screen
+IGNORED_CRAWLS = {"unknown"}
+
+# Pseudo-screen for persistent controls (tab bars, nav drawers) that work from anywhere
+ANY_SCREEN = "*"
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", value.lower())
+
+
+def _element_label(el: CrawlElement) -> str:
+    if el.content_desc.strip():
+        return el.content_desc
+    if ":id/" in el.resource_id:
+        return el.resource_id.split(":id/")[-1]
+    return el.text
+
+
+class NavigationEdge:
+    """A tap on `selector` while `source` is showing leads to `target`"""
+
+    __slots__ = ("source", "target", "selector", "recorded")
+
+    def __init__(self, source: str, target: str, selector: str, recorded: bool = False):
+        self.source = source
+        self.target = target
+        self.selector = selector
+        self.recorded = recorded  # observed during a crawl, not inferred from labels
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"from": self.source, "to": self.target, "selector": self.selector}
+
+    def __repr__(self) -> str:
+        return f"NavigationEdge({self.source!r} -> {self.target!r} via {self.selector!r})"
+
+
+class NavigationGraph:
+    """Screens as nodes, tapped selectors as edges, plus one anchor selector per screen"""
+
+    def __init__(self):
+        self.edges: Dict[str, Dict[str, NavigationEdge]] = {}
+        self.anchors: Dict[str, str] = {}
+
+    def add_edge(self, source: str, target: str, selector: str, recorded: bool = False):
+        """Add a transition; recorded transitions always win over inferred ones"""
+        source, target = source.lower(), target.lower()
+        if source == target:
+            return
+        existing = self.edges.setdefault(source, {}).get(target)
+        if existing and existing.recorded and not recorded:
+            return
+        self.edges[source][target] = NavigationEdge(source, target, selector, recorded)
+
+    def screens(self) -> List[str]:
+        names = set(self.edges) | set(self.anchors)
+        for targets in self.edges.values():
+            names.update(targets)
+        return sorted(names)
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[NavigationEdge]]:
+        """Fewest taps from source to target (BFS); [] when already there, None if unreachable"""
+        return self.paths_to(target).get(source.lower())
+
+    def paths_to(self, target: str) -> Dict[str, List[NavigationEdge]]:
+        """Shortest tap path to target from every screen that can reach it"""
+        target = target.lower()
+        reverse: Dict[str, List[NavigationEdge]] = {}
+        for targets in self.edges.values():
+            for edge in targets.values():
+                reverse.setdefault(edge.target, []).append(edge)
+
+        paths: Dict[str, List[NavigationEdge]] = {target: []}
+        queue = deque([target])
+        while queue:
+            screen = queue.popleft()
+            for edge in sorted(reverse.get(screen, []), key=lambda e: (not e.recorded, e.source)):
+                if edge.source not in paths:
+                    paths[edge.source] = [edge] + paths[screen]
+                    queue.append(edge.source)
+        return paths
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "anchors": dict(self.anchors),
+            "edges": [e.to_dict() for targets in self.edges.values() for e in targets.values()],
+        }
+
+
+def load_recorded_transitions(path: Path = NAVIGATION_FILE) -> List[Dict[str, str]]:
+    if not path.exists():
+        return []
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("transitions", [])
+    except (OSError, ValueError):
+        return []
+
+
+def record_transition(source: str, target: str, selector: str, path: Path = NAVIGATION_FILE):
+    """Persist an observed tap (source screen -> target screen) to the crawl history"""
+    transitions = [
+        t for t in load_recorded_transitions(path)
+        if not (t.get("from") == source.lower() and t.get("to") == target.lower())
+    ]
+    transitions.append({
+        "from": source.lower(),
+        "to": target.lower(),
+        "selector": selector,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"transitions": transitions}, indent=2), encoding="utf-8")
+
+
+def _pick_anchor(screen: str, index: CrawlIndex, selector_screens: Dict[str, set]) -> Optional[str]:
+    """A selector seen only on this screen; '*-screen' containers and inputs preferred"""
+    best = None
+    best_rank = None
+    for el in index.elements:
+        selector = el.selector
+        if not selector or selector_screens.get(selector) != {screen}:
+            continue
+        lowered = el.content_desc.lower()
+        if "screen" in lowered:
+            rank = 0
+        elif el.short_class in ("EditText", "TextField", "SecureTextField"):
+            rank = 1
+        else:
+            rank = 2
+        if best_rank is None or rank < best_rank:
+            best, best_rank = selector, rank
+    return best
+
+
+def _infer_edges(
+    graph: NavigationGraph,
+    source: str,
+    index: CrawlIndex,
+    targets: Iterable[str],
+    selector_screens: Dict[str, set],
+):
+    """Clickable elements whose label names another screen are taken as navigation to it.
+
+    A control naming its own screen (the selected tab), or one that shows up on
+    several crawled screens, is persistent chrome and is reachable from any screen.
+    """
+    for target in targets:
+        wanted = _normalize(target)
+        best = None
+        best_rank = None
+        for el in index.elements:
+            if not el.clickable or not el.selector:
+                continue
+            label = _normalize(_element_label(el))
+            if not label or "screen" in label:
+                continue
+            if label == wanted:
+                rank = 0
+            elif wanted in label:
+                rank = 1 + len(label) - len(wanted)  # prefer the tightest match
+            else:
+                continue
+            if best_rank is None or rank < best_rank:
+                best, best_rank = el.selector, rank
+        if not best:
+            continue
+        if target == source or len(selector_screens.get(best, ())) > 1:
+            graph.add_edge(ANY_SCREEN, target, best)
+        if target != source:
+            graph.add_edge(source, target, best)
+
+
+def build_navigation_graph(
+    crawls_dir: Path = CRAWLS_DIR,
+    extra_screens: Iterable[str] = (),
+    navigation_file: Optional[Path] = None,
+) -> NavigationGraph:
+    """Build the graph from crawls/*.xml plus transitions recorded in crawls/navigation.json.
+
+    extra_screens are pages that may not have been crawled yet but can still be
+    navigation targets (e.g. the page currently being generated).
+    """
+    graph = NavigationGraph()
+    indexes: Dict[str, CrawlIndex] = {}
+    for path in sorted(Path(crawls_dir).glob("*.xml")):
+        name = path.stem.lower()
+        if name in IGNORED_CRAWLS:
+            continue
+        try:
+            indexes[name] = get_crawl_index(path)
+        except Exception:
+            continue
+
+    selector_screens: Dict[str, set] = {}
+    for name, index in indexes.items():
+        for el in index.elements:
+            if el.selector:
+                selector_screens.setdefault(el.selector, set()).add(name)
+
+    for name, index in indexes.items():
+        anchor = _pick_anchor(name, index, selector_screens)
+        if anchor:
+            graph.anchors[name] = anchor
+
+    screens = set(indexes) | {s.lower() for s in extra_screens}
+    for name, index in indexes.items():
+        _infer_edges(graph, name, index, screens, selector_screens)
+
+    nav_file = navigation_file or Path(crawls_dir) / NAVIGATION_FILE.name
+    for t in load_recorded_transitions(nav_file):
+        if t.get("from") and t.get("to") and t.get("selector"):
+            graph.add_edge(t["from"], t["to"], t["selector"], recorded=True)
+
+    return graph
+
+
+def render_navigation_steps(
+    graph: NavigationGraph,
+    target: str,
+    policy: Optional[WaitPolicy] = None,
+) -> List[str]:
+    """TypeScript statements that tap the shortest path to target from whichever screen is showing.
+
+    The current screen is recognised by its anchor (or, without one, by the first
+    element of its path being visible). Shorter paths are tried first. After each
+    tap the policy waits for the next screen's anchor (or for the previous one to go).
+    Without a path, or when no screen is recognised, it logs and waits for the
+    target's anchor, so a spec still runs if the app is already heading there.
+    """
+    policy = policy or WaitPolicy()
+    target = target.lower()
+    paths = graph.paths_to(target)
+    steps: List[str] = []
+
+    target_anchor = graph.anchors.get(target)
+    if target_anchor:
+        steps.append(f"// Already on the {target} screen?")
+        steps.append(f"if (await $({js_string(target_anchor)}).isDisplayed()) {{ return; }}")
+
+    # Specific screens first (shortest path first), persistent controls as the last resort
+    candidates = sorted(
+        ((source, path) for source, path in paths.items() if path),
+        key=lambda item: (item[0] == ANY_SCREEN, len(item[1]), item[0]),
+    )
+    if not candidates:
+        steps.append(f"// No known tap path to the {target} screen - crawl it from a neighbouring screen first")
+        return steps + _wait_for_target(target, target_anchor, f"No crawled path to {target}", policy)
+
+    for source, path in candidates:
+        probe = graph.anchors.get(source) or path[0].selector
+        taps = " -> ".join(edge.selector for edge in path).replace("\n", " ")
+        steps.append(f"// From {'any screen' if source == ANY_SCREEN else source}: {taps}")
+        steps.append(f"if (await $({js_string(probe)}).isDisplayed()) {{")
+        for i, edge in enumerate(path):
+            step = f"step_{_normalize(edge.target) or 'next'}_{i}"
+            steps.append(f"    const {step} = await $({js_string(edge.selector)});")
+            steps.append(f"    await {step}.waitForDisplayed({{ timeout: {policy.timeout_ms} }});")
+            steps.append(f"    await {step}.click();")
+            steps.extend(policy.after_tap(
+                next_anchor=graph.anchors.get(edge.target),
+                prev_anchor=graph.anchors.get(edge.source),
+                indent="    ",
+            ))
+        steps.append("    return;")
+        steps.append("}")
+
+    return steps + _wait_for_target(
+        target, target_anchor, f"Could not recognise the current screen on the way to {target}", policy
+    )
+
+
+def _wait_for_target(target: str, anchor: Optional[str], message: str, policy: WaitPolicy) -> List[str]:
+    """Log that no tap path was taken, then give the target's anchor the policy timeout to appear"""
+    steps = [f"console.log({js_string(message)});"]
+    if anchor:
+        steps.append(
+            f"await $({js_string(anchor)}).waitForDisplayed({{ timeout: {policy.timeout_ms} }})"
+            ".catch(() => { /* not on the target screen */ });"
+        )
+    return steps
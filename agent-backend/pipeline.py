@@ -0,0 +1,72 @@
+"""
+Concurrent generation pipeline built on TestGenerationAgent
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+from agent import TestGenerationAgent
+
+
+class GenerationPipeline:
+    """Runs POM, test and manual test generation for a page, overlapping independent stages.
+
+    generate_tests reads the generated POM file, so it waits for generate_pom.
+    Manual test generation only needs the acceptance criteria and runs alongside
+    both, which brings a page down to two sequential LLM round-trips.
+    The agent uses the blocking OpenAI client, so each stage runs in a worker thread.
+    """
+
+    def __init__(self, agent: TestGenerationAgent, executor: Optional[Executor] = None):
+        self.agent = agent
+        self.executor = executor  # None uses the event loop's default thread pool
+
+    async def _run_stage(self, name: str, timings: Dict[str, float], func: Callable[..., str], **kwargs: Any) -> str:
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, **kwargs))
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    async def run(
+        self, page_name: str, feature: str, criteria: List[Dict[str, Any]], force: bool = False
+    ) -> Dict[str, Any]:
+        """Generate all artifacts for one page; returns file paths and per-stage timings in seconds.
+
+        Stages whose inputs match the generation manifest are skipped unless force is set.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        async def pom_then_tests():
+            pom = await self._run_stage(
+                "pom", timings, self.agent.generate_pom,
+                page_name=page_name, criteria=criteria, force=force,
+            )
+            tests = await self._run_stage(
+                "tests", timings, self.agent.generate_tests,
+                page_name=page_name, criteria=criteria, force=force,
+            )
+            return pom, tests
+
+        (pom_path, test_path), manual_path = await asyncio.gather(
+            pom_then_tests(),
+            self._run_stage(
+                "manual_tests", timings, self.agent.generate_manual_tests,
+                page_name=page_name, feature=feature, criteria=criteria, force=force,
+            ),
+        )
+        timings["total"] = round(time.perf_counter() - start, 3)
+
+        return {
+            "page": page_name,
+            "feature": feature,
+            "pom_file": pom_path,
+            "test_file": test_path,
+            "manual_tests_file": manual_path,
+            "timings": timings,
+        }
@@ -0,0 +1,204 @@
+"""
+Token-budgeted prompt context built from crawl indexes and existing files
+"""
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from crawl_index import CrawlElement, CrawlIndex
+
+try:
+    import tiktoken
+except ImportError:  # optional - fall back to a character-based estimate
+    tiktoken = None
+
+# gpt-4o / gpt-4o-mini tokenizer
+TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "o200k_base")
+CHARS_PER_TOKEN = 4
+# The BPE file is only read from tiktoken's cache unless downloading it is allowed
+TOKENIZER_DOWNLOAD = os.getenv("PROMPT_TOKENIZER_DOWNLOAD", "").lower() in ("1", "true", "yes")
+TOKENIZER_DOWNLOAD_TIMEOUT_S = float(os.getenv("PROMPT_TOKENIZER_DOWNLOAD_TIMEOUT_S", "5"))
+BPE_BASE_URL = "https://openaipublic.blob.core.windows.net/encodings/"
+
+SELECTORS_HEADER = "AVAILABLE SELECTORS (extracted from crawl XML - USE THESE EXACT VALUES):"
+
+# Classes the user types into - always worth keeping
+EDITABLE_CLASSES = {"EditText", "AutoCompleteTextView", "TextField", "SecureTextField", "SearchField"}
+INTERACTIVE_CLASSES = {"Button", "ImageButton", "CheckBox", "Switch", "RadioButton", "Spinner", "ToggleButton",
+                       "Cell", "Link", "Slider", "Tab", "SegmentedControl"}
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _bpe_cached(name: str) -> bool:
+    """Whether tiktoken's cache already holds the BPE file (same location and key tiktoken uses)"""
+    cache_dir = os.getenv("TIKTOKEN_CACHE_DIR", os.getenv("DATA_GYM_CACHE_DIR"))
+    if cache_dir is None:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    blob = f"{BPE_BASE_URL}{name}.tiktoken"
+    return bool(cache_dir) and os.path.exists(os.path.join(cache_dir, hashlib.sha1(blob.encode()).hexdigest()))
+
+
+def _load_encoding():
+    if not _bpe_cached(TOKENIZER_ENCODING):
+        if not TOKENIZER_DOWNLOAD:
+            return None  # never reach for the network on first use
+        # Download in the background so a slow proxy cannot stall prompt building
+        loaded = []
+
+        def download():
+            try:
+                loaded.append(tiktoken.get_encoding(TOKENIZER_ENCODING))
+            except Exception:
+                pass  # offline: keep the estimate
+
+        loader = threading.Thread(target=download, daemon=True)
+        loader.start()
+        loader.join(TOKENIZER_DOWNLOAD_TIMEOUT_S)
+        return loaded[0] if loaded else None
+    return tiktoken.get_encoding(TOKENIZER_ENCODING)
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None when tiktoken or its cached BPE file is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = _load_encoding()
+            except Exception:
+                _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the model tokenizer, or a ~4 chars/token estimate without it"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_token_budget(text: str, budget: int, marker: str = "... (truncated)") -> str:
+    """Keep whole lines from the start of text until the token budget is used up"""
+    if count_tokens(text) <= budget:
+        return text
+
+    kept = []
+    used = count_tokens(marker) + 1
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.append(marker)
+    return "\n".join(kept)
+
+
+def _element_selector(el: CrawlElement, platform: str) -> Optional[str]:
+    """Stable selector first; visible text as a fallback for tappable elements without ids"""
+    selector = el.selector
+    if selector:
+        return selector
+    text = el.text.strip()
+    if text and (el.clickable or el.short_class in EDITABLE_CLASSES) and '"' not in text:
+        if platform == "ios":
+            return f'-ios predicate string:label == "{text}"'
+        return f'android=new UiSelector().text("{text}")'
+    return None
+
+
+def _element_name(el: CrawlElement) -> str:
+    if el.content_desc.strip():
+        raw = el.content_desc
+    elif ":id/" in el.resource_id:
+        raw = el.resource_id.split(":id/")[-1]
+    else:
+        raw = el.text or el.short_class
+    return raw.strip().lower().replace('-', '_').replace(' ', '_')
+
+
+def score_element(el: CrawlElement, selector_counts: Counter) -> float:
+    """Rank by how useful an element is to a page object: interactive, addressable and unique"""
+    short_class = el.short_class
+    score = 0.0
+    if el.clickable:
+        score += 3
+    if short_class in EDITABLE_CLASSES:
+        score += 3
+    elif short_class in INTERACTIVE_CLASSES:
+        score += 1.5
+    if el.content_desc.strip():
+        score += 2
+    elif ":id/" in el.resource_id:
+        score += 1
+    if el.text.strip():
+        score += 0.5
+    if el.selector and selector_counts[el.selector] == 1:
+        score += 1  # unique on screen - safe to use as-is
+    if not el.enabled:
+        score -= 1
+    lowered = el.content_desc.lower()
+    if "screen" in lowered or "container" in lowered:
+        score -= 1  # layout wrappers are anchors, rarely interaction targets
+    return score
+
+
+def _render_element(el: CrawlElement, selector: str) -> str:
+    """One compact line per element; default-valued attributes are left out"""
+    details = [el.short_class]
+    if el.clickable:
+        details.append("clickable")
+    if not el.enabled:
+        details.append("disabled")
+    text = el.text.strip()
+    if text and text != el.content_desc and f'"{text}"' not in selector:
+        details.append(f'text="{text[:40]}"')
+    return f"  - {_element_name(el)}: $('{selector}')  [{', '.join(details)}]"
+
+
+def rank_elements(index: CrawlIndex) -> List[Tuple[float, CrawlElement, str]]:
+    """Addressable elements with their score and selector, best first, duplicates removed"""
+    selector_counts = Counter(el.selector for el in index.elements if el.selector)
+    ranked = []
+    seen = set()
+    for el in index.elements:
+        selector = _element_selector(el, index.platform)
+        if not selector or selector in seen:
+            continue
+        seen.add(selector)
+        ranked.append((score_element(el, selector_counts), el, selector))
+    ranked.sort(key=lambda item: (-item[0], item[1].position))
+    return ranked
+
+
+def build_crawl_context(index: CrawlIndex, token_budget: int) -> str:
+    """Pack the highest-ranked elements of a crawl into token_budget, listed in screen order"""
+    ranked = rank_elements(index)
+    if not ranked:
+        return "No selectors found in crawl XML."
+
+    used = count_tokens(SELECTORS_HEADER) + 1
+    chosen = []
+    for _, el, selector in ranked:
+        line = _render_element(el, selector)
+        cost = count_tokens(line) + 1
+        if used + cost > token_budget:
+            continue  # a shorter, lower-ranked line may still fit
+        chosen.append((el.position, line))
+        used += cost
+
+    chosen.sort()
+    lines = [SELECTORS_HEADER] + [line for _, line in chosen]
+    omitted = len(ranked) - len(chosen)
+    if omitted:
+        lines.append(f"  ({omitted} lower-priority elements omitted)")
+    return "\n".join(lines)
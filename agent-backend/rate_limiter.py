@@ -0,0 +1,81 @@
+"""
+Shared OpenAI rate limiting: token buckets for requests/tokens per minute plus retry backoff
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_RPM = int(os.getenv("OPENAI_RPM", "500"))
+DEFAULT_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting requests per minute and tokens per minute.
+
+    Both buckets start full and refill continuously. acquire() blocks until one
+    request and the estimated number of tokens are available in both.
+    """
+
+    def __init__(self, requests_per_minute: int = DEFAULT_RPM, tokens_per_minute: int = DEFAULT_TPM):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until the request fits both budgets; returns the time spent waiting"""
+        tokens = min(tokens, self.tokens_per_minute)  # an oversized request still gets through eventually
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                wait = max(
+                    self._paused_until - now,
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                )
+            wait = min(max(wait, 0.01), 1.0)
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after the API answered 429"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_default_limiter: Optional[RateLimiter] = None
+
+
+def get_default_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every TestGenerationAgent"""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter()
+    return _default_limiter
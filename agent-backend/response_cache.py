@@ -0,0 +1,229 @@
+"""
+Persistent, content-addressed cache for LLM chat completion responses
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR") or Path(__file__).resolve().parent / ".llm_cache")
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024)
+DEFAULT_MAX_AGE_SECONDS = int(float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400)
+CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+# Full directory scans (expiry + LRU) run at most this often, unless a write crosses a limit
+EVICT_EVERY_WRITES = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+# A cache over its limits is trimmed to this fraction of them
+EVICT_TO_FRACTION = 0.9
+
+
+class ResponseCache:
+    """On-disk cache of chat responses keyed by a hash of all request parameters.
+
+    Entries are evicted least-recently-used first once the cache grows past
+    ``max_entries`` or ``max_bytes``, and are dropped when unused for ``max_age_seconds``.
+    An entry file's mtime is its last use, for both. Writes keep running entry/byte
+    totals, so the directory is only scanned when they cross a limit or every
+    ``evict_every`` writes (to pick up expiry and other processes' writes).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS,
+        enabled: bool = True,
+        evict_every: int = EVICT_EVERY_WRITES,
+    ):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Running totals since the last scan; None until the first one
+        self._entries: Optional[int] = None
+        self._bytes = 0
+        self._writes_since_scan = 0
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        """Hash the request parameters into a stable cache key"""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            if self.max_age_seconds and time.time() - path.stat().st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                self._count(hit=False)
+                return None
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, ValueError):
+            # Corrupt or half-written entry - drop it
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        # Touch the file so mtime tracks last use for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self._count(hit=True)
+        return entry.get("response")
+
+    def set(self, key: str, response: str, params: Optional[Dict[str, Any]] = None):
+        """Store a response and evict old entries if the cache is over its limits"""
+        if not self.enabled or not response:
+            return
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "created_at": time.time(),
+            "model": (params or {}).get("model"),
+            "response": response,
+        }
+        # Write to a temp file first so concurrent readers never see a partial entry
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        try:
+            old_size: Optional[int] = path.stat().st_size
+        except FileNotFoundError:
+            old_size = None
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._entries is not None:
+                self._entries += 1 if old_size is None else 0
+                self._bytes += len(data) - (old_size or 0)
+            self._writes_since_scan += 1
+            due = (
+                self._entries is None
+                or self._entries > self.max_entries
+                or self._bytes > self.max_bytes
+                or self._writes_since_scan >= self.evict_every
+            )
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries, then least-recently-used ones until within limits"""
+        if not self.cache_dir.exists():
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort(key=lambda e: e[0])  # oldest use first
+        total_bytes = sum(size for _, size, _ in entries)
+        # Evict below the limits so a full cache is not rescanned on every write
+        target_entries = int(self.max_entries * EVICT_TO_FRACTION)
+        target_bytes = int(self.max_bytes * EVICT_TO_FRACTION)
+        over = len(entries) > self.max_entries or total_bytes > self.max_bytes
+        evict_count = 0
+        while over and evict_count < len(entries) and (
+            len(entries) - evict_count > target_entries or total_bytes > target_bytes
+        ):
+            _, size, path = entries[evict_count]
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            evict_count += 1
+        removed += evict_count
+
+        with self._lock:
+            self.evictions += removed
+            self._entries = len(entries) - evict_count
+            self._bytes = total_bytes
+            self._writes_since_scan = 0
+        return removed
+
+    def clear(self):
+        """Delete every cached entry"""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._entries, self._bytes, self._writes_since_scan = 0, 0, 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current on-disk size"""
+        entries = 0
+        total_bytes = 0
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    total_bytes += path.stat().st_size
+                    entries += 1
+                except FileNotFoundError:
+                    continue
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total_bytes,
+            "cache_dir": str(self.cache_dir),
+        }
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> ResponseCache:
+    """Process-wide cache shared by every TestGenerationAgent"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache(enabled=not CACHE_DISABLED)
+    return _default_cache
@@ -0,0 +1,335 @@
+"""
+SQLite index of allure results, keyed by run, for historical failure queries
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from allure_results import ALLURE_RESULTS_DIR, TestResult, page_for_spec, parse_result_file
+from run_logs import new_run_id
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+RESULTS_DB = Path(os.getenv("RESULTS_DB", str(MOBILE_TESTS_DIR / "results.db")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT,
+    ingested_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    total INTEGER DEFAULT 0,
+    passed INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    broken INTEGER DEFAULT 0,
+    skipped INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    uuid TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT,
+    full_name TEXT,
+    spec TEXT,
+    page TEXT,
+    suite TEXT,
+    status TEXT,
+    start REAL,
+    stop REAL,
+    duration_ms INTEGER,
+    message TEXT,
+    trace TEXT,
+    failed_step TEXT,
+    result_file TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_status_start ON results(status, start);
+CREATE INDEX IF NOT EXISTS idx_results_page ON results(page, status);
+CREATE INDEX IF NOT EXISTS idx_results_name ON results(name);
+CREATE TABLE IF NOT EXISTS result_selectors (
+    result_uuid TEXT NOT NULL REFERENCES results(uuid) ON DELETE CASCADE,
+    selector TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_selectors_selector ON result_selectors(selector);
+CREATE INDEX IF NOT EXISTS idx_selectors_result ON result_selectors(result_uuid);
+CREATE TABLE IF NOT EXISTS attachments (
+    result_uuid TEXT NOT NULL REFERENCES results(uuid) ON DELETE CASCADE,
+    name TEXT,
+    source TEXT,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attachments_result ON attachments(result_uuid);
+CREATE TABLE IF NOT EXISTS containers (
+    uuid TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT,
+    children TEXT,
+    start REAL,
+    stop REAL
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    run_id TEXT
+);
+"""
+
+FAILED_STATUSES = ("failed", "broken")
+MAX_PAGE_SIZE = 500
+
+
+class ResultsDB:
+    """allure-results loaded into SQLite.
+
+    ingest() only reads result/container files it has not seen (or that changed),
+    so it can run after every test run. Timestamps are allure's epoch milliseconds.
+    """
+
+    def __init__(self, path: Path = RESULTS_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) and is closed on exit"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingest(
+        self,
+        results_dir: Path = ALLURE_RESULTS_DIR,
+        run_id: Optional[str] = None,
+        kind: str = "run_tests",
+    ) -> Dict[str, Any]:
+        """Load new result and container files; everything new goes under one run"""
+        results_dir = Path(results_dir)
+        if not results_dir.exists():
+            return {"run_id": None, "results": 0, "containers": 0}
+
+        with self._lock, self._connect() as conn:
+            seen = {row["name"]: row["mtime_ns"] for row in conn.execute("SELECT name, mtime_ns FROM ingested_files")}
+            pending = []
+            with os.scandir(results_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(("-result.json", "-container.json")):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    if seen.get(entry.name) != mtime:
+                        pending.append((entry.name, entry.path, mtime))
+            if not pending:
+                return {"run_id": None, "results": 0, "containers": 0}
+
+            run_id = run_id or new_run_id()
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, kind, ingested_at) VALUES (?, ?, ?)",
+                (run_id, kind, time.time()),
+            )
+            result_count = container_count = 0
+            for name, path, mtime in pending:
+                if name.endswith("-result.json"):
+                    result = parse_result_file(Path(path))
+                    if result is None:
+                        continue  # half-written; picked up next time
+                    self._insert_result(conn, run_id, result)
+                    result_count += 1
+                else:
+                    if not self._insert_container(conn, run_id, Path(path)):
+                        continue
+                    container_count += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files (name, mtime_ns, run_id) VALUES (?, ?, ?)",
+                    (name, mtime, run_id),
+                )
+            self._refresh_run(conn, run_id)
+        return {"run_id": run_id, "results": result_count, "containers": container_count}
+
+    def _insert_result(self, conn: sqlite3.Connection, run_id: str, result: TestResult):
+        uuid = result.uuid or result.result_file
+        conn.execute("DELETE FROM results WHERE uuid = ?", (uuid,))
+        conn.execute(
+            """INSERT INTO results (uuid, run_id, name, full_name, spec, page, suite, status, start, stop,
+                                    duration_ms, message, trace, failed_step, result_file)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                uuid, run_id, result.name, result.full_name, result.spec, page_for_spec(result.spec),
+                result.suite, result.status, result.start, result.stop, result.duration_ms,
+                result.message, result.trace, result.failed_step, result.result_file,
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO result_selectors (result_uuid, selector) VALUES (?, ?)",
+            [(uuid, selector) for selector in result.selectors],
+        )
+        conn.executemany(
+            "INSERT INTO attachments (result_uuid, name, source, type) VALUES (?, ?, ?, ?)",
+            [(uuid, a["name"], a["source"], a["type"]) for a in result.attachments],
+        )
+
+    def _insert_container(self, conn: sqlite3.Connection, run_id: str, path: Path) -> bool:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or not data.get("uuid"):
+            return False
+        conn.execute(
+            "INSERT OR REPLACE INTO containers (uuid, run_id, name, children, start, stop) VALUES (?, ?, ?, ?, ?, ?)",
+            (data["uuid"], run_id, data.get("name"), json.dumps(data.get("children", [])), data.get("start"), data.get("stop")),
+        )
+        return True
+
+    def _refresh_run(self, conn: sqlite3.Connection, run_id: str):
+        conn.execute(
+            """UPDATE runs SET
+                   total = (SELECT COUNT(*) FROM results WHERE run_id = :run),
+                   passed = (SELECT COUNT(*) FROM results WHERE run_id = :run AND status = 'passed'),
+                   failed = (SELECT COUNT(*) FROM results WHERE run_id = :run AND status = 'failed'),
+                   broken = (SELECT COUNT(*) FROM results WHERE run_id = :run AND status = 'broken'),
+                   skipped = (SELECT COUNT(*) FROM results WHERE run_id = :run AND status = 'skipped'),
+                   started_at = (SELECT MIN(start) FROM results WHERE run_id = :run),
+                   finished_at = (SELECT MAX(stop) FROM results WHERE run_id = :run)
+               WHERE run_id = :run""",
+            {"run": run_id},
+        )
+
+    def runs(self, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            rows = conn.execute(
+                "SELECT * FROM runs ORDER BY ingested_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return {"total": total, "limit": limit, "offset": offset, "items": [dict(r) for r in rows]}
+
+    def failures(
+        self,
+        page: Optional[str] = None,
+        test: Optional[str] = None,
+        selector: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        last_runs: Optional[int] = None,
+        run_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Failed/broken tests, newest first. since/until are epoch seconds; test matches by substring"""
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        where = ["r.status IN ('failed', 'broken')"]
+        params: List[Any] = []
+        if page:
+            where.append("r.page = ?")
+            params.append(page.lower())
+        if test:
+            where.append("(r.name LIKE ? OR r.full_name LIKE ?)")
+            params.extend([f"%{test}%"] * 2)
+        if selector:
+            where.append("r.uuid IN (SELECT result_uuid FROM result_selectors WHERE selector = ?)")
+            params.append(selector)
+        if since is not None:
+            where.append("r.start >= ?")
+            params.append(since * 1000)
+        if until is not None:
+            where.append("r.start < ?")
+            params.append(until * 1000)
+        if run_id:
+            where.append("r.run_id = ?")
+            params.append(run_id)
+        if last_runs:
+            where.append("r.run_id IN (SELECT run_id FROM runs ORDER BY ingested_at DESC LIMIT ?)")
+            params.append(last_runs)
+        clause = " AND ".join(where)
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM results r WHERE {clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""SELECT r.uuid, r.run_id, r.name, r.full_name, r.spec, r.page, r.status, r.start,
+                           r.duration_ms, r.message, r.failed_step,
+                           (SELECT GROUP_CONCAT(selector, '\x1f') FROM result_selectors s WHERE s.result_uuid = r.uuid) AS selectors
+                    FROM results r WHERE {clause}
+                    ORDER BY r.start DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset],
+            ).fetchall()
+
+        items = []
+        for row in rows:
+            item = dict(row)
+            item["selectors"] = item["selectors"].split("\x1f") if item["selectors"] else []
+            item["message"] = item["message"].splitlines()[0] if item["message"] else None
+            items.append(item)
+        return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+    def spec_durations(self, last_runs: int = 10) -> Dict[str, float]:
+        """Average wall time per spec file (ms) over the newest `last_runs` runs that ran it"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT spec, AVG(spec_ms) AS avg_ms FROM (
+                       SELECT r.spec, r.run_id, SUM(r.duration_ms) AS spec_ms
+                       FROM results r
+                       WHERE r.duration_ms IS NOT NULL AND r.status != 'skipped'
+                         AND r.run_id IN (SELECT run_id FROM runs ORDER BY ingested_at DESC LIMIT ?)
+                       GROUP BY r.spec, r.run_id
+                   ) GROUP BY spec""",
+                (last_runs,),
+            ).fetchall()
+        return {row["spec"]: row["avg_ms"] for row in rows}
+
+    def outcomes(self, last_runs: int = 20) -> List[Dict[str, Any]]:
+        """Every non-skipped test attempt of the newest `last_runs` runs, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT r.run_id, r.spec, COALESCE(NULLIF(r.full_name, ''), r.name) AS test,
+                          r.status, r.start, r.duration_ms
+                   FROM results r
+                   WHERE r.status != 'skipped'
+                     AND r.run_id IN (SELECT run_id FROM runs ORDER BY ingested_at DESC LIMIT ?)
+                   ORDER BY r.start""",
+                (last_runs,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def result(self, uuid: str) -> Optional[Dict[str, Any]]:
+        """One result with its selectors and attachments"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM results WHERE uuid = ?", (uuid,)).fetchone()
+            if row is None:
+                return None
+            item = dict(row)
+            item["selectors"] = [r[0] for r in conn.execute(
+                "SELECT selector FROM result_selectors WHERE result_uuid = ?", (uuid,))]
+            item["attachments"] = [dict(r) for r in conn.execute(
+                "SELECT name, source, type FROM attachments WHERE result_uuid = ?", (uuid,))]
+        return item
+
+
+_default_db: Optional[ResultsDB] = None
+
+
+def get_default_results_db() -> ResultsDB:
+    global _default_db
+    if _default_db is None:
+        _default_db = ResultsDB()
+    return _default_db
@@ -0,0 +1,240 @@
+"""
+Disk-backed run logs: one file per wdio run with a sparse line index and spec markers
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+RUN_LOGS_DIR = Path(os.getenv("RUN_LOGS_DIR", str(MOBILE_TESTS_DIR / "run-logs")))
+
+RUN_LOGS_MAX_RUNS = int(os.getenv("RUN_LOGS_MAX_RUNS", "200"))
+INDEX_EVERY = 256         # one (line, byte offset) checkpoint per this many lines
+TAIL_LINES = 200          # lines kept in memory for API responses
+
+# wdio spec reporter: "[0-0] RUNNING in Android - file:///.../src/tests/login.e2e.ts"
+SPEC_MARKER = re.compile(r"\b(RUNNING|PASSED|FAILED)\b.*?([\w./\\-]+\.(?:ts|js))\s*$")
+
+
+def new_run_id() -> str:
+    """Sortable run id: timestamp plus a short random suffix"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class RunLog:
+    """Writes one run's output straight to <run_id>.log and its index to <run_id>.idx.json.
+
+    The index holds run metadata, a checkpoint (line number, byte offset) every
+    INDEX_EVERY lines and the first/last line of each spec, so reads and searches
+    can seek instead of scanning. Only the last `tail_lines` lines stay in memory.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        run_id: Optional[str] = None,
+        directory: Path = RUN_LOGS_DIR,
+        tail_lines: int = TAIL_LINES,
+        meta: Optional[Dict[str, Any]] = None,
+    ):
+        self.run_id = run_id or new_run_id()
+        self.kind = kind
+        self.directory = Path(directory)
+        self.path = self.directory / f"{self.run_id}.log"
+        self.index_path = self.directory / f"{self.run_id}.idx.json"
+        self.meta = meta or {}
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.bytes = 0
+        self.checkpoints: List[List[int]] = [[0, 0]]
+        self.specs: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.returncode: Optional[int] = None
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._write_index()
+
+    def write_line(self, line: str, stream: str = "stdout"):
+        """Append one output line (without its newline); safe to call from reader threads"""
+        if stream == "stderr":
+            line = f"[stderr] {line}"
+        data = line.encode("utf-8", errors="replace") + b"\n"
+        with self._lock:
+            if self.lines and self.lines % INDEX_EVERY == 0:
+                self.checkpoints.append([self.lines, self.bytes])
+            self._mark_spec(line)
+            self._file.write(data)
+            self.lines += 1
+            self.bytes += len(data)
+            self.tail.append(line)
+
+    def _mark_spec(self, line: str):
+        match = SPEC_MARKER.search(line)
+        if not match:
+            return
+        status, spec = match.group(1), Path(match.group(2).replace("file://", "")).name
+        entry = self.specs.setdefault(spec, {"start_line": self.lines, "start_offset": self.bytes})
+        entry["end_line"] = self.lines
+        if status != "RUNNING":
+            entry["status"] = status.lower()
+
+    def _index(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "kind": self.kind,
+            "meta": self.meta,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "returncode": self.returncode,
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "index_every": INDEX_EVERY,
+            "checkpoints": self.checkpoints,
+            "specs": self.specs,
+        }
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._index()), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+
+    def close(self, returncode: Optional[int] = None):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            self.returncode = returncode
+            self.finished_at = time.time()
+            self._write_index()
+
+    def tail_text(self, lines: Optional[int] = None) -> str:
+        tail = list(self.tail)
+        return "\n".join(tail[-lines:] if lines else tail)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"run_id": self.run_id, "log_file": str(self.path), "lines": self.lines, "specs": self.specs}
+
+    def __enter__(self) -> "RunLog":
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.close(self.returncode)
+
+
+class RunLogStore:
+    """Read side: list runs, page through a log by line number and search past runs"""
+
+    def __init__(self, directory: Path = RUN_LOGS_DIR, max_runs: int = RUN_LOGS_MAX_RUNS):
+        self.directory = Path(directory)
+        self.max_runs = max_runs
+
+    def index(self, run_id: str) -> Optional[Dict[str, Any]]:
+        path = self.directory / f"{run_id}.idx.json"
+        if not re.fullmatch(r"[\w-]+", run_id) or not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def list_runs(self, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest first, without checkpoints"""
+        runs = []
+        for path in sorted(self.directory.glob("*.idx.json"), reverse=True):
+            index = self.index(path.name[: -len(".idx.json")])
+            if index is None or (kind and index.get("kind") != kind):
+                continue
+            index.pop("checkpoints", None)
+            runs.append(index)
+            if len(runs) >= limit:
+                break
+        return runs
+
+    def _iter_lines(self, run_id: str, start: int = 0) -> Iterator[tuple]:
+        """(line number, text) from `start` on, seeking to the nearest checkpoint first"""
+        index = self.index(run_id)
+        if index is None:
+            return
+        checkpoints = index.get("checkpoints") or [[0, 0]]
+        position = bisect.bisect_right([c[0] for c in checkpoints], start) - 1
+        line_no, offset = checkpoints[max(0, position)]
+        with open(self.directory / f"{run_id}.log", "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if line_no >= start:
+                    yield line_no, raw.decode("utf-8", errors="replace").rstrip("\n")
+                line_no += 1
+
+    def read_lines(self, run_id: str, start: int = 0, count: int = 200) -> List[Dict[str, Any]]:
+        lines = []
+        for line_no, text in self._iter_lines(run_id, start):
+            if len(lines) >= count:
+                break
+            lines.append({"line": line_no, "text": text})
+        return lines
+
+    def spec_lines(self, run_id: str, spec: str, count: int = 500) -> List[Dict[str, Any]]:
+        """Lines from a spec's first to last marker (wdio interleaves workers, so this is approximate)"""
+        index = self.index(run_id) or {}
+        entry = index.get("specs", {}).get(spec)
+        if not entry:
+            return []
+        span = entry.get("end_line", entry["start_line"]) - entry["start_line"] + 1
+        return self.read_lines(run_id, entry["start_line"], min(count, max(span, 1)))
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        kind: Optional[str] = None,
+        runs: int = 20,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Matching lines across the newest `runs` logs, tagged with the spec that was running"""
+        matcher = re.compile(pattern if regex else re.escape(pattern), re.IGNORECASE)
+        hits: List[Dict[str, Any]] = []
+        for run in self.list_runs(kind=kind, limit=runs):
+            spec_starts = sorted((s["start_line"], name) for name, s in run.get("specs", {}).items())
+            starts = [line for line, _ in spec_starts]
+            for line_no, text in self._iter_lines(run["run_id"]):
+                if not matcher.search(text):
+                    continue
+                position = bisect.bisect_right(starts, line_no) - 1
+                hits.append({
+                    "run_id": run["run_id"],
+                    "line": line_no,
+                    "text": text,
+                    "spec": spec_starts[position][1] if position >= 0 else None,
+                })
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def prune(self):
+        """Delete the oldest runs beyond max_runs"""
+        indexes = sorted(self.directory.glob("*.idx.json"), reverse=True)
+        for path in indexes[self.max_runs:]:
+            run_id = path.name[: -len(".idx.json")]
+            for stale in (path, self.directory / f"{run_id}.log"):
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+
+run_log_store = RunLogStore()
@@ -0,0 +1,182 @@
+"""
+Run order from results history: likely-to-fail, fast specs first; flaky specs retried or quarantined
+"""
+
+import os
+import statistics
+from typing import Any, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from allure_results import FAILED_STATUSES
+from results_db import ResultsDB, get_default_results_db
+
+load_dotenv()
+
+STATS_HISTORY_RUNS = int(os.getenv("RUN_ORDER_HISTORY_RUNS", "20"))
+# A test is flaky when at least FLAKY_FLIP_RATE of its consecutive attempts switch
+# between pass and fail, over at least FLAKY_MIN_ATTEMPTS attempts
+FLAKY_MIN_ATTEMPTS = int(os.getenv("FLAKY_MIN_ATTEMPTS", "4"))
+FLAKY_FLIP_RATE = float(os.getenv("FLAKY_FLIP_RATE", "0.3"))
+# "retry": flaky specs run last with SPEC_FILE_RETRIES; "quarantine": they run last and cannot fail the run
+FLAKY_POLICY = os.getenv("FLAKY_POLICY", "retry")
+FLAKY_RETRIES = int(os.getenv("FLAKY_RETRIES", "2"))
+DEFAULT_SPEC_MS = 60000.0
+
+
+class SpecStats:
+    """Outcome history of one spec file"""
+
+    __slots__ = ("spec", "runs", "failed_runs", "durations", "flaky_tests", "last_status")
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.runs = 0
+        self.failed_runs = 0
+        self.durations: List[float] = []
+        self.flaky_tests: Dict[str, float] = {}  # test -> flip rate
+        self.last_status: Optional[str] = None
+
+    @property
+    def failure_rate(self) -> float:
+        """Smoothed (Laplace) probability that the next run fails"""
+        return (self.failed_runs + 1) / (self.runs + 2)
+
+    @property
+    def avg_ms(self) -> Optional[float]:
+        return statistics.fmean(self.durations) if self.durations else None
+
+    @property
+    def flaky(self) -> bool:
+        return bool(self.flaky_tests)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spec": self.spec,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "failure_rate": round(self.failure_rate, 3),
+            "avg_ms": round(self.avg_ms) if self.avg_ms is not None else None,
+            "last_status": self.last_status,
+            "flaky": self.flaky,
+            "flaky_tests": {test: round(rate, 3) for test, rate in self.flaky_tests.items()},
+        }
+
+
+def compute_stats(outcomes: Sequence[Dict[str, Any]]) -> Dict[str, SpecStats]:
+    """Per-spec stats from chronological test attempts (ResultsDB.outcomes()).
+
+    A spec failed in a run when any test's last attempt in that run failed.
+    Flips count pass<->fail changes between consecutive attempts of the same test,
+    across runs and across retries within a run.
+    """
+    stats: Dict[str, SpecStats] = {}
+    attempts: Dict[tuple, List[bool]] = {}                # (spec, test) -> failed? per attempt
+    final: Dict[tuple, Dict[str, bool]] = {}              # (spec, run) -> {test: failed on last attempt}
+    spec_ms: Dict[tuple, float] = {}                      # (spec, run) -> summed test time
+    run_order: Dict[str, List[str]] = {}                  # spec -> runs, oldest first
+    for row in outcomes:
+        spec, run, failed = row["spec"], row["run_id"], row["status"] in FAILED_STATUSES
+        attempts.setdefault((spec, row["test"]), []).append(failed)
+        final.setdefault((spec, run), {})[row["test"]] = failed
+        spec_ms[(spec, run)] = spec_ms.get((spec, run), 0.0) + (row["duration_ms"] or 0)
+        runs = run_order.setdefault(spec, [])
+        if not runs or runs[-1] != run:
+            runs.append(run)
+
+    for spec, runs in run_order.items():
+        entry = stats[spec] = SpecStats(spec)
+        for run in runs:
+            failed = any(final[(spec, run)].values())
+            entry.runs += 1
+            entry.failed_runs += failed
+            entry.durations.append(spec_ms[(spec, run)])
+            entry.last_status = "failed" if failed else "passed"
+
+    for (spec, test), history in attempts.items():
+        if len(history) < FLAKY_MIN_ATTEMPTS:
+            continue
+        flips = sum(1 for before, after in zip(history, history[1:]) if before != after)
+        rate = flips / (len(history) - 1)
+        if rate >= FLAKY_FLIP_RATE:
+            stats[spec].flaky_tests[test] = rate
+    return stats
+
+
+def load_stats(db: Optional[ResultsDB] = None, last_runs: int = STATS_HISTORY_RUNS) -> Dict[str, SpecStats]:
+    return compute_stats((db or get_default_results_db()).outcomes(last_runs))
+
+
+class RunPlan:
+    """Specs in execution order: `ordered` first, then `flaky` (retried or quarantined)"""
+
+    def __init__(self, ordered: List[str], flaky: List[str], policy: str, retries: int):
+        self.ordered = ordered
+        self.flaky = flaky
+        self.policy = policy
+        self.retries = retries
+
+    @property
+    def quarantined(self) -> List[str]:
+        return self.flaky if self.policy == "quarantine" else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ordered": self.ordered, "flaky": self.flaky, "policy": self.policy, "retries": self.retries}
+
+
+def plan_run_order(
+    specs: Sequence[str],
+    stats: Dict[str, SpecStats],
+    policy: str = FLAKY_POLICY,
+    retries: int = FLAKY_RETRIES,
+) -> RunPlan:
+    """Order specs by failure probability per second of run time, highest first.
+
+    Specs with no history count as 50% likely to fail and take the median duration,
+    so new specs run early. Flaky specs are held back for a separate, last pass.
+    """
+    known_ms = [s.avg_ms for s in stats.values() if s.avg_ms]
+    median_ms = statistics.median(known_ms) if known_ms else DEFAULT_SPEC_MS
+
+    def priority(spec: str) -> float:
+        entry = stats.get(spec)
+        probability = entry.failure_rate if entry else 0.5
+        duration = (entry.avg_ms if entry and entry.avg_ms else median_ms) / 1000
+        return probability / max(duration, 1.0)
+
+    flaky = [spec for spec in specs if spec in stats and stats[spec].flaky]
+    ordered = sorted((s for s in specs if s not in flaky), key=lambda s: (-priority(s), s))
+    return RunPlan(ordered, sorted(flaky, key=lambda s: (-priority(s), s)), policy, retries)
+
+
+class WdioPass:
+    """One wdio invocation of a plan; failures in a pass that is not `required` do not fail the run"""
+
+    __slots__ = ("name", "specs", "args", "env", "required")
+
+    def __init__(self, name: str, specs: List[str], args: List[str], env: Dict[str, str], required: bool = True):
+        self.name = name
+        self.specs = specs
+        self.args = args
+        self.env = env
+        self.required = required
+
+    def command(self, npx_cmd: Sequence[str] = ("npx",), config_file: str = "wdio.conf.ts") -> List[str]:
+        cmd = list(npx_cmd) + ["wdio", "run", config_file] + self.args
+        for spec in self.specs:
+            cmd += ["--spec", f"./src/tests/{spec}"]
+        return cmd
+
+
+def wdio_passes(plan: RunPlan, fail_fast: bool = False) -> List[WdioPass]:
+    """The ordered specs in one wdio run (stopping at the first failed test with fail_fast), then the flaky ones"""
+    passes = [WdioPass("main", plan.ordered, ["--bail", "1"] if fail_fast else [], {})]
+    if plan.flaky:
+        env = {"SPEC_FILE_RETRIES": str(plan.retries)} if plan.policy == "retry" else {}
+        passes.append(WdioPass("flaky", plan.flaky, [], env, required=plan.policy != "quarantine"))
+    return [p for p in passes if p.specs]
+
+
+def blocking_failures(summary: Dict[str, Any], plan: RunPlan) -> List[Dict[str, Any]]:
+    """Failures that count against the run (quarantined specs excluded)"""
+    return [f for f in summary.get("failures", []) if f.get("spec") not in plan.quarantined]
@@ -0,0 +1,299 @@
+"""
+Structural screen fingerprints (Merkle subtree hashes) and a classifier over known crawls
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+
+from crawl_batch import CRAWLS_DIR
+from crawl_index import ROOT_TAGS
+from navigation_graph import IGNORED_CRAWLS
+from selector_matcher import PREVIOUS_CRAWLS_DIR
+
+load_dotenv()
+
+# A page source is classified as a known screen at this similarity (0..1) or above
+SCREEN_MATCH_THRESHOLD = float(os.getenv("SCREEN_MATCH_THRESHOLD", "0.5"))
+# ...and only when the runner-up is at least this much less similar
+SCREEN_MATCH_MARGIN = float(os.getenv("SCREEN_MATCH_MARGIN", "0.1"))
+# Captures at least this similar are the same screen in a different state (explorer dedupe)
+SCREEN_DEDUPE_THRESHOLD = float(os.getenv("SCREEN_DEDUPE_THRESHOLD", "0.8"))
+
+# The only attributes hashed: text, bounds, focus/selection state and indexes change with data and layout
+STABLE_ATTRIBUTES = ("resource-id", "content-desc", "type", "name")
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class ScreenFingerprint:
+    """Root hash of a hierarchy plus the hashes of its identifiable subtrees.
+
+    Each node hashes its tag, its stable attributes and its children's hashes;
+    runs of identical siblings (list rows) count once, so the number of rows does
+    not matter. `root` is equal for structurally identical screens. `subtrees`
+    holds the hashes of nodes with an id/description or children, plus each
+    node's ancestor path, so one changed element costs its path and the subtrees
+    above it rather than the whole screen; their overlap measures similarity.
+    """
+
+    __slots__ = ("root", "subtrees", "element_count")
+
+    def __init__(self, root: str, subtrees: FrozenSet[bytes], element_count: int):
+        self.root = root
+        self.subtrees = subtrees
+        self.element_count = element_count
+
+    def similarity(self, other: "ScreenFingerprint") -> float:
+        """Jaccard overlap of identifiable subtrees (1.0 for identical structure)"""
+        if self.root == other.root:
+            return 1.0
+        if not self.subtrees or not other.subtrees:
+            return 0.0
+        shared = len(self.subtrees & other.subtrees)
+        return shared / (len(self.subtrees) + len(other.subtrees) - shared)
+
+    def __repr__(self) -> str:
+        return f"ScreenFingerprint({self.root!r}, {len(self.subtrees)} subtrees)"
+
+
+def fingerprint_xml(source: Union[str, Path, BinaryIO]) -> ScreenFingerprint:
+    """Fingerprint a page source file (or binary file object) in one streaming pass"""
+    children: List[List[bytes]] = [[]]
+    paths: List[bytes] = [b""]
+    subtrees = set()
+    count = 0
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if elem.tag in ROOT_TAGS:
+            continue
+        identity = "|".join([elem.tag, *(elem.get(a, "") for a in STABLE_ATTRIBUTES)]).encode("utf-8")
+        if event == "start":
+            children.append([])
+            paths.append(_digest(paths[-1] + identity))
+            continue
+        kids = children.pop()
+        path = paths.pop()
+        collapsed = [h for i, h in enumerate(kids) if i == 0 or h != kids[i - 1]]
+        node_hash = _digest(identity + b"".join(collapsed))
+        if kids or any(elem.get(a) for a in STABLE_ATTRIBUTES):
+            subtrees.add(node_hash)
+        # The node's place in the tree survives changes elsewhere on the screen
+        subtrees.add(b"@" + path)
+        children[-1].append(node_hash)
+        count += 1
+        elem.clear()
+    top = children[0]
+    root = _digest(b"".join(top)).hex()
+    return ScreenFingerprint(root, frozenset(subtrees), count)
+
+
+def fingerprint_string(xml: str) -> ScreenFingerprint:
+    """Fingerprint page source held in memory (e.g. driver.getPageSource())"""
+    return fingerprint_xml(io.BytesIO(xml.encode("utf-8")))
+
+
+class ScreenIndex:
+    """Fingerprints of known screens with an inverted subtree index for fast classification.
+
+    Built from crawls/*.xml (crawls/previous and 'unknown' excluded); `refresh()`
+    re-fingerprints only files whose mtime or size changed.
+    """
+
+    def __init__(self, crawls_dir: Optional[Path] = CRAWLS_DIR):
+        self.crawls_dir = Path(crawls_dir) if crawls_dir else None
+        self.screens: Dict[str, ScreenFingerprint] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}  # name -> (mtime_ns, size)
+        self._postings: Dict[bytes, set] = {}  # subtree hash -> names
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def add(self, name: str, fingerprint: ScreenFingerprint):
+        with self._lock:
+            self._remove(name)
+            self.screens[name] = fingerprint
+            for subtree in fingerprint.subtrees:
+                self._postings.setdefault(subtree, set()).add(name)
+
+    def _remove(self, name: str):
+        old = self.screens.pop(name, None)
+        if old is not None:
+            for subtree in old.subtrees:
+                names = self._postings.get(subtree)
+                if names:
+                    names.discard(name)
+                    if not names:
+                        del self._postings[subtree]
+
+    def refresh(self) -> "ScreenIndex":
+        if self.crawls_dir is None:
+            return self
+        with self._refresh_lock:
+            self._refresh()
+        return self
+
+    def _refresh(self):
+        seen = set()
+        for path in sorted(self.crawls_dir.glob("*.xml")):
+            name = path.stem.lower()
+            if name in IGNORED_CRAWLS:
+                continue
+            seen.add(name)
+            try:
+                stat = path.stat()
+                key = (stat.st_mtime_ns, stat.st_size)
+                if self._stats.get(name) == key:
+                    continue
+                self.add(name, fingerprint_xml(path))
+                self._stats[name] = key
+            except (OSError, ET.ParseError):
+                continue
+        with self._lock:
+            for name in [n for n in self._stats if n not in seen]:
+                self._remove(name)
+                del self._stats[name]
+
+    def ranked(self, fingerprint: ScreenFingerprint, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Known screens by similarity to the fingerprint, most similar first (zero-overlap screens left out)"""
+        excluded = set(exclude)
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for subtree in fingerprint.subtrees:
+                for name in self._postings.get(subtree, ()):
+                    shared[name] = shared.get(name, 0) + 1
+            for name, known in self.screens.items():
+                if known.root == fingerprint.root:
+                    shared[name] = -1  # identical
+            scores = []
+            for name, count in shared.items():
+                if name in excluded:
+                    continue
+                known = self.screens[name]
+                score = 1.0 if count < 0 else count / (len(known.subtrees) + len(fingerprint.subtrees) - count)
+                scores.append((name, score))
+        return sorted(scores, key=lambda item: (-item[1], item[0]))
+
+    def classify(
+        self,
+        source: Union[str, ScreenFingerprint],
+        exclude: Iterable[str] = (),
+        threshold: float = SCREEN_MATCH_THRESHOLD,
+        margin: float = SCREEN_MATCH_MARGIN,
+    ) -> Dict[str, Any]:
+        """Which known screen a page source (or fingerprint) shows.
+
+        "page" is None when nothing reaches the threshold, or when the best two
+        are closer than the margin ("ambiguous").
+        """
+        started = time.perf_counter()
+        fingerprint = source if isinstance(source, ScreenFingerprint) else fingerprint_string(source)
+        ranked = self.ranked(fingerprint, exclude)
+        best = ranked[0] if ranked else (None, 0.0)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        matched = best[1] >= threshold and (best[1] == 1.0 or best[1] - runner_up >= margin)
+        return {
+            "page": best[0] if matched else None,
+            "similarity": round(best[1], 3),
+            "exact": best[1] == 1.0,
+            "ambiguous": best[1] >= threshold and not matched,
+            "fingerprint": fingerprint.root,
+            "candidates": [{"page": name, "similarity": round(score, 3)} for name, score in ranked[:3]],
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def verify(
+        self,
+        page: str,
+        fingerprint: ScreenFingerprint,
+        reference: Optional[ScreenFingerprint] = None,
+        threshold: float = SCREEN_MATCH_THRESHOLD,
+        margin: float = SCREEN_MATCH_MARGIN,
+    ) -> Dict[str, Any]:
+        """Does a screen captured as `page` show that page?
+
+        `reference` is an earlier capture of the page, e.g. `self.screens.get(page)`.
+        verified is False when another known screen is a clear match and the page's
+        own reference is not (without a reference, when it is a near duplicate of
+        another screen), None when nothing matches well enough to tell (e.g. the
+        page was redesigned, or this is its first capture).
+        """
+        page = page.lower()
+        own = fingerprint.similarity(reference) if reference is not None else None
+        others = self.ranked(fingerprint, exclude=[page])
+        other, other_score = others[0] if others else (None, 0.0)
+        bar = threshold if own is not None else max(threshold, SCREEN_DEDUPE_THRESHOLD)
+        if other_score >= bar and other_score - (own or 0.0) >= margin:
+            verified: Optional[bool] = False
+        elif own is not None and own >= threshold:
+            verified = True
+        else:
+            verified = None
+        return {
+            "page": page,
+            "verified": verified,
+            "similarity": round(own, 3) if own is not None else None,
+            "looks_like": other if verified is False else None,
+            "looks_like_similarity": round(other_score, 3) if other else None,
+        }
+
+
+def verify_crawl(page: str, crawls_dir: Path = CRAWLS_DIR) -> Dict[str, Any]:
+    """Check a freshly saved crawls/{page}.xml against its previous capture and the other known screens.
+
+    For an 'unknown' crawl, looks_like is the known screen it shows, if any.
+    """
+    crawls_dir = Path(crawls_dir)
+    index = get_default_screen_index(crawls_dir)
+    fingerprint = fingerprint_xml(crawls_dir / f"{page}.xml")
+    if page.lower() in IGNORED_CRAWLS:
+        match = index.classify(fingerprint)
+        return {
+            "page": page,
+            "verified": None,
+            "similarity": None,
+            "looks_like": match["page"],
+            "looks_like_similarity": match["similarity"] if match["page"] else None,
+        }
+    previous = crawls_dir / PREVIOUS_CRAWLS_DIR.name / f"{page}.xml"
+    reference = fingerprint_xml(previous) if previous.exists() else None
+    return index.verify(page, fingerprint, reference=reference)
+
+
+def audit_crawls(crawls_dir: Path = CRAWLS_DIR) -> List[Dict[str, Any]]:
+    """verify_crawl for every crawls/*.xml, plus the other crawl each one near-duplicates"""
+    crawls_dir = Path(crawls_dir)
+    index = get_default_screen_index(crawls_dir)
+    results = []
+    for path in sorted(crawls_dir.glob("*.xml")):
+        try:
+            result = verify_crawl(path.stem, crawls_dir)
+        except (OSError, ET.ParseError) as e:
+            results.append({"page": path.stem, "error": str(e)})
+            continue
+        fingerprint = index.screens.get(path.stem.lower())
+        ranked = index.ranked(fingerprint, exclude=[path.stem.lower()]) if fingerprint else []
+        result["duplicate_of"] = ranked[0][0] if ranked and ranked[0][1] >= SCREEN_DEDUPE_THRESHOLD else None
+        results.append(result)
+    return results
+
+
+_default_indexes: Dict[Path, ScreenIndex] = {}
+_default_indexes_lock = threading.Lock()
+
+
+def get_default_screen_index(crawls_dir: Path = CRAWLS_DIR) -> ScreenIndex:
+    """Shared index of a crawls directory, refreshed from disk on every call"""
+    crawls_dir = Path(crawls_dir).resolve()
+    with _default_indexes_lock:
+        index = _default_indexes.get(crawls_dir)
+        if index is None:
+            index = _default_indexes[crawls_dir] = ScreenIndex(crawls_dir)
+    return index.refresh()
@@ -0,0 +1,196 @@
+"""
+LLM-free selector healing: find the element a stale selector pointed at in a fresh crawl
+"""
+
+import os
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from crawl_cache import get_crawl_index
+from crawl_index import CrawlElement, CrawlIndex
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+CRAWLS_DIR = MOBILE_TESTS_DIR / "crawls"
+PREVIOUS_CRAWLS_DIR = CRAWLS_DIR / "previous"
+
+MIN_CONFIDENCE = float(os.getenv("SELECTOR_MATCH_MIN_CONFIDENCE", "0.7"))
+
+HASH_DIM = 512  # hashed character-trigram space per attribute
+
+# Attribute weights; renormalised over the attributes the old element actually has
+WEIGHTS = {
+    "content_desc": 0.30,
+    "resource_id": 0.25,
+    "text": 0.15,
+    "class": 0.10,
+    "tree": 0.10,
+    "bounds": 0.10,
+}
+
+
+def snapshot_crawl(page: str, crawls_dir: Path = CRAWLS_DIR) -> Optional[Path]:
+    """Keep the current crawl of a page as crawls/previous/{page}.xml before it is re-crawled"""
+    current = Path(crawls_dir) / f"{page}.xml"
+    if not current.exists():
+        return None
+    previous = Path(crawls_dir) / PREVIOUS_CRAWLS_DIR.name / f"{page}.xml"
+    previous.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(current, previous)
+    return previous
+
+
+def _id_name(resource_id: str) -> str:
+    return resource_id.split(":id/")[-1] if ":id/" in resource_id else resource_id
+
+
+def _trigram_vectors(values: List[str]) -> np.ndarray:
+    """L2-normalised hashed character-trigram counts, one row per value (zero row for empty)"""
+    matrix = np.zeros((len(values), HASH_DIM), dtype=np.float32)
+    for row, value in enumerate(values):
+        value = value.lower().strip()
+        if not value:
+            continue
+        padded = f"  {value} "
+        columns = [zlib.crc32(padded[i:i + 3].encode("utf-8")) % HASH_DIM for i in range(len(padded) - 2)]
+        np.add.at(matrix[row], columns, 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class CandidateMatrix:
+    """Feature matrices for every element of a crawl that has a usable selector"""
+
+    def __init__(self, index: CrawlIndex):
+        self.elements: List[CrawlElement] = [el for el in index.elements if el.selector]
+        els = self.elements
+        self.desc = _trigram_vectors([el.content_desc for el in els])
+        self.rid = _trigram_vectors([_id_name(el.resource_id) for el in els])
+        self.text = _trigram_vectors([el.text for el in els])
+        self.classes = np.array([el.short_class for el in els], dtype=object)
+        self.depth = np.array([el.depth for el in els], dtype=np.float32)
+        total = max(len(index.elements) - 1, 1)
+        self.order = np.array([el.position / total for el in els], dtype=np.float32)
+        bounds = np.array([el.bounds or (0, 0, 0, 0) for el in els], dtype=np.float32).reshape(-1, 4)
+        self.has_bounds = np.array([el.bounds is not None for el in els])
+        self.center = np.stack([(bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2], axis=1)
+        self.size = np.stack([bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]], axis=1)
+        extent = np.maximum(bounds[:, 2].max(initial=1), bounds[:, 3].max(initial=1))
+        self.diagonal = float(np.hypot(extent, extent)) or 1.0
+        self.total = total
+
+
+class SelectorMatch:
+    __slots__ = ("selector", "score", "confidence", "element")
+
+    def __init__(self, selector: str, score: float, confidence: float, element: CrawlElement):
+        self.selector = selector
+        self.score = score
+        self.confidence = confidence
+        self.element = element
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "selector": self.selector,
+            "score": round(self.score, 3),
+            "confidence": round(self.confidence, 3),
+            "class": self.element.short_class,
+            "text": self.element.text,
+        }
+
+
+class SelectorMatcher:
+    """Ranks fresh-crawl elements by similarity to the element a stale selector used to find.
+
+    The old element comes from the previous crawl (crawls/previous/{page}.xml). Every
+    candidate is scored at once with NumPy: trigram cosine similarity of
+    content-desc, resource-id and text, class equality, tree position (depth and
+    document order) and bounds proximity. Confidence is the best score, discounted
+    when the runner-up is nearly as good.
+    """
+
+    def __init__(self, crawls_dir: Path = CRAWLS_DIR):
+        self.crawls_dir = Path(crawls_dir)
+        self._matrices: Dict[Tuple[str, int], CandidateMatrix] = {}
+
+    def _matrix(self, path: Path) -> CandidateMatrix:
+        key = (str(path), path.stat().st_mtime_ns)
+        if key not in self._matrices:
+            self._matrices = {k: v for k, v in self._matrices.items() if k[0] != key[0]}
+            self._matrices[key] = CandidateMatrix(get_crawl_index(path))
+        return self._matrices[key]
+
+    def find_old_element(self, page: str, selector: str) -> Optional[Tuple[CrawlElement, int]]:
+        """The element `selector` matched in the previous crawl, and that crawl's element count"""
+        previous = self.crawls_dir / PREVIOUS_CRAWLS_DIR.name / f"{page}.xml"
+        if not previous.exists():
+            return None
+        index = get_crawl_index(previous)
+        for el in index.elements:
+            if el.matches(selector):
+                return el, len(index.elements)
+        return None
+
+    def rank(self, old: CrawlElement, candidates: CandidateMatrix, old_total: int = 1, top: int = 5) -> List[SelectorMatch]:
+        n = len(candidates.elements)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        weight_sum = 0.0
+
+        for attribute, value, matrix in (
+            ("content_desc", old.content_desc, candidates.desc),
+            ("resource_id", _id_name(old.resource_id), candidates.rid),
+            ("text", old.text, candidates.text),
+        ):
+            if value.strip():
+                scores += WEIGHTS[attribute] * (matrix @ _trigram_vectors([value])[0])
+                weight_sum += WEIGHTS[attribute]
+
+        scores += WEIGHTS["class"] * (candidates.classes == old.short_class)
+        weight_sum += WEIGHTS["class"]
+
+        old_order = old.position / max(old_total - 1, 1)
+        tree = np.exp(-np.abs(candidates.depth - old.depth) / 2) * (1 - np.minimum(np.abs(candidates.order - old_order) * 2, 1))
+        scores += WEIGHTS["tree"] * tree
+        weight_sum += WEIGHTS["tree"]
+
+        if old.bounds:
+            x1, y1, x2, y2 = old.bounds
+            distance = np.hypot(candidates.center[:, 0] - (x1 + x2) / 2, candidates.center[:, 1] - (y1 + y2) / 2)
+            old_area = max((x2 - x1) * (y2 - y1), 1)
+            area = np.maximum(candidates.size[:, 0] * candidates.size[:, 1], 1)
+            size_ratio = np.minimum(area, old_area) / np.maximum(area, old_area)
+            proximity = (1 - np.minimum(distance / candidates.diagonal, 1)) * (0.5 + 0.5 * size_ratio)
+            scores += WEIGHTS["bounds"] * np.where(candidates.has_bounds, proximity, 0)
+            weight_sum += WEIGHTS["bounds"]
+
+        scores /= weight_sum
+        order = np.argsort(-scores)[:top]
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+        margin_factor = 0.5 + 0.5 * min(1.0, (best - runner_up) / 0.15)
+
+        matches = []
+        for rank, i in enumerate(order):
+            score = float(scores[i])
+            confidence = score * margin_factor if rank == 0 else score * 0.5
+            matches.append(SelectorMatch(candidates.elements[i].selector, score, confidence, candidates.elements[i]))
+        return matches
+
+    def match(self, page: str, selector: str, top: int = 5) -> List[SelectorMatch]:
+        """Ranked replacements for a selector that no longer exists on the page ([] without history)"""
+        current = self.crawls_dir / f"{page}.xml"
+        found = self.find_old_element(page, selector)
+        if found is None or not current.exists():
+            return []
+        old, old_total = found
+        return self.rank(old, self._matrix(current), old_total, top)
@@ -0,0 +1,169 @@
+"""
+Sharded test runs: split specs across every attached device, balanced by historical duration
+"""
+
+import heapq
+import os
+import statistics
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from device_manager import DeviceManager, platform_version
+from results_db import ResultsDB, get_default_results_db
+
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+TESTS_DIR = MOBILE_TESTS_DIR / "src" / "tests"
+
+# Utility specs that are not part of a test run
+EXCLUDED_SPECS = ("crawl-page.e2e.ts",)
+
+# Estimate for specs with no history yet (when no other spec has history either)
+DEFAULT_SPEC_MS = float(os.getenv("SHARD_DEFAULT_SPEC_MS", "60000"))
+DURATION_HISTORY_RUNS = 10
+# Shard i talks to Appium on APPIUM_BASE_PORT + i and uses SYSTEM_BASE_PORT + i on the host
+APPIUM_BASE_PORT = int(os.getenv("SHARD_APPIUM_BASE_PORT", "4723"))
+SYSTEM_BASE_PORT = int(os.getenv("SHARD_SYSTEM_BASE_PORT", "8200"))
+WDA_BASE_PORT = int(os.getenv("SHARD_WDA_BASE_PORT", "8100"))
+# wdio config per platform; both read the DEVICE_UDID / APPIUM_* overrides Shard.env sets
+WDIO_CONFIGS = {"android": "wdio.conf.ts", "ios": "wdio.ios.conf.ts"}
+
+
+def list_specs(tests_dir: Path = TESTS_DIR) -> List[str]:
+    """Spec file names under src/tests, minus utility specs"""
+    return sorted(p.name for p in Path(tests_dir).glob("*.e2e.ts") if p.name not in EXCLUDED_SPECS)
+
+
+def appium_running(port: int, timeout: float = 1.0) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/status", timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+class Shard:
+    """The specs one device runs, and the ports its wdio process uses"""
+
+    def __init__(self, index: int, device: Dict[str, Any], platform_name: str):
+        self.index = index
+        self.device = device
+        self.platform_name = platform_name
+        self.specs: List[str] = []
+        self.estimated_ms = 0.0
+        self.appium_port = APPIUM_BASE_PORT + index
+        self.system_port = SYSTEM_BASE_PORT + index
+        self.wda_port = WDA_BASE_PORT + index
+
+    @property
+    def label(self) -> str:
+        return self.device.get("name") or self.device.get("id") or f"shard-{self.index}"
+
+    @property
+    def config_file(self) -> str:
+        return WDIO_CONFIGS.get(self.platform_name.lower(), WDIO_CONFIGS["android"])
+
+    def command(self, npx_cmd: Sequence[str] = ("npx",), config_file: Optional[str] = None) -> List[str]:
+        cmd = list(npx_cmd) + ["wdio", "run", config_file or self.config_file]
+        for spec in self.specs:
+            cmd += ["--spec", f"./src/tests/{spec}"]
+        return cmd
+
+    def env(self, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Environment that pins the wdio config to this shard's device and ports"""
+        env = dict(os.environ if base is None else base)
+        version = platform_version(self.device)
+        env.update({
+            "DEVICE_UDID": str(self.device.get("id", "")),
+            "DEVICE_NAME": str(self.device.get("name") or self.device.get("id", "")),
+            "APPIUM_PORT": str(self.appium_port),
+            # Reuse an Appium server already listening on the port, otherwise let wdio start one
+            "APPIUM_START": "0" if appium_running(self.appium_port) else "1",
+        })
+        if version:
+            env["DEVICE_PLATFORM_VERSION"] = version
+        if self.platform_name.lower() == "ios":
+            env["APPIUM_WDA_LOCAL_PORT"] = str(self.wda_port)
+        else:
+            env["APPIUM_SYSTEM_PORT"] = str(self.system_port)
+        return env
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "shard": self.index,
+            "device": self.device.get("id"),
+            "device_name": self.device.get("name"),
+            "specs": self.specs,
+            "estimated_ms": round(self.estimated_ms),
+            "appium_port": self.appium_port,
+        }
+
+
+def plan_shards(
+    specs: Sequence[str],
+    devices: Sequence[Dict[str, Any]],
+    platform_name: str = "Android",
+    durations: Optional[Dict[str, float]] = None,
+) -> List[Shard]:
+    """Longest-processing-time-first: each spec, longest first, goes to the least loaded device.
+
+    Specs without history are estimated at the median of the known durations.
+    Devices that end up with no specs get no shard.
+    """
+    if not devices or not specs:
+        return []
+    durations = durations or {}
+    known = [durations[s] for s in specs if s in durations]
+    fallback = statistics.median(known) if known else DEFAULT_SPEC_MS
+    estimates = {spec: durations.get(spec, fallback) for spec in specs}
+
+    shards = [Shard(i, device, platform_name) for i, device in enumerate(devices)]
+    heap = [(0.0, shard.index) for shard in shards]
+    for spec in sorted(specs, key=lambda s: (-estimates[s], s)):
+        load, index = heapq.heappop(heap)
+        shards[index].specs.append(spec)
+        shards[index].estimated_ms = load + estimates[spec]
+        heapq.heappush(heap, (shards[index].estimated_ms, index))
+    return [shard for shard in shards if shard.specs]
+
+
+def prepare_shards(
+    platform_name: str = "Android",
+    device_ids: Optional[Sequence[str]] = None,
+    pages: Optional[Sequence[str]] = None,
+    db: Optional[ResultsDB] = None,
+    device_manager: Optional[DeviceManager] = None,
+    specs: Optional[Sequence[str]] = None,
+) -> List[Shard]:
+    """Detect devices, pick the specs to run (all, or `specs`) and plan shards from the results history"""
+    devices = (device_manager or DeviceManager()).detect_devices(platform_name)
+    if device_ids:
+        devices = [d for d in devices if d.get("id") in device_ids]
+    specs = list(specs) if specs is not None else list_specs()
+    if pages:
+        wanted = {f"{page.lower()}.e2e.ts" for page in pages}
+        specs = [s for s in specs if s in wanted]
+    try:
+        durations = (db or get_default_results_db()).spec_durations(DURATION_HISTORY_RUNS)
+    except Exception:
+        durations = {}
+    return plan_shards(specs, devices, platform_name, durations)
+
+
+def shard_report(shards: Sequence[Shard], summary: Dict[str, Any], returncodes: Sequence[Optional[int]]) -> List[Dict[str, Any]]:
+    """Per-shard outcome from a merged results summary (AllureResultsReader.summary())"""
+    report = []
+    for shard, returncode in zip(shards, returncodes):
+        spec_results = [summary["specs"][spec] for spec in shard.specs if spec in summary["specs"]]
+        report.append({
+            **shard.to_dict(),
+            "returncode": returncode,
+            "actual_ms": sum(s["duration_ms"] for s in spec_results),
+            "failed_specs": [spec for spec in shard.specs if summary["specs"].get(spec, {}).get("status") == "failed"],
+        })
+    return report
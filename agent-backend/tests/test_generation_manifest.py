@@ -0,0 +1,49 @@
+import json
+import threading
+
+from generation_manifest import GenerationManifest, fingerprint
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+    assert fingerprint({"a": 1, "b": [1, 2]}) != fingerprint({"a": 1, "b": [2, 1]})
+
+
+def test_current_only_for_the_same_inputs_and_an_existing_output(tmp_path):
+    manifest = GenerationManifest(tmp_path / "manifest.json")
+    output = tmp_path / "LoginPage.ts"
+    output.write_text("// generated", encoding="utf-8")
+    inputs = {"selectors": ["~login"], "model": "gpt-4o"}
+    manifest.record("Login", "pom", fingerprint(inputs), output, inputs)
+
+    assert manifest.is_current("login", "pom", fingerprint(inputs), output)
+    assert not manifest.is_current("login", "pom", fingerprint({**inputs, "model": "gpt-4o-mini"}), output)
+    assert not manifest.is_current("login", "tests", fingerprint(inputs), output)
+    output.unlink()
+    assert not manifest.is_current("login", "pom", fingerprint(inputs), output)
+
+
+def test_missing_or_corrupt_manifest_is_empty(tmp_path):
+    path = tmp_path / "manifest.json"
+    assert GenerationManifest(path).pages() == {}
+    path.write_text("{broken", encoding="utf-8")
+    assert GenerationManifest(path).get("login", "pom") is None
+
+
+def test_concurrent_records_keep_every_artifact(tmp_path):
+    manifest = GenerationManifest(tmp_path / "manifest.json")
+    artifacts = ["pom", "tests", "manual"]
+    threads = [
+        threading.Thread(target=manifest.record, args=(page, artifact, "f", tmp_path / artifact, {}))
+        for page in ("login", "home") for artifact in artifacts
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    assert {page: sorted(entries) for page, entries in data["pages"].items()} == {
+        "login": sorted(artifacts),
+        "home": sorted(artifacts),
+    }
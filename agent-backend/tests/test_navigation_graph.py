@@ -0,0 +1,112 @@
+import json
+
+from navigation_graph import ANY_SCREEN, NavigationGraph, build_navigation_graph, render_navigation_steps
+from wait_strategy import WaitPolicy
+
+
+def _crawl(*elements: str) -> str:
+    return f'<hierarchy><android.widget.FrameLayout>{"".join(elements)}</android.widget.FrameLayout></hierarchy>'
+
+
+def _button(desc: str, clickable: bool = True) -> str:
+    return (
+        f'<android.widget.Button content-desc="{desc}" clickable="{str(clickable).lower()}" '
+        'enabled="true" bounds="[0,0][100,100]"/>'
+    )
+
+
+def _chain() -> NavigationGraph:
+    graph = NavigationGraph()
+    graph.add_edge("home", "settings", "~Settings")
+    graph.add_edge("settings", "profile", "~Profile")
+    graph.add_edge("home", "menu", "~Menu")
+    graph.add_edge("menu", "profile", "~Menu profile")
+    graph.add_edge("menu", "about", "~About")
+    return graph
+
+
+def test_shortest_path_takes_the_fewest_taps():
+    graph = _chain()
+    graph.add_edge("about", "profile", "~About profile")
+    assert [e.selector for e in graph.shortest_path("home", "profile")] in (
+        ["~Settings", "~Profile"],
+        ["~Menu", "~Menu profile"],
+    )
+    assert [e.selector for e in graph.shortest_path("about", "profile")] == ["~About profile"]
+    assert graph.shortest_path("profile", "profile") == []
+    assert graph.shortest_path("profile", "home") is None
+
+
+def test_recorded_transitions_win_over_inferred_ones():
+    graph = NavigationGraph()
+    graph.add_edge("home", "login", "~Login", recorded=True)
+    graph.add_edge("home", "login", "~Sign in")
+    assert graph.shortest_path("home", "login")[0].selector == "~Login"
+    graph.add_edge("home", "login", "~Log in now", recorded=True)
+    assert graph.shortest_path("home", "login")[0].selector == "~Log in now"
+
+
+def test_graph_from_crawls_and_recorded_transitions(tmp_path):
+    (tmp_path / "home.xml").write_text(_crawl(
+        _button("home-screen", clickable=False), _button("Login"), _button("Forms"), _button("Home"),
+    ), encoding="utf-8")
+    (tmp_path / "login.xml").write_text(_crawl(
+        _button("login-screen", clickable=False), _button("Forms"), _button("Home"),
+    ), encoding="utf-8")
+    (tmp_path / "unknown.xml").write_text(_crawl(_button("Login")), encoding="utf-8")
+    (tmp_path / "navigation.json").write_text(json.dumps({"transitions": [
+        {"from": "login", "to": "signup", "selector": "~Sign up"},
+    ]}), encoding="utf-8")
+
+    graph = build_navigation_graph(tmp_path, extra_screens=["forms"])
+
+    assert graph.anchors == {"home": "~home-screen", "login": "~login-screen"}
+    assert graph.shortest_path("home", "login")[0].selector == "~Login"
+    assert graph.shortest_path("login", "signup")[0].recorded
+    # Controls on several screens (a tab bar) work from any screen
+    assert graph.shortest_path(ANY_SCREEN, "forms")[0].selector == "~Forms"
+    assert graph.shortest_path(ANY_SCREEN, "home")[0].selector == "~Home"
+    assert "unknown" not in graph.screens()
+
+
+def test_rendered_steps_escape_selectors():
+    graph = NavigationGraph()
+    graph.add_edge("home", "details", '~Say "hi"\nnow')
+    graph.anchors["home"] = "~home-screen"
+    code = "\n".join(render_navigation_steps(graph, "details", WaitPolicy(timeout_ms=1234)))
+    assert '$("~Say \\"hi\\"\\nnow")' in code
+    assert "timeout: 1234" in code
+
+
+def test_rendered_steps_try_shorter_paths_first():
+    graph = _chain()
+    graph.anchors.update({"home": "~home-screen", "settings": "~settings-screen", "profile": "~profile-screen"})
+    code = render_navigation_steps(graph, "profile")
+    assert code[1] == 'if (await $("~profile-screen").isDisplayed()) { return; }'
+    probes = [line for line in code if line.startswith("if (")][1:]
+    # One tap from menu (probed by its first tap, it has no anchor) or settings, then two from home
+    assert probes == [
+        'if (await $("~Menu profile").isDisplayed()) {',
+        'if (await $("~settings-screen").isDisplayed()) {',
+        'if (await $("~home-screen").isDisplayed()) {',
+    ]
+
+
+def test_unreachable_target_logs_and_waits_instead_of_failing():
+    graph = NavigationGraph()
+    graph.anchors["orders"] = "~orders-screen"
+    code = "\n".join(render_navigation_steps(graph, "orders", WaitPolicy(timeout_ms=4000)))
+    assert "throw" not in code
+    assert 'console.log("No crawled path to orders");' in code
+    assert '$("~orders-screen").waitForDisplayed({ timeout: 4000 })' in code
+
+
+def test_step_variables_are_unique_within_a_path():
+    graph = NavigationGraph()
+    graph.add_edge("home", "sign-up", "~Sign up")
+    graph.add_edge("sign-up", "signup", "~Continue")
+    graph.anchors["home"] = "~home-screen"
+    code = render_navigation_steps(graph, "signup")
+    from_home = code[code.index('if (await $("~home-screen").isDisplayed()) {'):]
+    consts = [line.split()[1] for line in from_home if line.strip().startswith("const ")]
+    assert consts == ["step_signup_0", "step_signup_1"]
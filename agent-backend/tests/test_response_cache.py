@@ -0,0 +1,93 @@
+import os
+import time
+
+from response_cache import ResponseCache
+
+
+def _age(cache: ResponseCache, key: str, seconds: float):
+    """Backdate an entry's last use"""
+    path = cache._entry_path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = cache.make_key(model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+    assert cache.get(key) is None
+    cache.set(key, "hello")
+    assert cache.get(key) == "hello"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_every_parameter():
+    base = ResponseCache.make_key(model="gpt-4o", temperature=0.2)
+    assert ResponseCache.make_key(temperature=0.2, model="gpt-4o") == base
+    assert ResponseCache.make_key(model="gpt-4o", temperature=0.3) != base
+    assert ResponseCache.make_key(model="gpt-4o", temperature=0.2, base_url="http://127.0.0.1:8099/v1/") != base
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(tmp_path, enabled=False)
+    cache.set("k" * 64, "hello")
+    assert cache.get("k" * 64) is None
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_entries_unused_for_max_age_expire(tmp_path):
+    cache = ResponseCache(tmp_path, max_age_seconds=60)
+    cache.set("a" * 64, "old")
+    cache.set("b" * 64, "fresh")
+    _age(cache, "a" * 64, 120)
+    assert cache.get("a" * 64) is None
+    assert cache.get("b" * 64) == "fresh"
+
+
+def test_reading_an_entry_renews_it(tmp_path):
+    cache = ResponseCache(tmp_path, max_age_seconds=60)
+    cache.set("a" * 64, "used")
+    _age(cache, "a" * 64, 50)
+    assert cache.get("a" * 64) == "used"
+    assert time.time() - cache._entry_path("a" * 64).stat().st_mtime < 5
+
+
+def test_least_recently_used_entries_are_evicted_below_the_limit(tmp_path):
+    cache = ResponseCache(tmp_path, max_entries=3, evict_every=1000)
+    keys = [c * 64 for c in "abcd"]
+    for age, key in zip((40, 30, 20), keys):
+        cache.set(key, key)
+        _age(cache, key, age)
+    cache.get(keys[0])  # a is now the most recently used
+    cache.set(keys[3], "d")
+
+    remaining = {path.stem for path in tmp_path.glob("*/*.json")}
+    # Over the limit, the cache is trimmed to 90% of it (2 entries), oldest use first
+    assert remaining == {keys[0], keys[3]}
+    assert cache.evictions == 2
+
+
+def test_directory_is_scanned_only_periodically(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, max_entries=100, evict_every=5)
+    scans = []
+    original = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or original())
+    for i in range(11):
+        cache.set(f"{i:064x}", "response")
+    # The first write scans to learn the totals, then every 5th write
+    assert len(scans) == 3
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.set("a" * 64, "ok")
+    cache._entry_path("a" * 64).write_text("{not json", encoding="utf-8")
+    assert cache.get("a" * 64) is None
+    assert not cache._entry_path("a" * 64).exists()
+
+
+def test_clear_removes_everything(tmp_path):
+    cache = ResponseCache(tmp_path)
+    for c in "abc":
+        cache.set(c * 64, c)
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,98 @@
+import os
+
+from screen_fingerprint import ScreenIndex, fingerprint_string, verify_crawl
+
+
+def _screen(name: str, *children: str, rows: int = 0) -> str:
+    items = "".join(
+        f'<android.widget.TextView resource-id="app:id/row" text="Row {i}" '
+        f'bounds="[0,{i * 100}][1080,{i * 100 + 90}]"/>'
+        for i in range(rows)
+    )
+    listing = f'<android.widget.ListView resource-id="app:id/list">{items}</android.widget.ListView>' if rows else ""
+    return (
+        f'<hierarchy><android.widget.FrameLayout content-desc="{name}-screen">'
+        f'{"".join(children)}{listing}</android.widget.FrameLayout></hierarchy>'
+    )
+
+
+def _button(desc: str, text: str = "") -> str:
+    return f'<android.widget.Button content-desc="{desc}" text="{text}" bounds="[0,0][100,100]"/>'
+
+
+LOGIN_FIELDS = [
+    _button(desc) for desc in ("input-email", "input-password", "remember-me", "forgot-password", "sign-up", "help")
+]
+LOGIN = _screen("login", *LOGIN_FIELDS, _button("button-login"))
+# The same screen after one control was renamed
+LOGIN_RENAMED = _screen("login", *LOGIN_FIELDS, _button("btn-login"))
+TABS = [_button("tab-home"), _button("tab-forms"), _button("tab-swipe")]
+HOME = _screen("home", *TABS, rows=3)
+
+
+def test_text_bounds_and_row_count_do_not_change_the_fingerprint():
+    same = fingerprint_string(_screen("home", _button("tab-home", "Home!"), *TABS[1:], rows=12))
+    assert same.root == fingerprint_string(HOME).root
+    assert same.similarity(fingerprint_string(HOME)) == 1.0
+
+
+def test_one_changed_element_keeps_most_of_the_similarity():
+    changed = fingerprint_string(LOGIN_RENAMED)
+    login = fingerprint_string(LOGIN)
+    assert changed.root != login.root
+    assert 0.5 <= changed.similarity(login) < 1.0
+    assert fingerprint_string(HOME).similarity(login) < 0.2
+
+
+def _index(tmp_path, **screens: str) -> ScreenIndex:
+    for name, xml in screens.items():
+        (tmp_path / f"{name}.xml").write_text(xml, encoding="utf-8")
+    return ScreenIndex(tmp_path).refresh()
+
+
+def test_classify_names_the_known_screen(tmp_path):
+    index = _index(tmp_path, login=LOGIN, home=HOME, unknown=LOGIN)
+    assert sorted(index.screens) == ["home", "login"]
+
+    exact = index.classify(_screen("home", *TABS, rows=1))
+    assert (exact["page"], exact["exact"]) == ("home", True)
+    near = index.classify(LOGIN_RENAMED)
+    assert (near["page"], near["exact"]) == ("login", False)
+    assert index.classify(_screen("other", _button("x"), _button("y")))["page"] is None
+    assert index.classify(LOGIN, exclude=["login"])["page"] is None
+
+
+def test_close_runner_up_makes_the_match_ambiguous(tmp_path):
+    index = _index(
+        tmp_path,
+        a=_screen("shared", _button("one"), _button("two"), _button("three"), _button("a-only")),
+        b=_screen("shared", _button("one"), _button("two"), _button("three"), _button("b-only")),
+    )
+    result = index.classify(_screen("shared", _button("one"), _button("two"), _button("three"), _button("c-only")))
+    assert result["page"] is None
+    assert result["ambiguous"]
+    assert [c["page"] for c in result["candidates"]] == ["a", "b"]
+
+
+def test_refresh_picks_up_changed_and_deleted_crawls(tmp_path):
+    index = _index(tmp_path, login=LOGIN, home=HOME)
+    (tmp_path / "home.xml").unlink()
+    (tmp_path / "login.xml").write_text(HOME, encoding="utf-8")
+    stat = (tmp_path / "login.xml").stat()
+    os.utime(tmp_path / "login.xml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index.refresh()
+    assert sorted(index.screens) == ["login"]
+    assert index.classify(HOME)["page"] == "login"
+
+
+def test_verify_crawl_flags_a_capture_of_the_wrong_screen(tmp_path):
+    (tmp_path / "previous").mkdir()
+    (tmp_path / "previous" / "login.xml").write_text(LOGIN, encoding="utf-8")
+    _index(tmp_path, login=LOGIN, home=HOME)
+    assert verify_crawl("login", tmp_path)["verified"] is True
+
+    # The login crawl was captured while the home screen was still showing
+    (tmp_path / "login.xml").write_text(_screen("home", *TABS), encoding="utf-8")
+    result = verify_crawl("login", tmp_path)
+    assert result["verified"] is False
+    assert result["looks_like"] == "home"
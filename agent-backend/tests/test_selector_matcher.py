@@ -0,0 +1,84 @@
+from crawl_index import CrawlElement
+from selector_matcher import MIN_CONFIDENCE, SelectorMatcher, snapshot_crawl
+
+
+def _node(cls: str, bounds: str, desc: str = "", rid: str = "", text: str = "", clickable: bool = True) -> str:
+    return (
+        f'<android.widget.{cls} class="android.widget.{cls}" content-desc="{desc}" resource-id="{rid}" '
+        f'text="{text}" clickable="{str(clickable).lower()}" enabled="true" bounds="{bounds}"/>'
+    )
+
+
+def _login_screen(*buttons: str) -> str:
+    fields = (
+        _node("EditText", "[40,300][1040,400]", desc="input-email")
+        + _node("EditText", "[40,450][1040,550]", desc="input-password")
+    )
+    return f'<hierarchy><android.widget.FrameLayout>{fields}{"".join(buttons)}</android.widget.FrameLayout></hierarchy>'
+
+
+def _write(crawls, page: str, previous: str, current: str):
+    (crawls / "previous").mkdir(exist_ok=True)
+    (crawls / "previous" / f"{page}.xml").write_text(previous, encoding="utf-8")
+    (crawls / f"{page}.xml").write_text(current, encoding="utf-8")
+
+
+def test_selectors_match_by_accessibility_id_or_resource_id():
+    element = CrawlElement("android.widget.Button", content_desc="Login", resource_id="com.app:id/login")
+    assert element.selector == "~Login"
+    assert element.matches("~Login")
+    assert element.matches("id=com.app:id/login")
+    assert not element.matches("id=com.app:id/signup")
+    assert not element.matches("~login")
+
+
+def test_old_element_found_by_id_even_with_a_content_desc(tmp_path):
+    button = _node("Button", "[40,600][1040,700]", desc="button-login", rid="com.app:id/login", text="LOGIN")
+    _write(tmp_path, "login", _login_screen(button), _login_screen(button))
+    matcher = SelectorMatcher(tmp_path)
+
+    old, total = matcher.find_old_element("login", "id=com.app:id/login")
+    assert old.content_desc == "button-login"
+    assert total == 4  # the FrameLayout, two fields and the button
+    assert matcher.find_old_element("login", "~button-login")[0] is not None
+    assert matcher.find_old_element("login", "~gone") is None
+    assert matcher.find_old_element("signup", "~button-login") is None
+
+
+def test_renamed_element_is_matched_with_high_confidence(tmp_path):
+    old = _node("Button", "[40,600][1040,700]", desc="button-login", text="LOGIN")
+    new = _node("Button", "[40,610][1040,710]", desc="btn-login", text="LOGIN")
+    other = _node("TextView", "[40,900][1040,950]", desc="forgot-password", text="Forgot password?")
+    _write(tmp_path, "login", _login_screen(old, other), _login_screen(new, other))
+
+    matches = SelectorMatcher(tmp_path).match("login", "~button-login")
+    assert matches[0].selector == "~btn-login"
+    assert matches[0].confidence >= MIN_CONFIDENCE
+    assert all(m.score <= matches[0].score for m in matches)
+
+
+def test_lookalike_candidates_lower_the_confidence(tmp_path):
+    old = _node("Button", "[40,600][1040,700]", desc="button-login", text="LOGIN")
+    clear = _login_screen(_node("Button", "[40,600][1040,700]", desc="btn-login", text="LOGIN"))
+    twins = _login_screen(
+        _node("Button", "[40,600][1040,700]", desc="btn-login", text="LOGIN"),
+        _node("Button", "[40,600][1040,700]", desc="btn-login-2", text="LOGIN"),
+    )
+    _write(tmp_path, "clear", _login_screen(old), clear)
+    _write(tmp_path, "twins", _login_screen(old), twins)
+    matcher = SelectorMatcher(tmp_path)
+
+    assert matcher.match("twins", "~button-login")[0].confidence < matcher.match("clear", "~button-login")[0].confidence
+
+
+def test_no_history_means_no_local_match(tmp_path):
+    (tmp_path / "login.xml").write_text(_login_screen(), encoding="utf-8")
+    assert SelectorMatcher(tmp_path).match("login", "~button-login") == []
+
+
+def test_snapshot_keeps_the_current_crawl(tmp_path):
+    assert snapshot_crawl("login", tmp_path) is None
+    (tmp_path / "login.xml").write_text(_login_screen(), encoding="utf-8")
+    previous = snapshot_crawl("login", tmp_path)
+    assert previous == tmp_path / "previous" / "login.xml"
+    assert previous.read_text(encoding="utf-8") == _login_screen()
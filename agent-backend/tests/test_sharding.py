@@ -0,0 +1,106 @@
+import pytest
+
+import sharding
+from device_manager import platform_version
+from sharding import Shard, plan_shards, prepare_shards, shard_report
+
+DEVICES = [{"id": "emulator-5554", "name": "Pixel 7", "version": "Android 14"}, {"id": "R58M", "version": "Android 13"}]
+
+
+class FakeDevices:
+    def __init__(self, devices):
+        self.devices = devices
+
+    def detect_devices(self, platform_name):
+        return self.devices
+
+
+class FakeResultsDB:
+    def __init__(self, durations):
+        self.durations = durations
+
+    def spec_durations(self, runs):
+        return self.durations
+
+
+def test_longest_specs_are_spread_across_devices_first():
+    durations = {"a.e2e.ts": 50, "b.e2e.ts": 40, "c.e2e.ts": 30, "d.e2e.ts": 20, "e.e2e.ts": 10}
+    shards = plan_shards(sorted(durations), DEVICES, durations=durations)
+    assert [shard.specs for shard in shards] == [["a.e2e.ts", "d.e2e.ts", "e.e2e.ts"], ["b.e2e.ts", "c.e2e.ts"]]
+    assert [shard.estimated_ms for shard in shards] == [80, 70]
+
+
+def test_specs_without_history_are_estimated_at_the_median():
+    durations = {"a.e2e.ts": 10, "b.e2e.ts": 30, "c.e2e.ts": 90}
+    shards = plan_shards(["a.e2e.ts", "b.e2e.ts", "c.e2e.ts", "new.e2e.ts"], DEVICES, durations=durations)
+    assert sum(shard.estimated_ms for shard in shards) == 10 + 30 + 90 + 30
+
+
+def test_idle_devices_get_no_shard():
+    assert [shard.device["id"] for shard in plan_shards(["a.e2e.ts"], DEVICES)] == ["emulator-5554"]
+    assert plan_shards([], DEVICES) == []
+    assert plan_shards(["a.e2e.ts"], []) == []
+
+
+def test_each_shard_gets_its_own_ports_and_config():
+    android, ios = Shard(1, DEVICES[1], "Android"), Shard(2, {"id": "SIM"}, "iOS")
+    assert android.appium_port == sharding.APPIUM_BASE_PORT + 1
+    assert android.command(("npx",)) == ["npx", "wdio", "run", "wdio.conf.ts"]
+    ios.specs = ["login.e2e.ts"]
+    assert ios.command(("npx.cmd",)) == [
+        "npx.cmd", "wdio", "run", "wdio.ios.conf.ts", "--spec", "./src/tests/login.e2e.ts",
+    ]
+
+
+@pytest.mark.parametrize("running, start", [(True, "0"), (False, "1")])
+def test_env_pins_the_device_and_ports(monkeypatch, running, start):
+    monkeypatch.setattr(sharding, "appium_running", lambda port: running)
+    env = Shard(1, DEVICES[0], "Android").env({"PATH": "/bin"})
+    assert env["PATH"] == "/bin"
+    assert env["DEVICE_UDID"] == "emulator-5554"
+    assert env["DEVICE_PLATFORM_VERSION"] == "14"
+    assert env["APPIUM_PORT"] == str(sharding.APPIUM_BASE_PORT + 1)
+    assert env["APPIUM_SYSTEM_PORT"] == str(sharding.SYSTEM_BASE_PORT + 1)
+    assert env["APPIUM_START"] == start
+
+    ios_env = Shard(0, {"id": "SIM", "version": "iOS 17 0"}, "iOS").env({})
+    assert ios_env["DEVICE_PLATFORM_VERSION"] == "17.0"
+    assert ios_env["APPIUM_WDA_LOCAL_PORT"] == str(sharding.WDA_BASE_PORT)
+    assert "APPIUM_SYSTEM_PORT" not in ios_env
+
+
+@pytest.mark.parametrize("version, expected", [
+    ("Android 14", "14"),
+    ("iOS 17 0", "17.0"),
+    ("Android Unknown", None),
+    ("", None),
+])
+def test_platform_version(version, expected):
+    assert platform_version({"version": version}) == expected
+
+
+def test_prepare_shards_filters_devices_and_pages():
+    shards = prepare_shards(
+        device_ids=["R58M"],
+        pages=["Login", "home"],
+        db=FakeResultsDB({"login.e2e.ts": 5000}),
+        device_manager=FakeDevices(DEVICES),
+        specs=["home.e2e.ts", "login.e2e.ts", "forms.e2e.ts"],
+    )
+    assert len(shards) == 1
+    assert shards[0].device["id"] == "R58M"
+    assert shards[0].specs == ["home.e2e.ts", "login.e2e.ts"]
+    assert shards[0].estimated_ms == 10000
+
+
+def test_shard_report_uses_the_merged_summary():
+    shards = plan_shards(["a.e2e.ts", "b.e2e.ts"], DEVICES, durations={"a.e2e.ts": 2, "b.e2e.ts": 1})
+    summary = {"specs": {
+        "a.e2e.ts": {"status": "failed", "duration_ms": 2100},
+        "b.e2e.ts": {"status": "passed", "duration_ms": 900},
+    }}
+    report = shard_report(shards, summary, [1, 0])
+    assert [(r["specs"], r["returncode"], r["actual_ms"], r["failed_specs"]) for r in report] == [
+        (["a.e2e.ts"], 1, 2100, ["a.e2e.ts"]),
+        (["b.e2e.ts"], 0, 900, []),
+    ]
@@ -0,0 +1,134 @@
+"""
+Condition-based wait strategies for generated WebdriverIO navigation code
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+MOBILE_TESTS_DIR = ROOT_DIR / "mobile-tests"
+WAIT_POLICY_FILE = MOBILE_TESTS_DIR / "wait-policy.json"
+WDIO_CONFIG_FILE = MOBILE_TESTS_DIR / "wdio.conf.ts"
+
+STRATEGIES = ("anchor", "idle", "pause")
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "strategy": "anchor",        # anchor: wait for the target screen's anchor element
+    "timeout_ms": 10000,         # explicit wait timeout
+    "app_load_timeout_ms": 15000,
+    "idle_interval_ms": 500,     # UI is idle once the page source is unchanged for one interval
+    "wait_for_gone": True,       # without a target anchor, wait for the previous screen to go away
+    "fallback_pause_ms": 1000,   # fixed sleep, only when no condition is available
+}
+
+
+class WaitPolicy:
+    """How generated code waits after app launch, taps and alert dismissal.
+
+    Explicit conditions are always preferred: the target screen's anchor, then the
+    previous screen disappearing, then a UI-idle check. A fixed pause is emitted
+    only for strategy "pause" or when nothing else applies.
+    """
+
+    def __init__(self, **settings: Any):
+        merged = {**DEFAULT_POLICY, **settings}
+        if merged["strategy"] not in STRATEGIES:
+            raise ValueError(f"Unknown wait strategy '{merged['strategy']}' (expected one of {STRATEGIES})")
+        self.strategy: str = merged["strategy"]
+        self.timeout_ms = int(merged["timeout_ms"])
+        self.app_load_timeout_ms = int(merged["app_load_timeout_ms"])
+        self.idle_interval_ms = int(merged["idle_interval_ms"])
+        self.wait_for_gone = bool(merged["wait_for_gone"])
+        self.fallback_pause_ms = int(merged["fallback_pause_ms"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in DEFAULT_POLICY}
+
+    def _pause(self, indent: str) -> List[str]:
+        return [f"{indent}await driver.pause({self.fallback_pause_ms});"]
+
+    def wait_for_idle(self, indent: str = "", timeout_ms: Optional[int] = None) -> List[str]:
+        """Wait until two page sources taken one interval apart are identical"""
+        timeout = timeout_ms or self.timeout_ms
+        return [
+            f"{indent}{{ let lastSource = ''; await driver.waitUntil(async () => {{ "
+            f"const source = await driver.getPageSource(); const idle = source === lastSource; "
+            f"lastSource = source; return idle; }}, "
+            f"{{ timeout: {timeout}, interval: {self.idle_interval_ms} }}).catch(() => {{ /* still animating */ }}); }}"
+        ]
+
+    def app_ready(self, anchors: List[str], indent: str = "") -> List[str]:
+        """Wait for the app to show any known screen (replaces the fixed launch pause)"""
+        if self.strategy == "pause":
+            return self._pause(indent)
+        if self.strategy == "anchor" and anchors:
+            checks = " || ".join(f"(await $({js_string(a)}).isDisplayed())" for a in anchors)
+            return [
+                f"{indent}// Wait until any known screen is showing",
+                f"{indent}await driver.waitUntil(async () => {checks}, "
+                f"{{ timeout: {self.app_load_timeout_ms}, interval: 250 }}).catch(() => {{ /* unknown screen */ }});",
+            ]
+        return self.wait_for_idle(indent, self.app_load_timeout_ms)
+
+    def after_tap(self, next_anchor: Optional[str] = None, prev_anchor: Optional[str] = None, indent: str = "") -> List[str]:
+        """Wait for the screen transition a tap started"""
+        if self.strategy == "pause":
+            return self._pause(indent)
+        if self.strategy == "anchor":
+            if next_anchor:
+                return [f"{indent}await $({js_string(next_anchor)}).waitForDisplayed({{ timeout: {self.timeout_ms} }});"]
+            if prev_anchor and self.wait_for_gone:
+                # Tabs can keep the previous container on screen, so this wait must not throw
+                return [
+                    f"{indent}await $({js_string(prev_anchor)}).waitForDisplayed({{ reverse: true, timeout: {self.timeout_ms} }})"
+                    ".catch(() => { /* previous screen still present */ });"
+                ]
+        return self.wait_for_idle(indent)
+
+    def after_dismiss(self, element_var: str) -> str:
+        """Wait for a dismissed alert to disappear"""
+        if self.strategy == "pause":
+            return f"await driver.pause({self.fallback_pause_ms});"
+        return f"await {element_var}.waitForDisplayed({{ reverse: true, timeout: {self.timeout_ms} }});"
+
+
+def js_string(value: str) -> str:
+    """A TypeScript string literal for a crawl-derived value (labels can hold quotes and backslashes)"""
+    return json.dumps(value)
+
+
+def detect_app_id() -> Optional[str]:
+    """App the policy applies to: APP_PACKAGE / BUNDLE_ID env, else APP_PACKAGE in wdio.conf.ts"""
+    app_id = os.getenv("APP_PACKAGE") or os.getenv("BUNDLE_ID")
+    if app_id:
+        return app_id
+    if WDIO_CONFIG_FILE.exists():
+        try:
+            match = re.search(
+                r"const APP_PACKAGE = process\.env\.APP_PACKAGE \|\| '([^']*)'",
+                WDIO_CONFIG_FILE.read_text(encoding="utf-8"),
+            )
+        except OSError:
+            return None
+        if match and match.group(1):
+            return match.group(1)
+    return None
+
+
+def load_wait_policy(app_id: Optional[str] = None, path: Path = WAIT_POLICY_FILE) -> WaitPolicy:
+    """Policy from wait-policy.json: "default" settings overridden by "apps"[app_id]"""
+    settings: Dict[str, Any] = {}
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Ignoring invalid wait policy file {path}: {e}")
+            data = {}
+        settings.update(data.get("default", {}))
+        app_id = app_id or detect_app_id()
+        if app_id:
+            settings.update(data.get("apps", {}).get(app_id, {}))
+    return WaitPolicy(**settings)
@@ -1,127 +1,206 @@
 /**
  * Crawling spec:
- * - Called by the backend /crawl-page endpoint.
- * - Uses CRAWL_PAGE_NAME env var to name the output file.
- * - Dumps driver.getPageSource() into ./crawls/{page}.xml
+ * - Called by the backend /crawl-page and /crawl-pages endpoints.
+ * - Uses CRAWL_PAGE_NAME env var to name the output file, or CRAWL_PAGE_NAMES
+ *   (comma-separated) to crawl several screens in one Appium session.
+ * - CRAWL_NAV_PLAN (JSON {page: [selector, ...]}) gives the taps that reach a page
+ *   from the app's launch screen; pages without a plan use the built-in navigation.
+ * - Dumps driver.getPageSource() into ./crawls/{page}.xml and prints one
+ *   "CRAWL_RESULT {json}" line per page with its timing.
  */
 
 import fs from 'node:fs';
 import path from 'node:path';
 
-describe('Crawl current page elements', () => {
-    it('should dump page source to XML file', async () => {
-        const pageName = process.env.CRAWL_PAGE_NAME || 'unknown';
-        
-        // Navigate to specific page if requested
-        if (pageName.toLowerCase() === 'login') {
-            try {
-                console.log('Waiting for app to load...');
-                // Wait for app to load
-                await driver.pause(3000);
-                
-                console.log('Looking for Login navigation button...');
-                // Click Login button in bottom navigation
-                const loginNavButton = await $('~Login');
-                await loginNavButton.waitForDisplayed({ timeout: 15000 });
-                console.log('Found Login button, clicking...');
-                await loginNavButton.click();
-                
-                // Wait for login screen to load
-                console.log('Waiting for Login screen to load...');
-                await driver.pause(3000);
-                
-                // Verify we're on login screen by checking for login elements
-                try {
-                    const emailInput = await $('~input-email');
-                    await emailInput.waitForDisplayed({ timeout: 5000 });
-                    console.log('✓ Successfully navigated to Login screen');
-                } catch (verifyError) {
-                    console.log('⚠ Could not verify login screen, but continuing...');
-                }
-            } catch (error) {
-                console.log(`⚠ Could not auto-navigate to Login: ${error}`);
-                console.log('Using current screen for crawl...');
-            }
-        } else if (pageName.toLowerCase() === 'forms') {
-            try {
-                await driver.pause(2000);
-                const formsNavButton = await $('~Forms');
-                await formsNavButton.waitForDisplayed({ timeout: 10000 });
-                await formsNavButton.click();
-                await driver.pause(2000);
-                console.log('Navigated to Forms screen');
-            } catch (error) {
-                console.log('Could not auto-navigate to Forms, using current screen');
-            }
-        } else if (pageName.toLowerCase() === 'signup') {
-            try {
-                console.log('Waiting for app to load...');
-                await driver.pause(3000);
-                
-                // First navigate to Login screen
-                console.log('Navigating to Login screen...');
-                const loginNavButton = await $('~Login');
-                await loginNavButton.waitForDisplayed({ timeout: 15000 });
-                await loginNavButton.click();
-                await driver.pause(2000);
-                
-                // Then click Sign up button/tab
-                console.log('Looking for Sign up button...');
-                const signupButton = await $('~button-sign-up-container');
-                await signupButton.waitForDisplayed({ timeout: 10000 });
-                console.log('Clicking Sign up button...');
-                await signupButton.click();
-                
-                // Wait for signup view to load
-                await driver.pause(2000);
-                console.log('✓ Successfully navigated to Sign up view');
-            } catch (error) {
-                console.log(`⚠ Could not auto-navigate to Sign up: ${error}`);
-                console.log('Using current screen for crawl...');
-            }
-        } else if (pageName.toLowerCase() === 'swipe') {
-            try {
-                await driver.pause(2000);
-                const swipeNavButton = await $('~Swipe');
-                await swipeNavButton.waitForDisplayed({ timeout: 10000 });
-                await swipeNavButton.click();
-                await driver.pause(2000);
-                console.log('Navigated to Swipe screen');
-            } catch (error) {
-                console.log('Could not auto-navigate to Swipe, using current screen');
-            }
-        } else if (pageName.toLowerCase() === 'text' || pageName.toLowerCase() === 'textinput') {
+// Same settings the generator uses for navigateTo methods (wait-policy.json, per app)
+const DEFAULT_WAIT_POLICY = { timeout_ms: 10000, app_load_timeout_ms: 15000, idle_interval_ms: 500 };
+
+function loadWaitPolicy(): typeof DEFAULT_WAIT_POLICY {
+    try {
+        const data = JSON.parse(fs.readFileSync(path.join(process.cwd(), 'wait-policy.json'), 'utf-8'));
+        const appId = process.env.APP_PACKAGE || process.env.BUNDLE_ID || '';
+        return { ...DEFAULT_WAIT_POLICY, ...(data.default || {}), ...((data.apps || {})[appId] || {}) };
+    } catch (e) {
+        return DEFAULT_WAIT_POLICY;
+    }
+}
+
+const waitPolicy = loadWaitPolicy();
+
+/** Resolve once two page sources taken one interval apart are identical (animations finished) */
+async function waitForUiIdle(timeout: number = waitPolicy.timeout_ms): Promise<void> {
+    let lastSource = '';
+    await driver.waitUntil(async () => {
+        const source = await driver.getPageSource();
+        const idle = source === lastSource;
+        lastSource = source;
+        return idle;
+    }, { timeout, interval: waitPolicy.idle_interval_ms }).catch(() => {
+        console.log('⚠ UI still changing, crawling anyway');
+    });
+}
+
+/** Navigation for the demo app's known screens; anything else is crawled where the app is */
+async function builtInNavigation(pageName: string): Promise<void> {
+    if (pageName.toLowerCase() === 'login') {
+        try {
+            console.log('Waiting for app to load...');
+            // Click Login button in bottom navigation once the app shows it
+            const loginNavButton = await $('~Login');
+            await loginNavButton.waitForDisplayed({ timeout: waitPolicy.app_load_timeout_ms });
+            console.log('Found Login button, clicking...');
+            await loginNavButton.click();
+            
+            // Wait for login screen to load by checking for login elements
+            console.log('Waiting for Login screen to load...');
             try {
-                console.log('Navigating to Text Input screen...');
-                await driver.pause(2000);
-                // Click Text Button to go to text input screen
-                const textButton = await $('~Text Button');
-                await textButton.waitForDisplayed({ timeout: 10000 });
-                await textButton.click();
-                await driver.pause(2000);
-                console.log('✓ Successfully navigated to Text Input screen');
-            } catch (error) {
-                console.log(`⚠ Could not auto-navigate to Text Input: ${error}`);
-                console.log('Using current screen for crawl...');
+                const emailInput = await $('~input-email');
+                await emailInput.waitForDisplayed({ timeout: waitPolicy.timeout_ms });
+                console.log('✓ Successfully navigated to Login screen');
+            } catch (verifyError) {
+                console.log('⚠ Could not verify login screen, but continuing...');
             }
-        } else {
-            // For other pages, wait a bit for user to navigate manually
-            await driver.pause(3000);
+        } catch (error) {
+            console.log(`⚠ Could not auto-navigate to Login: ${error}`);
+            console.log('Using current screen for crawl...');
         }
-        
-        const xml = await driver.getPageSource();
-
-        // Save XML to crawls directory
-        // Use process.cwd() which works from the WebDriverIO run context
-        const crawlsDir = path.join(process.cwd(), 'crawls');
-        if (!fs.existsSync(crawlsDir)) {
-            fs.mkdirSync(crawlsDir, { recursive: true });
+    } else if (pageName.toLowerCase() === 'forms') {
+        try {
+            const formsNavButton = await $('~Forms');
+            await formsNavButton.waitForDisplayed({ timeout: waitPolicy.app_load_timeout_ms });
+            await formsNavButton.click();
+            await waitForUiIdle();
+            console.log('Navigated to Forms screen');
+        } catch (error) {
+            console.log('Could not auto-navigate to Forms, using current screen');
         }
+    } else if (pageName.toLowerCase() === 'signup') {
+        try {
+            // First navigate to Login screen
+            console.log('Navigating to Login screen...');
+            const loginNavButton = await $('~Login');
+            await loginNavButton.waitForDisplayed({ timeout: waitPolicy.app_load_timeout_ms });
+            await loginNavButton.click();
+            
+            // Then click Sign up button/tab (its appearance means the Login screen is up)
+            console.log('Looking for Sign up button...');
+            const signupButton = await $('~button-sign-up-container');
+            await signupButton.waitForDisplayed({ timeout: waitPolicy.timeout_ms });
+            console.log('Clicking Sign up button...');
+            await signupButton.click();
+            
+            // Wait for signup view to load
+            await waitForUiIdle();
+            console.log('✓ Successfully navigated to Sign up view');
+        } catch (error) {
+            console.log(`⚠ Could not auto-navigate to Sign up: ${error}`);
+            console.log('Using current screen for crawl...');
+        }
+    } else if (pageName.toLowerCase() === 'swipe') {
+        try {
+            const swipeNavButton = await $('~Swipe');
+            await swipeNavButton.waitForDisplayed({ timeout: waitPolicy.app_load_timeout_ms });
+            await swipeNavButton.click();
+            await waitForUiIdle();
+            console.log('Navigated to Swipe screen');
+        } catch (error) {
+            console.log('Could not auto-navigate to Swipe, using current screen');
+        }
+    } else if (pageName.toLowerCase() === 'text' || pageName.toLowerCase() === 'textinput') {
+        try {
+            console.log('Navigating to Text Input screen...');
+            // Click Text Button to go to text input screen
+            const textButton = await $('~Text Button');
+            await textButton.waitForDisplayed({ timeout: waitPolicy.app_load_timeout_ms });
+            await textButton.click();
+            await waitForUiIdle();
+            console.log('✓ Successfully navigated to Text Input screen');
+        } catch (error) {
+            console.log(`⚠ Could not auto-navigate to Text Input: ${error}`);
+            console.log('Using current screen for crawl...');
+        }
+    } else {
+        // For other pages, crawl the current screen once it has settled
+        await waitForUiIdle(waitPolicy.app_load_timeout_ms);
+    }
+}
 
-        const outPath = path.join(crawlsDir, `${pageName}.xml`);
-        fs.writeFileSync(outPath, xml, { encoding: 'utf-8' });
-        console.log(`Crawl saved to: ${outPath}`);
-    });
-});
+/** Tap through a planned path of selectors, waiting for each to appear and the UI to settle */
+async function followPlan(taps: string[]): Promise<void> {
+    for (const [i, selector] of taps.entries()) {
+        const element = await $(selector);
+        await element.waitForDisplayed({ timeout: i === 0 ? waitPolicy.app_load_timeout_ms : waitPolicy.timeout_ms });
+        await element.click();
+        await waitForUiIdle();
+    }
+}
+
+/** Bring the app back to its launch screen without a new session */
+async function relaunchApp(): Promise<void> {
+    const caps = driver.capabilities as Record<string, any>;
+    const appId = process.env.APP_PACKAGE || process.env.BUNDLE_ID
+        || caps['appium:appPackage'] || caps.appPackage || caps['appium:bundleId'] || caps.bundleId;
+    if (!appId) {
+        console.log('⚠ App id unknown, crawling from the current screen');
+        return;
+    }
+    await driver.terminateApp(appId);
+    await driver.activateApp(appId);
+}
+
+function loadNavigationPlan(): Record<string, string[]> {
+    try {
+        return JSON.parse(process.env.CRAWL_NAV_PLAN || '{}');
+    } catch (e) {
+        console.log('⚠ CRAWL_NAV_PLAN is not valid JSON, using built-in navigation');
+        return {};
+    }
+}
+
+const pageNames = (process.env.CRAWL_PAGE_NAMES || process.env.CRAWL_PAGE_NAME || 'unknown')
+    .split(',').map(name => name.trim()).filter(Boolean);
+const navigationPlan = loadNavigationPlan();
+
+describe('Crawl current page elements', () => {
+    // One test per page: a page that fails to load does not stop the rest
+    pageNames.forEach((pageName, index) => {
+        it(`should dump page source to XML file (${pageName})`, async () => {
+            const started = Date.now();
+            const timing = { reset_ms: 0, navigate_ms: 0, dump_ms: 0 };
+            try {
+                if (index > 0) {
+                    await relaunchApp();
+                    timing.reset_ms = Date.now() - started;
+                }
+
+                const navigateStart = Date.now();
+                const taps = navigationPlan[pageName.toLowerCase()];
+                if (taps && taps.length) {
+                    await followPlan(taps);
+                } else {
+                    await builtInNavigation(pageName);
+                }
+                timing.navigate_ms = Date.now() - navigateStart;
+
+                const dumpStart = Date.now();
+                const xml = await driver.getPageSource();
 
+                // Save XML to crawls directory
+                // Use process.cwd() which works from the WebDriverIO run context
+                const crawlsDir = path.join(process.cwd(), 'crawls');
+                if (!fs.existsSync(crawlsDir)) {
+                    fs.mkdirSync(crawlsDir, { recursive: true });
+                }
 
+                const outPath = path.join(crawlsDir, `${pageName}.xml`);
+                fs.writeFileSync(outPath, xml, { encoding: 'utf-8' });
+                timing.dump_ms = Date.now() - dumpStart;
+                console.log(`Crawl saved to: ${outPath}`);
+                console.log(`CRAWL_RESULT ${JSON.stringify({ page: pageName, ok: true, ms: Date.now() - started, ...timing, file: outPath })}`);
+            } catch (error) {
+                console.log(`CRAWL_RESULT ${JSON.stringify({ page: pageName, ok: false, ms: Date.now() - started, ...timing, error: String(error) })}`);
+                throw error;
+            }
+        });
+    });
+});
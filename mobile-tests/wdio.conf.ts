@@ -6,17 +6,45 @@ const APP_PATH = process.env.APP_PATH || 'C:/Users/LENOVO/Desktop/upwork/QA-AI-a
 const APP_PACKAGE = process.env.APP_PACKAGE || 'com.wdiodemoapp'; // Package name for Android-NativeDemoApp-0.4.0.apk
 const APP_ACTIVITY = process.env.APP_ACTIVITY || '.MainActivity'; // e.g., '.MainActivity'
 
+// Sharded runs (agent-backend/sharding.py) start one wdio process per device and
+// pin each to its own device and Appium port through these variables
+const APPIUM_PORT = Number(process.env.APPIUM_PORT || 4723);
+const APPIUM_START = process.env.APPIUM_START === '1'; // let wdio start Appium on APPIUM_PORT
+
+// env var -> Appium capability (without the 'appium:' prefix)
+const DEVICE_ENV: Array<[string, string]> = [
+    ['DEVICE_UDID', 'udid'],
+    ['DEVICE_NAME', 'deviceName'],
+    ['DEVICE_PLATFORM_VERSION', 'platformVersion'],
+    // UiAutomator2 / XCUITest need a distinct host port per device when sessions run side by side
+    ['APPIUM_SYSTEM_PORT', 'systemPort'],
+    ['APPIUM_WDA_LOCAL_PORT', 'wdaLocalPort'],
+];
+const NUMERIC_CAPS = ['systemPort', 'wdaLocalPort'];
+
+function deviceOverrides(): Record<string, unknown> {
+    const caps: Record<string, unknown> = {};
+    for (const [envName, capability] of DEVICE_ENV) {
+        const value = process.env[envName];
+        if (value) caps[`appium:${capability}`] = NUMERIC_CAPS.includes(capability) ? Number(value) : value;
+    }
+    return caps;
+}
+
 export const config = {
     runner: 'local',
 
     hostname: '127.0.0.1',
-    port: 4723,
+    port: APPIUM_PORT,
     path: '/',
 
     specs: ['./src/tests/**/*.ts'],
 
     maxInstances: 1,
 
+    // Retries for a failed spec file; the backend sets this for specs it knows are flaky
+    specFileRetries: Number(process.env.SPEC_FILE_RETRIES || 0),
+
     capabilities: [{
         platformName: 'Android',
         'appium:automationName': 'UiAutomator2',
@@ -35,6 +63,8 @@ export const config = {
             browserName: 'Chrome',
             'appium:chromedriverAutodownload': true
         }),
+
+        ...deviceOverrides(),
     }],
 
     logLevel: 'info',
@@ -50,6 +80,9 @@ export const config = {
     ],
 
     services: [
+        ...(APPIUM_START ? [['appium', {
+            args: { port: APPIUM_PORT, address: '127.0.0.1' }
+        }]] : []),
         // Appium service - comment out if Appium is running separately
         // Uncomment if you want WebdriverIO to start Appium automatically
         // ['appium', {
@@ -16,17 +16,44 @@ const IOS_DEVICE_NAME = process.env.IOS_DEVICE_NAME || 'iPhone 14';
 const IOS_PLATFORM_VERSION = process.env.IOS_PLATFORM_VERSION || '17.0';
 const IOS_BUNDLE_ID = process.env.IOS_BUNDLE_ID || 'com.example.app'; // Your app's bundle ID
 
+// Sharded runs (agent-backend/sharding.py) start one wdio process per device and
+// pin each to its own device and Appium port through these variables
+const APPIUM_PORT = Number(process.env.APPIUM_PORT || 4723);
+const APPIUM_START = process.env.APPIUM_START === '1'; // let wdio start Appium on APPIUM_PORT
+
+// env var -> Appium capability (without the 'appium:' prefix)
+const DEVICE_ENV: Array<[string, string]> = [
+    ['DEVICE_UDID', 'udid'],
+    ['DEVICE_NAME', 'deviceName'],
+    ['DEVICE_PLATFORM_VERSION', 'platformVersion'],
+    // XCUITest needs a distinct WebDriverAgent port per device when sessions run side by side
+    ['APPIUM_WDA_LOCAL_PORT', 'wdaLocalPort'],
+];
+const NUMERIC_CAPS = ['wdaLocalPort'];
+
+function deviceOverrides(): Record<string, unknown> {
+    const caps: Record<string, unknown> = {};
+    for (const [envName, capability] of DEVICE_ENV) {
+        const value = process.env[envName];
+        if (value) caps[`appium:${capability}`] = NUMERIC_CAPS.includes(capability) ? Number(value) : value;
+    }
+    return caps;
+}
+
 export const config = {
     runner: 'local',
 
     hostname: '127.0.0.1',
-    port: 4723,
+    port: APPIUM_PORT,
     path: '/',
 
     specs: ['./src/tests/**/*.ts'],
 
     maxInstances: 1,
 
+    // Retries for a failed spec file; the backend sets this for specs it knows are flaky
+    specFileRetries: Number(process.env.SPEC_FILE_RETRIES || 0),
+
     capabilities: [{
         platformName: 'iOS',
         'appium:automationName': 'XCUITest',
@@ -47,6 +74,8 @@ export const config = {
         // 'appium:xcodeSigningId': 'iPhone Developer',  // For physical device testing
         // 'appium:autoAcceptAlerts': true,  // Auto-accept iOS alerts
         // 'appium:autoDismissAlerts': true,  // Auto-dismiss iOS alerts
+
+        ...deviceOverrides(),
     }],
 
     logLevel: 'info',
@@ -62,6 +91,9 @@ export const config = {
     ],
 
     services: [
+        ...(APPIUM_START ? [['appium', {
+            args: { port: APPIUM_PORT, address: '127.0.0.1' }
+        }]] : []),
         // Appium service - comment out if Appium is running separately
         // Uncomment if you want WebdriverIO to start Appium automatically
         // ['appium', {